@@ -6,6 +6,21 @@ import sys
 from datetime import datetime
 import logging
 import re
+import csv
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import json
+
+from charge_rules import get_charge_rules
+from dedup_store import EmittedKeyIndex
+from input_schema import InputSchema, SchemaColumn
+from job_register import get_merged_job_register_index, resolve_register_paths
+from logisys_template import RowTemplate
+from normalize import format_ledger_dates
+from output_index import OutputIndex, conversion_key
+from output_parts import manifest_path, write_parts
+from xlsx_output import write_xlsx
+from tax_rates import POSSIBLE_STATE_COLUMNS, get_tax_rates, parse_txn_date
 
 try:
     from PIL import Image, ImageTk
@@ -63,178 +78,366 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-# Global variable to store Job Register path
-JOB_REGISTER_PATH = None
+def app_base_dir():
+    """Folder next to the executable (frozen) or this script - for config and outputs."""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+# Consignee charge rules; the built-in defaults apply if the file is absent
+CHARGE_RULES_FILENAME = "charge_rules.json"
+# GST rates per SAC and date; the built-in rates apply if the file is absent
+TAX_RATES_FILENAME = "tax_rates.json"
+
+# Ledger Report columns create_csv uses; everything else in the report is not read
+LEDGER_SCHEMA = InputSchema("Ledger Report", [
+    SchemaColumn("Receipt No.", ("Receipt No.", "Receipt No", "Receipt Number")),
+    SchemaColumn("BOE No.", ("BOE No.", "BOE No", "BE No.", "BE No", "BOE Number", "Bill of Entry No")),
+    SchemaColumn("Txn Date", ("Txn Date", "Transaction Date"), text=False),  # Excel date cells stay datetimes
+    SchemaColumn("Consignee Name", ("Consignee Name",), required=False),
+    # Any state / GSTIN column, under the name create_csv looks for first
+    SchemaColumn(POSSIBLE_STATE_COLUMNS[0], tuple(POSSIBLE_STATE_COLUMNS), required=False),
+])
+
+# Merged index of the selected Job Registers, reused until one of them changes
+JOB_REGISTER_CACHE_FILENAME = ".job_register_cache.json"
+
+# Receipt No. + BOE No. of every row written so far, for "new rows only" runs
+LEDGER_HISTORY_DB = "ledger_history.sqlite"
+LEDGER_KEY_COLUMNS = ["Receipt No", "BOE No"]
+
+def open_ledger_index(db_path):
+    """Open the emitted-receipt index (db_path None = this batch only)."""
+    return EmittedKeyIndex(db_path, "emitted_receipts", LEDGER_KEY_COLUMNS)
+
+# Global variable to store the selected Job Register files
+JOB_REGISTER_PATHS = []
+
+def load_job_registers(paths, log_callback):
+    """Merged index over the selected registers; conflicting BOE Nos are logged."""
+    job_index = get_merged_job_register_index(
+        paths, os.path.join(app_base_dir(), JOB_REGISTER_CACHE_FILENAME)
+    )
+    log_callback(f"Loaded {len(paths)} Job Register file(s): {len(job_index)} BOE Nos")
+    conflicts = job_index.conflict_report()
+    if conflicts:
+        log_callback(f"{len(conflicts)} BOE No(s) map to different Job Nos in different registers (first register wins):")
+        for line in conflicts:
+            log_callback(f"  {line}")
+            logger.warning(f"Job Register conflict: {line}")
+    return job_index
 
 # Function to get Job Number from Job Register CSV or Excel
-def get_job_number(boe_number, log_callback):
-    global JOB_REGISTER_PATH
-    if JOB_REGISTER_PATH is None:
-        log_callback("Job Register file not set.")
-        return "NA"
-    try:
-        # Read Job Register based on file extension
-        if JOB_REGISTER_PATH.endswith('.csv'):
-            df = pd.read_csv(JOB_REGISTER_PATH)
-        elif JOB_REGISTER_PATH.endswith('.xlsx'):
-            df = pd.read_excel(JOB_REGISTER_PATH, engine='openpyxl')
-        else:
-            log_callback(f"Unsupported Job Register file format: {JOB_REGISTER_PATH}")
-            logger.error(f"Unsupported Job Register file format: {JOB_REGISTER_PATH}")
-            return "NA"
-        
-        # Try multiple possible BOE column names
-        boe_column = None
-        possible_boe_columns = ["BOE No", "BE No.", "BE No", "BOE No.", "BOE Number", "Bill of Entry No"]
-        for col in possible_boe_columns:
-            if col in df.columns:
-                boe_column = col
-                break
-        if boe_column is None:
-            log_callback(f"BOE column not found in Job Register file. Available columns: {list(df.columns)}")
-            logger.error(f"BOE column not found in Job Register file. Available columns: {list(df.columns)}")
-            return "NA"
-        
-        # Try multiple possible Job No column names
-        job_column = None
-        possible_job_columns = ["Job No.", "Job No", "Job Number", "Ref No", "Reference No"]
-        for col in possible_job_columns:
-            if col in df.columns:
-                job_column = col
-                break
-        if job_column is None:
-            log_callback(f"Job No column not found in Job Register file. Available columns: {list(df.columns)}")
-            logger.error(f"Job No column not found in Job Register file. Available columns: {list(df.columns)}")
+def get_job_number(boe_number, log_callback, job_index=None):
+    if job_index is None:
+        if not JOB_REGISTER_PATHS:
+            log_callback("Job Register file not set.")
             return "NA"
-        
-        # Clean BOE numbers for matching
-        df[boe_column] = df[boe_column].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-        boe_number_clean = str(boe_number).strip()
-        match = df[df[boe_column].str.lower() == boe_number_clean.lower()][job_column]
-        if not match.empty:
-            job_no = match.iloc[0]
-            log_callback(f"Found Job No: {job_no} for BOE No.: {boe_number}")
-            return job_no
-        else:
-            log_callback(f"No Job No found for BOE No.: {boe_number}")
+        try:
+            # Indexed once per set of files, reloaded only when a register changes
+            job_index = get_merged_job_register_index(
+                JOB_REGISTER_PATHS, os.path.join(app_base_dir(), JOB_REGISTER_CACHE_FILENAME)
+            )
+        except Exception as e:
+            log_callback(f"Error reading Job Register file: {str(e)}")
+            logger.error(f"Error reading Job Register file: {e}")
             return "NA"
-    except Exception as e:
-        log_callback(f"Error reading Job Register file: {str(e)}")
-        logger.error(f"Error reading Job Register file: {e}")
+
+    job_no = job_index.lookup(boe_number)
+    if job_no is not None:
+        log_callback(f"Found Job No: {job_no} for BOE No.: {boe_number} ({job_index.source(boe_number)})")
+        return job_no
+    else:
+        log_callback(f"No Job No found for BOE No.: {boe_number}")
         return "NA"
 
+# Template columns that vary per ledger row, in the order create_csv fills them
+LEDGER_VARIABLE_COLUMNS = [
+    "Vendor Inv No", "Vendor Inv Date", "Narration", "Charge or GL Name",
+    "Charge or GL Amount", "SAC or HSN", "Taxcode1", "Taxcode1 Amt", "Taxcode2", "Taxcode2 Amt",
+    "Taxcode3", "Taxcode3 Amt", "Taxcode4", "Taxcode4 Amt",
+    "Avail Tax Credit", "Ref No", "Amount",
+]
+
+# Template columns that are the same on every ledger row (others are empty)
+LEDGER_CONSTANTS = {
+    "Organization": "KALE LOGISTICS SOLUTIONS PVT LTD",
+    "Organization Branch": "THANE",
+    "Currency": "INR",
+    "ExchRate": "1",
+    "Charge or GL": "Charge",
+    "DR or CR": "Dr",
+    "Branch": "HO",
+    " Charge Narration": "GATE PASS CHARGES",
+    "TaxGroup": "GSTIN",
+    "Tax Type": "Taxable",
+    "LOB": "CCL IMP",
+    "Round Off": "Yes",
+}
+
+# Bump when the row logic in create_csv changes, so earlier outputs are not reused
+LEDGER_RULES_VERSION = 5
+
+def ledger_rules_fingerprint(charge_rules=None, tax_rates=None):
+    """Hash of the rule set create_csv applies (part of the output reuse key)."""
+    if charge_rules is None:
+        charge_rules = get_charge_rules(os.path.join(app_base_dir(), CHARGE_RULES_FILENAME))
+    if tax_rates is None:
+        tax_rates = get_tax_rates(os.path.join(app_base_dir(), TAX_RATES_FILENAME))
+    rules = [LEDGER_RULES_VERSION, LEDGER_VARIABLE_COLUMNS, LEDGER_CONSTANTS,
+             charge_rules.fingerprint(), tax_rates.fingerprint()]
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+# Where each ledger row came from, added by read_ledger
+SOURCE_COLUMNS = ["Source File", "Source Sheet", "Source Row"]
+
+def read_ledger(path, sheet_name=0):
+    """Read the declared Ledger Report columns (identifiers as text) plus the row's source."""
+    ledger_data = LEDGER_SCHEMA.read(path, sheet_name)
+    ledger_data["Source File"] = os.path.basename(path)
+    ledger_data["Source Sheet"] = sheet_name if isinstance(sheet_name, str) else ""
+    ledger_data["Source Row"] = range(2, len(ledger_data) + 2)  # Excel row numbers (row 1 is the header)
+    return ledger_data
+
+def ledger_sources(paths):
+    """(path, sheet) for every sheet of every selected Ledger Report (sheet 0 for single-sheet workbooks)."""
+    sources = []
+    for path in paths:
+        with pd.ExcelFile(path, engine='openpyxl') as book:
+            sheets = book.sheet_names
+        if len(sheets) > 1:
+            sources.extend((path, sheet) for sheet in sheets)
+        else:
+            sources.append((path, 0))
+    return sources
+
+def source_label(source):
+    """File stem, plus the sheet name for multi-sheet workbooks."""
+    path, sheet = source
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem} {sheet}" if isinstance(sheet, str) else stem
+
+def source_output_paths(output_dir, timestamp, sources):
+    """
+    One "purchase_<timestamp> <label>.csv" per source. A label repeated by
+    ledgers with the same name in different folders gets " (2)", " (3)", ...
+    """
+    paths, used = [], set()
+    for source in sources:
+        label = base = source_label(source)
+        n = 1
+        while label.lower() in used:  # Windows file names are case-insensitive
+            n += 1
+            label = f"{base} ({n})"
+        used.add(label.lower())
+        paths.append(os.path.join(output_dir, f"purchase_{timestamp} {label}.csv"))
+    return paths
+
+def _read_ledger_source(source):
+    path, sheet = source
+    return read_ledger(path, sheet)
+
+def read_ledger_sources(sources, log_callback, max_workers=None):
+    """
+    Read ledger sheets in parallel worker processes. Returns (source, frame)
+    for each readable sheet; sheets without the Ledger Report columns are
+    logged and left out.
+    """
+    workers = min(len(sources), max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_read_ledger_source, source) for source in sources]
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append((future.result(), None))
+                except Exception as e:
+                    outcomes.append((None, e))
+    else:
+        outcomes = []
+        for source in sources:
+            try:
+                outcomes.append((_read_ledger_source(source), None))
+            except Exception as e:
+                outcomes.append((None, e))
+
+    frames = []
+    for source, (df, error) in zip(sources, outcomes):
+        name = source_label(source)
+        if error is not None:
+            log_callback(f"Skipped {name}: {error}")
+            logger.warning(f"Skipped ledger source {name}: {error}")
+        else:
+            log_callback(f"Read {name}: {len(df)} rows")
+            frames.append((source, df))
+    return frames
+
+def write_skip_report(ledger_data, skipped, path):
+    """CSV of skipped rows: source file / sheet / row, Receipt No. and reason."""
+    sources = [ledger_data[c].tolist() if c in ledger_data.columns else [""] * len(ledger_data) for c in SOURCE_COLUMNS]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SOURCE_COLUMNS + ["Receipt No.", "Reason"])
+        for pos, receipt_no, reason in skipped:
+            writer.writerow([column[pos] for column in sources] + [receipt_no, reason])
+    return path
+
+# create_csv outcome when "New rows only" left nothing to write (not a failure)
+NOTHING_NEW = "nothing-new"
+
+def duplicates_report_path(output_path):
+    """Suppressed-duplicates report written next to a ledger output."""
+    return os.path.splitext(output_path)[0] + "_duplicates.csv"
+
 # Function to create CSV
-def create_csv(ledger_data, output_path, log_callback):
+def create_csv(ledger_data, output_path, log_callback, job_index=None, charge_rules=None, tax_rates=None,
+               emitted_index=None, new_rows_only=False, max_rows_per_file=None, xlsx=False):
+    """
+    Write the Logisys purchase CSV for a ledger. If emitted_index is given,
+    the written rows' Receipt No. + BOE No. are recorded in it; with
+    new_rows_only, rows already emitted (in earlier runs or earlier in this
+    ledger) are suppressed and listed in a _duplicates.csv report. With
+    max_rows_per_file, the output is split into numbered parts plus a
+    _manifest.json. With xlsx, a typed .xlsx copy is written next to it.
+
+    Returns True when the CSV was written, NOTHING_NEW when new_rows_only
+    suppressed every valid row, and False on failure.
+    """
     log_callback("Creating CSV file...")
     try:
+        if charge_rules is None:
+            charge_rules = get_charge_rules(os.path.join(app_base_dir(), CHARGE_RULES_FILENAME))
+        if tax_rates is None:
+            tax_rates = get_tax_rates(os.path.join(app_base_dir(), TAX_RATES_FILENAME))
         today = datetime.now().strftime("%d-%b-%Y")  # e.g., 14-Jun-2025
+        template = RowTemplate(LEDGER_VARIABLE_COLUMNS, {**LEDGER_CONSTANTS, "Entry Date": today, "Posting Date": today})
         data_list = []
-        for idx, row in ledger_data.iterrows():
+        row_keys = []  # (Receipt No., BOE No.) per data_list row
+        # Parse the whole Txn Date column up front (cached per distinct value)
+        txn_dates = format_ledger_dates(ledger_data['Txn Date'])
+        # Charge rule per row, matched once per distinct Consignee Name
+        if 'Consignee Name' in ledger_data.columns:
+            charges = charge_rules.classify(ledger_data['Consignee Name'])
+        else:
+            charges = [charge_rules.default] * len(ledger_data)
+        # Inter-state supply per row, looked up once per distinct state / GSTIN value
+        state_column = next((c for c in POSSIBLE_STATE_COLUMNS if c in ledger_data.columns), None)
+        if state_column is not None:
+            interstate = tax_rates.interstate_flags(ledger_data[state_column])
+        else:
+            interstate = [False] * len(ledger_data)
+        skipped = []  # (position, Receipt No., reason) for the skip report
+
+        def skip(pos, receipt_no, reason, message):
+            log_callback(message)
+            logger.warning(message)
+            skipped.append((pos, receipt_no, reason))
+
+        kept = []
+        keys = []
+        for pos, (idx, row) in enumerate(ledger_data.iterrows()):
             # Skip rows with empty or missing Receipt No.
             receipt_no = row.get('Receipt No.')
             if pd.isna(receipt_no) or str(receipt_no).strip() == '':
-                log_callback(f"Skipping row {idx} due to missing Receipt No.: {receipt_no}")
-                logger.warning(f"Skipping row {idx} due to missing Receipt No.: {receipt_no}")
+                skip(pos, "", "Missing Receipt No.", f"Skipping row {idx} due to missing Receipt No.: {receipt_no}")
                 continue
             
             # Skip rows with empty or missing BOE No.
             boe_no = row.get('BOE No.')
             if pd.isna(boe_no) or str(boe_no).strip() == '':
-                log_callback(f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing BOE No.: {boe_no}")
-                logger.warning(f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing BOE No.: {boe_no}")
+                skip(pos, receipt_no, "Missing BOE No.",
+                     f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing BOE No.: {boe_no}")
                 continue
 
             # Handle Txn Date
-            try:
-                txn_date = pd.to_datetime(row['Txn Date'])
-                if pd.isna(txn_date):  # Check for NaT
-                    log_callback(f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing or invalid Txn Date: {row['Txn Date']}")
-                    logger.warning(f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing or invalid Txn Date: {row['Txn Date']}")
-                    continue
-                vendor_inv_date = txn_date.strftime("%d-%b-%Y")
-            except Exception as e:
-                log_callback(f"Skipping row {idx} with Receipt No.: {receipt_no} due to invalid Txn Date: {str(e)}")
-                logger.warning(f"Skipping row {idx} with Receipt No.: {receipt_no} due to invalid Txn Date: {e}")
+            vendor_inv_date, date_error = txn_dates[pos]
+            if date_error:
+                skip(pos, receipt_no, f"Invalid Txn Date: {date_error}",
+                     f"Skipping row {idx} with Receipt No.: {receipt_no} due to invalid Txn Date: {date_error}")
+                continue
+            if vendor_inv_date is None:  # Missing value or NaT
+                skip(pos, receipt_no, "Missing or invalid Txn Date",
+                     f"Skipping row {idx} with Receipt No.: {receipt_no} due to missing or invalid Txn Date: {row['Txn Date']}")
                 continue
 
-            # Custom logic for ABBOTT HEALTHCARE PRIVATE LIMITED
-            consignee_name = row.get('Consignee Name', '').strip()
-            # Match any Consignee Name that starts with 'ABBOTT HEALTHCARE' (case-insensitive)
-            if consignee_name.upper().startswith("ABBOTT HEALTHCARE"):
-                charge_or_gl_name = "GATE PASS CHARGES - REIM"
-                charge_or_gl_amount = "336"
-                taxcode1 = ""
-                taxcode1_amt = ""
-                taxcode2 = ""
-                taxcode2_amt = ""
-                amount = "336"
-                avail_tax_credit = "No"
-            else:
-                charge_or_gl_name = "GATE PASS CHARGES CCL"
-                charge_or_gl_amount = "285"
-                taxcode1 = "Central GST"
-                taxcode1_amt = "25.65"
-                taxcode2 = "State GST"
-                taxcode2_amt = "25.65"
-                avail_tax_credit = "100"
-                amount = "285"
-
-            job_no = get_job_number(boe_no, log_callback)
+            charge = charges[pos]
+            job_no = get_job_number(boe_no, log_callback, job_index)
             if job_no and job_no != "NA":
                 narration = f"Being Entry posted for Gatepass / Kale Logistics / {job_no}"
             else:
                 narration = "Being Entry posted for Gatepass / Kale Logistics"
-            data = {
-                "Entry Date": today,
-                "Posting Date": today,
-                "Organization": "KALE LOGISTICS SOLUTIONS PVT LTD",
-                "Organization Branch": "THANE",
-                "Vendor Inv No": receipt_no,
-                "Vendor Inv Date": vendor_inv_date,
-                "Currency": "INR",
-                "ExchRate": "1",
-                "Narration": narration,
-                "Due Date": "",
-                "Charge or GL": "Charge",
-                "Charge or GL Name": charge_or_gl_name,
-                "Charge or GL Amount": charge_or_gl_amount,
-                "DR or CR": "Dr",
-                "Cost Center": "",
-                "Branch": "HO",
-                " Charge Narration": "GATE PASS CHARGES",
-                "TaxGroup": "GSTIN",
-                "Tax Type": "Taxable",
-                "SAC or HSN": "996712",
-                "Taxcode1": taxcode1,
-                "Taxcode1 Amt": taxcode1_amt,
-                "Taxcode2": taxcode2,
-                "Taxcode2 Amt": taxcode2_amt,
-                "Taxcode3": "",
-                "Taxcode3 Amt": "",
-                "Taxcode4": "",
-                "Taxcode4 Amt": "",
-                "Avail Tax Credit": avail_tax_credit,
-                "LOB": "CCL IMP",
-                "Ref Type": "",
-                "Ref No": job_no,
-                "Amount": amount,
-                "Start Date": "",
-                "End Date": "",
-                "WH Tax Code": "",
-                "WH Tax Percentage": "",
-                "WH Tax Taxable": "",
-                "WH Tax Amount": "",
-                "Round Off": "Yes",
-                "CC Code": ""
-            }
-            data_list.append(data)
+            kept.append((pos, idx, receipt_no, vendor_inv_date, narration, charge, job_no, interstate[pos]))
+            keys.append((str(receipt_no).strip().upper(), str(boe_no).strip().upper()))
+
+        # Tax stage: GST for rate-table charges, computed once per distinct
+        # (SAC, amount, rate period, supply type)
+        taxes = tax_rates.compute(
+            [charge.sac for *_, charge, _, _ in kept],
+            [charge.amount for *_, charge, _, _ in kept],
+            [parse_txn_date(d) if charge.sac else None for _, _, _, d, _, charge, _, _ in kept],
+            [inter for *_, inter in kept],
+        )
+        for (pos, idx, receipt_no, vendor_inv_date, narration, charge, job_no, _), tax, key in zip(kept, taxes, keys):
+            if tax is None:
+                skip(pos, receipt_no, f"No GST rate for SAC {charge.sac} on {vendor_inv_date}",
+                     f"Skipping row {idx} with Receipt No.: {receipt_no} due to no GST rate for SAC {charge.sac} on {vendor_inv_date}")
+                continue
+            if not charge.sac:  # Fixed tax codes from the charge rule
+                tax = (charge.taxcode1, charge.taxcode1_amt, charge.taxcode2, charge.taxcode2_amt, "", "", "", "")
+            data_list.append((
+                receipt_no,
+                vendor_inv_date,
+                narration,
+                charge.charge_name,
+                charge.amount,
+                charge.output_sac,
+                *tax,
+                charge.avail_tax_credit,
+                "" if pd.isna(job_no) else job_no,  # Blank cell, as DataFrame.to_csv wrote NaN
+                charge.amount,
+            ))
+            row_keys.append(key)
+
+        if skipped:
+            report_path = write_skip_report(ledger_data, skipped, os.path.splitext(output_path)[0] + "_skipped.csv")
+            log_callback(f"Skipped {len(skipped)} invalid row(s): {report_path}")
+
+        if emitted_index is not None:
+            if new_rows_only:
+                # One set-based anti-join of this ledger's keys against the history
+                flags = emitted_index.filter_new(row_keys)
+                data_list = [row for row, new in zip(data_list, flags) if new]
+                if emitted_index.suppressed:
+                    report_path = emitted_index.write_report(duplicates_report_path(output_path))
+                    log_callback(f"Skipped {len(emitted_index.suppressed)} row(s) already emitted: {report_path}")
+                    logger.info(f"Suppressed {len(emitted_index.suppressed)} duplicate ledger row(s): {report_path}")
+            else:
+                emitted_index.mark_emitted(row_keys)
         if not data_list:
+            if new_rows_only and emitted_index is not None and emitted_index.suppressed:
+                log_callback("Every valid row was already emitted - nothing new to write.")
+                return NOTHING_NEW
             log_callback("No valid rows to process for CSV creation.")
             logger.warning("No valid rows to process for CSV creation.")
             return False
-        df = pd.DataFrame(data_list)
-        df.to_csv(output_path, index=False)
-        log_callback(f"CSV saved to {output_path} with {len(data_list)} records")
+        # Same bytes as the former DataFrame.to_csv (platform line endings)
+        rows = template.rows(data_list)
+        if max_rows_per_file:
+            # One row per receipt, so any row boundary is a valid split point
+            parts = write_parts(template, output_path, rows, [1] * len(rows),
+                                max_rows_per_file, lineterminator=os.linesep)
+        else:
+            template.write_csv(output_path, rows, lineterminator=os.linesep)
+        if xlsx:
+            xlsx_path = write_xlsx(os.path.splitext(output_path)[0] + ".xlsx", template, rows, "Purchase")
+            log_callback(f"Excel copy saved to {xlsx_path}")
+        if emitted_index is not None:
+            emitted_index.commit()
+        if max_rows_per_file:
+            log_callback(f"CSV saved to {len(parts)} part(s) of {output_path} with {len(data_list)} records "
+                         f"(manifest: {os.path.basename(manifest_path(output_path))})")
+        else:
+            log_callback(f"CSV saved to {output_path} with {len(data_list)} records")
         return True
     except Exception as e:
         log_callback(f"Failed to create CSV: {str(e)}")
@@ -256,9 +459,14 @@ class LedgerApp:
         self.root.configure(bg=BG_COLOR)
 
         # Variables
-        self.ledger_path = None
-        self.job_register_path = None
+        self.ledger_paths = []
+        self.job_register_paths = []
         self._logo_image = None
+        self.force_recompute = tk.BooleanVar(value=False)
+        self.new_rows_only = tk.BooleanVar(value=False)
+        self.output_per_source = tk.BooleanVar(value=False)
+        self.max_rows_per_file = tk.IntVar(value=0)  # 0 = no limit
+        self.write_xlsx = tk.BooleanVar(value=False)
 
         # Setup Styles
         self._setup_styles()
@@ -320,6 +528,14 @@ class LedgerApp:
             foreground=[("disabled", "#FFFFFF")],
         )
 
+        # Checkbutton
+        style.configure(
+            "Modern.TCheckbutton",
+            background=BG_COLOR,
+            foreground=TEXT_PRIMARY,
+            font=("Segoe UI", 9),
+        )
+
     def _create_widgets(self):
         # MAIN CONTAINER
         main_frame = tk.Frame(self.root, bg=BG_COLOR)
@@ -386,6 +602,7 @@ class LedgerApp:
         btn_frame.pack(fill=tk.X)
 
         ttk.Button(btn_frame, text="Select Job Register", command=self.select_job_register, style="Modern.TButton").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="Select Register Folder", command=self.select_job_register_folder, style="Modern.TButton").pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(btn_frame, text="Select Ledger Report", command=self.select_ledger, style="Modern.TButton").pack(side=tk.LEFT)
 
         # Action Area
@@ -400,6 +617,33 @@ class LedgerApp:
         )
         self.process_button.pack(side=tk.LEFT, padx=(0, 20))
 
+        ttk.Checkbutton(
+            action_frame, text="Force recompute",
+            variable=self.force_recompute, style="Modern.TCheckbutton",
+        ).pack(side=tk.LEFT, padx=(0, 20))
+
+        ttk.Checkbutton(
+            action_frame, text="New rows only",
+            variable=self.new_rows_only, style="Modern.TCheckbutton",
+        ).pack(side=tk.LEFT, padx=(0, 20))
+
+        ttk.Checkbutton(
+            action_frame, text="One output per sheet",
+            variable=self.output_per_source, style="Modern.TCheckbutton",
+        ).pack(side=tk.LEFT, padx=(0, 20))
+
+        tk.Label(action_frame, text="Max rows per file (0 = no limit):", fg=TEXT_SECONDARY, bg=BG_COLOR,
+                 font=("Segoe UI", 9)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(
+            action_frame, from_=0, to=100000, increment=100, width=8,
+            textvariable=self.max_rows_per_file,
+        ).pack(side=tk.LEFT, padx=(0, 20))
+
+        ttk.Checkbutton(
+            action_frame, text="Also write .xlsx",
+            variable=self.write_xlsx, style="Modern.TCheckbutton",
+        ).pack(side=tk.LEFT, padx=(0, 20))
+
         self.status_label_main = tk.Label(action_frame, text="Ready", fg=TEXT_SECONDARY, bg=BG_COLOR, font=("Segoe UI", 9))
         self.status_label_main.pack(side=tk.LEFT)
 
@@ -438,32 +682,50 @@ class LedgerApp:
         self.root.update()
 
     def select_job_register(self):
-        global JOB_REGISTER_PATH
-        csv_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx")])
-        if not csv_path:
+        csv_paths = filedialog.askopenfilenames(filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx")])
+        if not csv_paths:
             self.log("No Job Register file selected.")
             return
-        JOB_REGISTER_PATH = csv_path
-        self.job_register_path = csv_path
-        self.job_status_label.config(text=f"Job Register: {os.path.basename(csv_path)}", fg=TEXT_PRIMARY)
-        self.log(f"Selected Job Register: {os.path.basename(csv_path)}")
-        logger.info(f"Job Register file selected: {csv_path}")
+        self._set_job_registers(resolve_register_paths(csv_paths))
+
+    def select_job_register_folder(self):
+        folder = filedialog.askdirectory()
+        if not folder:
+            self.log("No Job Register folder selected.")
+            return
+        paths = resolve_register_paths([folder])
+        if not paths:
+            self.log(f"No .csv or .xlsx Job Register files in {folder}")
+            messagebox.showerror("Error", f"No .csv or .xlsx Job Register files in {folder}")
+            return
+        self._set_job_registers(paths)
+
+    def _set_job_registers(self, paths):
+        global JOB_REGISTER_PATHS
+        JOB_REGISTER_PATHS = list(paths)
+        self.job_register_paths = list(paths)
+        names = ", ".join(os.path.basename(p) for p in paths)
+        label = names if len(paths) <= 3 else f"{len(paths)} files ({os.path.basename(paths[0])}, ...)"
+        self.job_status_label.config(text=f"Job Register: {label}", fg=TEXT_PRIMARY)
+        self.log(f"Selected Job Register(s): {names}")
+        logger.info(f"Job Register files selected: {paths}")
 
     def select_ledger(self):
-        global JOB_REGISTER_PATH
-        if JOB_REGISTER_PATH is None:
+        if not JOB_REGISTER_PATHS:
             self.status_label_main.config(text="Please select Job Register first.", fg=ERROR_RED)
             self.log("Job Register file not selected.")
             messagebox.showerror("Error", "Please select Job Register file before selecting Ledger Report.")
             return
-        ledger_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
-        if not ledger_path:
+        ledger_paths = filedialog.askopenfilenames(filetypes=[("Excel files", "*.xlsx")])
+        if not ledger_paths:
             self.log("No Ledger Report selected.")
             return
-        self.ledger_path = ledger_path
-        self.ledger_status_label.config(text=f"Ledger Report: {os.path.basename(ledger_path)}", fg=TEXT_PRIMARY)
-        self.log(f"Selected Ledger Report: {os.path.basename(ledger_path)}")
-        logger.info(f"Ledger Report selected: {ledger_path}")
+        self.ledger_paths = list(ledger_paths)
+        names = ", ".join(os.path.basename(p) for p in ledger_paths)
+        label = names if len(ledger_paths) <= 3 else f"{len(ledger_paths)} files ({os.path.basename(ledger_paths[0])}, ...)"
+        self.ledger_status_label.config(text=f"Ledger Report: {label}", fg=TEXT_PRIMARY)
+        self.log(f"Selected Ledger Report(s): {names}")
+        logger.info(f"Ledger Reports selected: {ledger_paths}")
 
     def process_files(self):
         self.log_text.config(state='normal')
@@ -471,14 +733,21 @@ class LedgerApp:
         self.log_text.config(state='disabled')
         logger.info("Starting file processing")
         
-        if not self.ledger_path:
+        if not self.ledger_paths:
             messagebox.showerror("Error", "Please select a Ledger Report")
             self.log("No Ledger Report selected.")
             return
-        if not self.job_register_path:
+        if not self.job_register_paths:
             messagebox.showerror("Error", "Please select a Job Register file")
             self.log("No Job Register file selected.")
             return
+        try:
+            max_rows = self.max_rows_per_file.get()
+        except tk.TclError:
+            max_rows = -1
+        if max_rows < 0:
+            messagebox.showerror("Error", "Max rows per file must be a whole number (0 = no limit)")
+            return
             
         self.status_label_main.config(text="Processing...", fg=ACCENT)
         self.process_button.state(['disabled'])
@@ -486,24 +755,76 @@ class LedgerApp:
         self.root.update()
 
         # Create output directory
-        if getattr(sys, 'frozen', False):
-            base_dir = os.path.dirname(sys.executable)
-        else:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-        output_dir = os.path.join(base_dir, 'Kale Output')
+        output_dir = os.path.join(app_base_dir(), 'Kale Output')
         os.makedirs(output_dir, exist_ok=True)
         logger.info(f"Output directory: {output_dir}")
+        per_source = self.output_per_source.get()
+
+        # Charge rules and tax rates, loaded once for the reuse key and every output
+        try:
+            charge_rules = get_charge_rules(os.path.join(app_base_dir(), CHARGE_RULES_FILENAME))
+            tax_rates = get_tax_rates(os.path.join(app_base_dir(), TAX_RATES_FILENAME))
+        except (OSError, ValueError) as e:
+            self.log(f"Failed to load charge rules / tax rates: {str(e)}")
+            logger.error(f"Failed to load charge rules / tax rates: {e}")
+            self.status_label_main.config(text="Error loading rules", fg=ERROR_RED)
+            messagebox.showerror("Error", f"Failed to load charge rules / tax rates: {str(e)}")
+            self.process_button.state(['!disabled'])
+            return
 
-        # Generate output CSV path
+        # Reuse today's output if the same Ledgers and Job Registers were already converted
+        # (never in "New rows only" mode: the earlier output's rows were already uploaded)
+        output_index = OutputIndex(output_dir)
+        conversion = None
+        if not per_source and not self.new_rows_only.get():
+            try:
+                rules = ledger_rules_fingerprint(charge_rules, tax_rates)
+                if max_rows:
+                    rules += f":max-rows={max_rows}"
+                if self.write_xlsx.get():
+                    rules += ":xlsx"
+                conversion = conversion_key(self.ledger_paths + self.job_register_paths, rules)
+            except OSError as e:
+                logger.warning(f"Could not hash input files: {e}")
+        if conversion and not self.force_recompute.get():
+            previous_csv = output_index.lookup(conversion)
+            if previous_csv:
+                self.log(f"Inputs unchanged since {os.path.basename(previous_csv)} - reusing it (tick 'Force recompute' to regenerate)")
+                logger.info(f"Reused output: {previous_csv}")
+                self.status_label_main.config(text="Completed (reused existing output)", fg=SUCCESS_GREEN)
+                messagebox.showinfo("Success", f"CSV saved to {previous_csv}")
+                self.process_button.state(['!disabled'])
+                return
+
+        # Read every sheet of every Ledger Report (in parallel worker processes)
+        try:
+            sources = ledger_sources(self.ledger_paths)
+            frames = read_ledger_sources(sources, self.log)
+            if not frames:
+                raise ValueError("No sheet has the Ledger Report columns")
+            self.log(f"Loaded Ledger Report: {sum(len(df) for _, df in frames)} rows from {len(frames)} sheet(s)")
+        except Exception as e:
+            self.log(f"Failed to load Ledger Report: {str(e)}")
+            self.status_label_main.config(text="Error loading file", fg=ERROR_RED)
+            messagebox.showerror("Error", f"Failed to load Ledger Report: {str(e)}")
+            self.process_button.state(['!disabled'])
+            return
+
+        # Generate output CSV path(s)
         timestamp = datetime.now().strftime("%d-%m-%y %H-%M")
-        output_csv = os.path.join(output_dir, f"purchase_{timestamp}.csv")
-        logger.info(f"Output CSV: {output_csv}")
+        if per_source:
+            paths = source_output_paths(output_dir, timestamp, [source for source, _ in frames])
+            outputs = [(path, df) for path, (_, df) in zip(paths, frames)]
+        else:
+            outputs = [(os.path.join(output_dir, f"purchase_{timestamp}.csv"), pd.concat([df for _, df in frames], ignore_index=True))]
+        logger.info(f"Output CSV(s): {[path for path, _ in outputs]}")
 
         # Check if CSV exists
-        if os.path.exists(output_csv):
+        existing = [os.path.basename(path) for path, _ in outputs if os.path.exists(path)]
+        if existing:
             response = messagebox.askyesno(
                 "File Exists",
-                f"CSV file {os.path.basename(output_csv)} already exists. Overwrite?",
+                f"CSV file {', '.join(existing)} already exists. Overwrite?",
                 parent=self.root
             )
             if not response:
@@ -512,22 +833,48 @@ class LedgerApp:
                 self.process_button.state(['!disabled'])
                 return
 
-        # Read Ledger Report
+        # Index the Job Register(s) once for all ledgers
         try:
-            ledger_data = pd.read_excel(self.ledger_path, engine='openpyxl')
-            self.log(f"Loaded Ledger Report: {len(ledger_data)} rows")
+            job_index = load_job_registers(self.job_register_paths, self.log)
         except Exception as e:
-            self.log(f"Failed to load Ledger Report: {str(e)}")
+            self.log(f"Error reading Job Register file: {str(e)}")
+            logger.error(f"Error reading Job Register file: {e}")
             self.status_label_main.config(text="Error loading file", fg=ERROR_RED)
-            messagebox.showerror("Error", f"Failed to load Ledger Report: {str(e)}")
+            messagebox.showerror("Error", f"Failed to load Job Register: {str(e)}")
             self.process_button.state(['!disabled'])
             return
 
-        # Create CSV
-        if create_csv(ledger_data, output_csv, self.log):
+        # Create CSV(s) (every written row is recorded; "New rows only" skips rows written before)
+        generated = []
+        nothing_new = []  # Duplicate reports of outputs whose rows were all emitted before
+        for output_csv, ledger_data in outputs:
+            emitted_index = open_ledger_index(os.path.join(app_base_dir(), LEDGER_HISTORY_DB))
+            result = create_csv(ledger_data, output_csv, self.log, job_index=job_index,
+                                charge_rules=charge_rules, tax_rates=tax_rates,
+                                emitted_index=emitted_index, new_rows_only=self.new_rows_only.get(),
+                                max_rows_per_file=max_rows or None, xlsx=self.write_xlsx.get())
+            if result == NOTHING_NEW:
+                nothing_new.append(duplicates_report_path(output_csv))
+            elif result:
+                # Split output is identified by its manifest (the parts are listed there)
+                generated.append(manifest_path(output_csv) if max_rows else output_csv)
+                self.log(f"CSV generated: {os.path.basename(generated[-1])}")
+        if generated and conversion:
+            output_index.record(conversion, generated[0])
+
+        if nothing_new and not generated and len(nothing_new) == len(outputs):
+            self.status_label_main.config(text="Completed - nothing new", fg=SUCCESS_GREEN)
+            messagebox.showinfo("Nothing New", "Every row was already emitted in an earlier run; no CSV was written.\n"
+                                "Skipped rows are listed in:\n" + "\n".join(nothing_new))
+        elif len(generated) + len(nothing_new) == len(outputs):
             self.status_label_main.config(text="Completed Successfully", fg=SUCCESS_GREEN)
-            self.log(f"CSV generated: {os.path.basename(output_csv)}")
-            messagebox.showinfo("Success", f"CSV saved to {output_csv}")
+            message = "CSV saved to " + "\n".join(generated)
+            if nothing_new:
+                message += "\n\nNothing new (already emitted):\n" + "\n".join(nothing_new)
+            messagebox.showinfo("Success", message)
+        elif generated:
+            self.status_label_main.config(text="Completed with errors", fg=ERROR_RED)
+            messagebox.showwarning("Partial Success", f"{len(generated)} of {len(outputs)} CSV files generated:\n" + "\n".join(generated))
         else:
             self.status_label_main.config(text="Failed", fg=ERROR_RED)
             self.log("Failed to generate CSV.")
@@ -548,4 +895,6 @@ def main():
         messagebox.showerror("Error", f"Application error: {e}")
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # Ledgers and Job Registers are read in worker processes
     main()
@@ -0,0 +1,265 @@
+"""
+Benchmarks for the Invoice Parser and Ledger converter.
+
+Usage:
+    python benchmarks.py extractors <pdf or folder> [...]
+    python benchmarks.py normalize [--count N]
+    python benchmarks.py template [--rows N]
+    python benchmarks.py xlsx [--rows N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+# Fields compared against the pdfplumber reference parse
+ACCURACY_FIELDS = [
+    "invoice_number", "invoice_date", "customer_gstin", "vendor_gstin",
+    "taxable_value", "non_taxable_value", "cgst_amount", "sgst_amount",
+    "igst_amount", "total_amount", "pnr",
+]
+
+
+def collect_pdfs(paths: List[str]) -> List[str]:
+    """Expand folders into the PDF files they contain."""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(".pdf"):
+                    pdfs.append(os.path.join(path, name))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+
+def bench_extractors(pdf_paths: List[str]) -> None:
+    """Compare pages/second and field accuracy per airline for each text backend."""
+    from invoice_processor import (
+        TEXT_EXTRACTORS, REFERENCE_TEXT_BACKEND, detect_invoice_type,
+        fix_split_numbers, parse_text,
+    )
+
+    reference = {}
+    # stats[backend][airline] = [pages, seconds, fields_matched, fields_total]
+    stats: Dict[str, Dict[str, list]] = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0, 0]))
+
+    backends = [REFERENCE_TEXT_BACKEND] + [b for b in TEXT_EXTRACTORS if b != REFERENCE_TEXT_BACKEND]
+    for backend in backends:
+        extractor = TEXT_EXTRACTORS[backend]
+        for pdf_path in pdf_paths:
+            try:
+                start = time.perf_counter()
+                pages = [fix_split_numbers(t) for t in extractor.iter_page_texts(pdf_path)]
+                elapsed = time.perf_counter() - start
+            except ImportError:
+                print(f"{backend}: not installed, skipped")
+                break
+            text = "".join(t + "\n" for t in pages if t)
+            data = parse_text(text, detect_invoice_type(os.path.basename(pdf_path)))
+
+            if backend == REFERENCE_TEXT_BACKEND:
+                reference[pdf_path] = data
+            ref = reference[pdf_path]
+            airline = ref.airline or "UNKNOWN"
+
+            row = stats[backend][airline]
+            row[0] += len(pages)
+            row[1] += elapsed
+            for name in ACCURACY_FIELDS:
+                row[2] += getattr(data, name) == getattr(ref, name)
+                row[3] += 1
+
+    print(f"{'Backend':<12} {'Airline':<20} {'Pages':>6} {'Pages/s':>9} {'Accuracy':>9}")
+    for backend, airlines in stats.items():
+        for airline, (pages, seconds, matched, total) in sorted(airlines.items()):
+            rate = pages / seconds if seconds else 0.0
+            accuracy = 100.0 * matched / total if total else 0.0
+            print(f"{backend:<12} {airline:<20} {pages:>6} {rate:>9.1f} {accuracy:>8.1f}%")
+
+
+def _reference_parse_date(date_str: str) -> str:
+    """The former strptime loop, kept as the benchmark baseline."""
+    from datetime import datetime
+    if not date_str:
+        return ""
+    date_str = date_str.strip()
+    for fmt in ["%d/%m/%Y", "%d-%m-%Y", "%d-%b-%Y", "%d-%B-%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y"]:
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%d-%b-%Y")
+        except ValueError:
+            continue
+    return date_str
+
+
+def _reference_parse_amount(amount_str: str) -> float:
+    """The former re.sub-based amount parser, kept as the benchmark baseline."""
+    import re
+    if not amount_str:
+        return 0.0
+    try:
+        return float(re.sub(r'[₹$,%\s]', '', str(amount_str)))
+    except ValueError:
+        return 0.0
+
+
+def _time_per_call(func, values: list, repeat: int = 3) -> float:
+    """Best-of-repeat microseconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for v in values:
+            func(v)
+        best = min(best, time.perf_counter() - start)
+    return best / len(values) * 1e6
+
+
+def bench_normalize(count: int) -> None:
+    """Micro-benchmarks for the normalization kernels against the former implementations."""
+    import random
+    from normalize import parse_amount, parse_date_to_standard, _parse_date_cached
+
+    random.seed(0)
+    # Invoice-like mix: dates repeat heavily across a batch, the last layout sniffs last
+    date_pool = [f"{d:02d}/{m:02d}/2025" for d in range(1, 29) for m in range(1, 13)]
+    date_pool += [f"{d} Oct 2025" for d in range(1, 29)]
+    dates = [random.choice(date_pool) for _ in range(count)]
+    amounts = [f"{random.randint(0, 99999):,}.{random.randint(0, 99):02d}" for _ in range(count)]
+
+    print(f"{'Kernel':<36} {'us/call':>9}")
+    print(f"{'parse_date_to_standard (strptime)':<36} {_time_per_call(_reference_parse_date, dates):>9.2f}")
+    _parse_date_cached.cache_clear()
+    print(f"{'parse_date_to_standard (sniff+LRU)':<36} {_time_per_call(parse_date_to_standard, dates):>9.2f}")
+    print(f"{'parse_amount (re.sub)':<36} {_time_per_call(_reference_parse_amount, amounts):>9.2f}")
+    print(f"{'parse_amount (fast path+translate)':<36} {_time_per_call(parse_amount, amounts):>9.2f}")
+
+    try:
+        import pandas as pd
+    except ImportError:
+        print("pandas not installed: ledger date benchmark skipped")
+        return
+    from normalize import format_ledger_dates, _to_datetime_cached
+
+    column = pd.Series(random.choice(pd.date_range("2025-04-01", periods=90).strftime("%d-%m-%Y").tolist())
+                       for _ in range(count))
+    start = time.perf_counter()
+    for value in column:
+        try:
+            pd.to_datetime(value).strftime("%d-%b-%Y")
+        except Exception:
+            pass
+    per_row = time.perf_counter() - start
+    _to_datetime_cached.cache_clear()
+    start = time.perf_counter()
+    format_ledger_dates(column)
+    cached = time.perf_counter() - start
+    print(f"{'Txn Date per-row pd.to_datetime':<36} {per_row / count * 1e6:>9.2f}")
+    print(f"{'Txn Date format_ledger_dates':<36} {cached / count * 1e6:>9.2f}")
+
+
+def bench_template(rows: int) -> None:
+    """Write N template rows with per-row dicts + DictWriter versus RowTemplate + writerows."""
+    import csv
+    import filecmp
+    import tempfile
+    from logisys_template import CSV_HEADERS, RowTemplate
+
+    variable = ["Vendor Inv No", "Vendor Inv Date", "Narration", "Charge or GL Amount", "Ref No", "Amount"]
+    constants = {"Currency": "INR", "ExchRate": "1", "DR or CR": "Dr", "Round Off": "Yes"}
+    template = RowTemplate(variable, constants)
+    values = [(f"R{i}", "14-May-2025", f"Being Entry posted / JOB{i % 997}", "285", f"JOB{i % 997}", "285")
+              for i in range(rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dict_path = os.path.join(tmp, "dict.csv")
+        start = time.perf_counter()
+        with open(dict_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
+            writer.writeheader()
+            for v in values:
+                row = {h: "" for h in CSV_HEADERS}
+                row.update(constants)
+                row.update(zip(variable, v))
+                writer.writerow(row)
+        dict_seconds = time.perf_counter() - start
+
+        template_path = os.path.join(tmp, "template.csv")
+        start = time.perf_counter()
+        template.write_csv(template_path, template.rows(values))
+        template_seconds = time.perf_counter() - start
+
+        identical = filecmp.cmp(dict_path, template_path, shallow=False)
+
+    print(f"{'Writer':<28} {'Seconds':>8} {'Rows/s':>11}")
+    print(f"{'dict + DictWriter':<28} {dict_seconds:>8.2f} {rows / dict_seconds:>11,.0f}")
+    print(f"{'RowTemplate + writerows':<28} {template_seconds:>8.2f} {rows / template_seconds:>11,.0f}")
+    print(f"Output identical: {identical}")
+
+
+def bench_xlsx(rows: int) -> None:
+    """Write N ledger-shaped template rows as CSV versus the streaming xlsx writer."""
+    import tempfile
+    from logisys_template import RowTemplate
+    from xlsx_output import write_xlsx
+
+    variable = ["Vendor Inv No", "Vendor Inv Date", "Narration", "Charge or GL Amount",
+                "Taxcode1", "Taxcode1 Amt", "Ref No", "Amount"]
+    constants = {"Entry Date": "14-May-2025", "Posting Date": "14-May-2025", "Currency": "INR",
+                 "ExchRate": "1", "DR or CR": "Dr", "SAC or HSN": "996712", "Round Off": "Yes"}
+    template = RowTemplate(variable, constants)
+    values = [(f"R{i}", "14-May-2025", f"Being Entry posted / JOB{i % 997}", "285",
+               "Integrated GST", "51.30", f"JOB{i % 997}", "285") for i in range(rows)]
+    built = template.rows(values)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        template.write_csv(os.path.join(tmp, "out.csv"), built)
+        csv_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        write_xlsx(os.path.join(tmp, "out.xlsx"), template, built)
+        xlsx_seconds = time.perf_counter() - start
+
+    print(f"{'Writer':<28} {'Seconds':>8} {'Rows/s':>11}")
+    print(f"{'RowTemplate CSV':<28} {csv_seconds:>8.2f} {rows / csv_seconds:>11,.0f}")
+    print(f"{'Streaming xlsx':<28} {xlsx_seconds:>8.2f} {rows / xlsx_seconds:>11,.0f}")
+    print(f"xlsx / CSV: {xlsx_seconds / csv_seconds:.1f}x")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extractors", help="Text backend pages/s and field accuracy per airline")
+    p.add_argument("paths", nargs="+", help="PDF files or folders")
+
+    p = sub.add_parser("normalize", help="Date/amount normalization micro-benchmarks")
+    p.add_argument("--count", type=int, default=100000, help="Values per kernel")
+
+    p = sub.add_parser("template", help="41-column template row writing throughput")
+    p.add_argument("--rows", type=int, default=1000000, help="Rows to write")
+
+    p = sub.add_parser("xlsx", help="Streaming xlsx output versus CSV")
+    p.add_argument("--rows", type=int, default=100000, help="Rows to write")
+
+    args = parser.parse_args(argv)
+    if args.command == "normalize":
+        bench_normalize(args.count)
+    elif args.command == "template":
+        bench_template(args.rows)
+    elif args.command == "xlsx":
+        bench_xlsx(args.rows)
+    elif args.command == "extractors":
+        pdfs = collect_pdfs(args.paths)
+        if not pdfs:
+            print("No PDF files found.")
+            return 1
+        bench_extractors(pdfs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
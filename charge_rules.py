@@ -0,0 +1,216 @@
+"""
+Charge Rules
+Consignee-based charge rules for the Ledger converter, loaded from a JSON
+config file. Prefix rules are compiled into one prefix trie and regex rules
+into one combined regex; the first matching rule (in file order) wins. Each
+distinct consignee name is classified once, and the cost per name barely
+grows with the number of rules.
+
+Config format (charge_rules.json):
+
+    {
+      "rules": [
+        {"name": "...", "prefix": "ABBOTT HEALTHCARE",       <- or "regex": "..."
+         "charge_name": "...", "amount": "336",
+         "taxcode1": "", "taxcode1_amt": "", "taxcode2": "", "taxcode2_amt": "",
+         "avail_tax_credit": "No"}
+      ],
+      "default": {"charge_name": "...", "amount": "285", "sac": "996712", ...}
+    }
+
+A rule with a "sac" gets its tax codes and amounts from the GST rate table
+(tax_rates.py) instead of fixed taxcode fields; a rule with neither is untaxed.
+The SAC or HSN column is the rule's "sac_or_hsn", else its "sac", else 996712
+(the code every gate pass row carried before the rules existed).
+
+Prefixes are matched case-insensitively against the stripped Consignee Name;
+regexes are matched (case-insensitively) from the start of the name.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional
+
+# SAC or HSN for rules without a rate-table SAC
+DEFAULT_SAC_OR_HSN = "996712"
+
+
+@dataclass(frozen=True)
+class ChargeRule:
+    """Charge columns applied to ledger rows whose Consignee Name matches."""
+    charge_name: str
+    amount: str
+    taxcode1: str = ""
+    taxcode1_amt: str = ""
+    taxcode2: str = ""
+    taxcode2_amt: str = ""
+    avail_tax_credit: str = ""
+    sac: str = ""
+    sac_or_hsn: str = ""
+    name: str = ""
+    prefix: str = ""
+    regex: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChargeRule":
+        """
+        Raises:
+            ValueError: Unknown or missing keys
+        """
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown charge rule keys: {sorted(unknown)}")
+        missing = [k for k in ("charge_name", "amount") if k not in data]
+        if missing:
+            raise ValueError(f"Charge rule {data.get('name', '')!r} is missing {missing}")
+        return cls(**{k: str(v) for k, v in data.items()})
+
+    @property
+    def output_sac(self) -> str:
+        """Value of the SAC or HSN column for rows charged by this rule."""
+        return self.sac_or_hsn or self.sac or DEFAULT_SAC_OR_HSN
+
+
+# The original hard-coded branch: Abbott gate passes are reimbursed without
+# GST, everything else is 285 taxed at the SAC 996712 rate (9% CGST + 9% SGST)
+DEFAULT_RULES = [
+    ChargeRule(
+        name="Abbott Healthcare (reimbursement, no GST)",
+        prefix="ABBOTT HEALTHCARE",
+        charge_name="GATE PASS CHARGES - REIM",
+        amount="336",
+        avail_tax_credit="No",
+    ),
+]
+DEFAULT_CHARGE = ChargeRule(
+    name="Default",
+    charge_name="GATE PASS CHARGES CCL",
+    amount="285",
+    sac="996712",
+    avail_tax_credit="100",
+)
+
+
+class ChargeRuleSet:
+    """Ordered charge rules compiled into a prefix trie and one regex, plus the fallback charge."""
+
+    def __init__(self, rules: List[ChargeRule], default: ChargeRule = DEFAULT_CHARGE):
+        """
+        Raises:
+            ValueError: A rule has neither (or both) prefix and regex, an invalid
+                regex, or both a SAC and fixed tax codes
+        """
+        self.rules = list(rules)
+        self.default = default
+        for i, rule in enumerate(self.rules + [default]):
+            if rule.sac and (rule.taxcode1 or rule.taxcode1_amt or rule.taxcode2 or rule.taxcode2_amt):
+                raise ValueError(f"Charge rule {rule.name or i!r} has a 'sac' (rate table tax) and fixed tax codes")
+        self._trie: Dict[str, Any] = {}  # upper-cased prefix chars -> node; "" key = rule index
+        alternatives = []
+        for i, rule in enumerate(self.rules):
+            if bool(rule.prefix) == bool(rule.regex):
+                raise ValueError(f"Charge rule {rule.name or i!r} needs exactly one of 'prefix' or 'regex'")
+            if rule.prefix:
+                node = self._trie
+                for ch in rule.prefix.upper():
+                    node = node.setdefault(ch, {})
+                node.setdefault("", i)  # Earlier rule wins for a repeated prefix
+            else:
+                alternatives.append(f"(?P<r{i}>(?:{rule.regex}))")
+        try:
+            self._pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        except re.error as e:
+            raise ValueError(f"Invalid charge rule regex: {e}") from e
+
+    def fingerprint(self) -> str:
+        """Hash of the rules, for output reuse keys."""
+        payload = {"rules": [asdict(r) for r in self.rules], "default": asdict(self.default)}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def match(self, consignee_name: Any) -> ChargeRule:
+        """Rule for one Consignee Name (the default if nothing matches)."""
+        if not isinstance(consignee_name, str):
+            return self.default  # Missing (NaN) names get the default charge
+        name = consignee_name.strip()
+        best = len(self.rules)
+        # Walk the prefix trie once; every terminal passed is a matching prefix rule
+        node = self._trie
+        for ch in name.upper():
+            node = node.get(ch)
+            if node is None:
+                break
+            if "" in node:
+                best = min(best, node[""])
+        if self._pattern is not None:
+            m = self._pattern.match(name)
+            if m is not None:
+                best = min(best, int(m.lastgroup[1:]))
+        return self.rules[best] if best < len(self.rules) else self.default
+
+    def classify(self, consignee_names: Iterable[Any]) -> List[ChargeRule]:
+        """Rule per row for a whole Consignee Name column, matching each distinct name once."""
+        names = list(consignee_names)
+        matched: Dict[Any, ChargeRule] = {}
+        for name in names:
+            key = name if isinstance(name, str) else None
+            if key not in matched:
+                matched[key] = self.match(name)
+        return [matched[name if isinstance(name, str) else None] for name in names]
+
+    @classmethod
+    def load(cls, path: str) -> "ChargeRuleSet":
+        """
+        Read a charge rules JSON file.
+
+        Raises:
+            ValueError: Malformed file or rules
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid charge rules file {path}: {e}") from e
+        if not isinstance(config, dict) or not isinstance(config.get("rules", []), list):
+            raise ValueError(f"Invalid charge rules file {path}: expected {{'rules': [...], 'default': {{...}}}}")
+        rules = [ChargeRule.from_dict(r) for r in config.get("rules", [])]
+        default = ChargeRule.from_dict(config["default"]) if "default" in config else DEFAULT_CHARGE
+        return cls(rules, default)
+
+    def save(self, path: str) -> None:
+        """Write the rules in the config format (only non-empty fields)."""
+        def compact(rule: ChargeRule) -> Dict[str, str]:
+            return {k: v for k, v in asdict(rule).items() if v or k in ("charge_name", "amount")}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"rules": [compact(r) for r in self.rules], "default": compact(self.default)}, f, indent=2)
+            f.write("\n")
+
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def get_charge_rules(path: Optional[str]) -> ChargeRuleSet:
+    """
+    Rules from path, cached until the file changes; the built-in defaults if
+    path is None or the file does not exist.
+
+    Raises:
+        ValueError: Malformed rules file
+    """
+    if not path or not os.path.exists(path):
+        return ChargeRuleSet(DEFAULT_RULES, DEFAULT_CHARGE)
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == (st.st_size, st.st_mtime_ns):
+            return cached[1]
+    rules = ChargeRuleSet.load(key)
+    with _cache_lock:
+        _cache[key] = ((st.st_size, st.st_mtime_ns), rules)
+    return rules
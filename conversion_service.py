@@ -0,0 +1,470 @@
+"""
+Conversion Service
+Local HTTP service so several users share one worker pool and one set of
+caches instead of each running the exe on the same files:
+
+    PUT  /uploads/<filename>          raw file body -> {"upload": "<sha256>/<filename>"}
+    POST /jobs                        {"type": "ledger", "ledger": UPLOAD, "job_register": UPLOAD or [UPLOAD, ...]}
+                                      {"type": "invoices", "pdfs": [UPLOAD, ...], "group_by_gstin": true}
+                                      optional: "priority" (urgent/normal/bulk), "submitter"
+    GET  /jobs/<id>                   job status, messages, metrics and output file names
+    GET  /jobs/<id>/files/<name>      download an output file
+    GET  /status                      queue depth, scheduler metrics and cache counters
+
+Uploads are stored content-addressed (uploads/<sha256>/<filename>), parsed
+invoices are cached per file hash, and Job Register indexes are cached per
+worker process, so repeated work across users is served from cache. Jobs
+are ordered by job_scheduler.JobScheduler; invoice jobs are split into
+chunks so small ledger jobs are not stuck behind a large reprocess.
+
+Usage:
+    python conversion_service.py --data-dir "D:\\Kale Service" [--port 8765]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from job_scheduler import JobScheduler, ScheduledJob
+
+DEFAULT_PORT = 8765
+JOB_TYPES = ("ledger", "invoices")
+INVOICE_CHUNK_SIZE = 25  # PDFs per scheduled invoice task
+
+
+def _parse_pdf_job(pdf_path: str) -> List[Dict[str, Any]]:
+    """Worker: parse one invoice PDF into InvoiceData dicts."""
+    from invoice_processor import parse_invoices
+    return [inv.to_dict() for inv in parse_invoices(pdf_path, parallel=False)]
+
+
+def _convert_ledger_job(ledger_path: str, output_path: str, register_paths: List[str]) -> Tuple[bool, List[str]]:
+    """Worker: convert one ledger with the (per-process cached) merged Job Register index."""
+    from Ledger_to_CSV import create_csv, read_ledger
+    from job_register import get_merged_job_register_index
+
+    messages: List[str] = []
+    try:
+        job_index = get_merged_job_register_index(register_paths, max_workers=1)
+    except Exception as e:
+        return False, [f"Error reading Job Register file: {e}"]
+    messages.extend(f"Job Register conflict: {line}" for line in job_index.conflict_report())
+    ledger_data = read_ledger(ledger_path)
+    ok = create_csv(ledger_data, output_path, messages.append, job_index=job_index)
+    return ok, messages
+
+
+class ParseCache:
+    """Parsed invoices per PDF content hash, in memory and as JSON files on disk."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(sha256: str, filename: str) -> str:
+        """Cache key: the file hash plus what parse_invoices derives from the filename."""
+        from invoice_processor import detect_invoice_type
+        credit = ".CREDIT" if "CREDIT" in filename.upper() else ""
+        return f"{sha256}.{detect_invoice_type(filename)}{credit}"
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            invoices = self.entries.get(key)
+            if invoices is None:
+                path = os.path.join(self.cache_dir, key + ".json")
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        invoices = self.entries[key] = json.load(f)
+            if invoices is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return invoices
+
+    def put(self, key: str, invoices: List[Dict[str, Any]]) -> None:
+        path = os.path.join(self.cache_dir, key + ".json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(invoices, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.entries[key] = invoices
+
+
+class ConversionJob:
+    """One submitted ledger or invoice conversion."""
+
+    def __init__(self, job_type: str, inputs: Dict[str, Any], output_dir: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.type = job_type
+        self.inputs = inputs
+        self.output_dir = output_dir
+        self.messages: List[str] = []
+        self.outputs: List[str] = []  # file names inside output_dir
+        self.cache_hits = 0
+        self.scheduled: Optional[ScheduledJob] = None
+
+    @property
+    def status(self) -> str:
+        return self.scheduled.status if self.scheduled else "queued"  # queued -> running -> done | failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        scheduled = self.scheduled
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "error": str(scheduled.error) if scheduled and scheduled.error else "",
+            "messages": self.messages[-50:],
+            "files": self.outputs,
+            "cache_hits": self.cache_hits,
+            "submitted_at": scheduled.submitted_at.isoformat(timespec="seconds") if scheduled else None,
+            "metrics": scheduled.metrics() if scheduled else {},
+        }
+
+
+class ConversionService:
+    """Job queue, shared process pool and caches behind the HTTP handler."""
+
+    def __init__(self, data_dir: str, workers: int = 2, chunk_size: int = INVOICE_CHUNK_SIZE):
+        self.data_dir = os.path.abspath(data_dir)
+        self.upload_dir = os.path.join(self.data_dir, "uploads")
+        self.result_dir = os.path.join(self.data_dir, "results")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.result_dir, exist_ok=True)
+
+        # spawn (the Windows default everywhere): forking while request/job
+        # threads hold import or I/O locks can deadlock the workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self.parse_cache = ParseCache(os.path.join(self.data_dir, "parse_cache"))
+        self.jobs: Dict[str, ConversionJob] = {}
+        self.chunk_size = chunk_size
+        self._parsing: Dict[str, Future] = {}  # cache key -> in-flight parse shared by jobs
+        self._lock = threading.Lock()
+        # One more scheduler slot than invoice chunks may use, so a ledger can always start
+        self.scheduler = JobScheduler(workers=workers + 1, type_limits={"invoices": workers})
+
+    # ---------------- Uploads ----------------
+
+    def store_upload(self, filename: str, data: bytes) -> str:
+        """Store an upload content-addressed. Returns its id "<sha256>/<filename>"."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        folder = os.path.join(self.upload_dir, sha256)
+        path = os.path.join(folder, filename)
+        if not os.path.exists(path):
+            os.makedirs(folder, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return f"{sha256}/{filename}"
+
+    def upload_path(self, upload_id: str) -> str:
+        """
+        Local path of an upload id.
+
+        Raises:
+            ValueError: Malformed id or unknown upload
+        """
+        sha256, _, filename = str(upload_id).partition("/")
+        if (not re.fullmatch(r"[0-9a-f]{64}", sha256) or not filename or filename.startswith(".")
+                or "/" in filename or "\\" in filename):
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        root = os.path.realpath(self.upload_dir)
+        path = os.path.realpath(os.path.join(root, sha256, filename))
+        if os.path.dirname(os.path.dirname(path)) != root:
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        if not os.path.exists(path):
+            raise ValueError(f"Unknown upload: {upload_id}")
+        return path
+
+    # ---------------- Jobs ----------------
+
+    def submit(self, request: Dict[str, Any], submitter: str = "") -> ConversionJob:
+        """
+        Validate and queue a job request.
+
+        Raises:
+            ValueError: Unknown job type or priority, or missing/unknown uploads
+        """
+        job_type = request.get("type")
+        if job_type == "ledger":
+            registers = request.get("job_register", "")
+            if not isinstance(registers, list):
+                registers = [registers]
+            if not registers:
+                raise ValueError("Ledger job needs a 'job_register' upload")
+            inputs = {
+                "ledger": self.upload_path(request.get("ledger", "")),
+                "job_register": [self.upload_path(u) for u in registers],
+            }
+        elif job_type == "invoices":
+            pdfs = request.get("pdfs") or []
+            if not isinstance(pdfs, list) or not pdfs:
+                raise ValueError("Invoice job needs a non-empty 'pdfs' list")
+            inputs = {
+                "pdfs": [(str(u).partition("/")[0], self.upload_path(u)) for u in pdfs],
+                "group_by_gstin": bool(request.get("group_by_gstin", True)),
+            }
+        else:
+            raise ValueError(f"Unknown job type: {job_type} (expected one of {', '.join(JOB_TYPES)})")
+
+        job = ConversionJob(job_type, inputs, "")
+        job.output_dir = os.path.join(self.result_dir, job.id)
+        if job_type == "ledger":
+            tasks = [lambda: self._run_ledger(job)]
+            finalize = lambda results: self._list_outputs(job)
+        else:
+            pdfs = inputs["pdfs"]
+            tasks = [
+                lambda chunk=pdfs[i:i + self.chunk_size]: self._parse_chunk(job, chunk)
+                for i in range(0, len(pdfs), self.chunk_size)
+            ]
+            finalize = lambda results: self._finish_invoices(job, results)
+        job.scheduled = self.scheduler.submit(
+            job.id, job_type, tasks,
+            priority=str(request.get("priority", "normal")),
+            submitter=str(request.get("submitter") or submitter),
+            finalize=finalize,
+        )
+        with self._lock:
+            self.jobs[job.id] = job
+        return job
+
+    def _list_outputs(self, job: ConversionJob) -> List[str]:
+        job.outputs = sorted(os.listdir(job.output_dir)) if os.path.isdir(job.output_dir) else []
+        return job.outputs
+
+    def _run_ledger(self, job: ConversionJob) -> None:
+        os.makedirs(job.output_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(job.inputs["ledger"]))[0]
+        output = os.path.join(job.output_dir, f"purchase_{stem}.csv")
+        ok, messages = self.pool.submit(
+            _convert_ledger_job, job.inputs["ledger"], output, job.inputs["job_register"]
+        ).result()
+        job.messages.extend(messages)
+        if not ok:
+            raise RuntimeError(messages[-1] if messages else "Ledger conversion failed")
+
+    def _parse_cached(self, job: ConversionJob, sha256: str, pdf_path: str) -> Future:
+        """Cached parse result, an in-flight parse of the same file, or a new pool task."""
+        key = ParseCache.key(sha256, os.path.basename(pdf_path))
+        cached = self.parse_cache.get(key)
+        if cached is not None:
+            job.cache_hits += 1
+            done: Future = Future()
+            done.set_result(cached)
+            return done
+        with self._lock:
+            future = self._parsing.get(key)
+            submitted = future is None
+            if submitted:
+                future = self._parsing[key] = self.pool.submit(_parse_pdf_job, pdf_path)
+            else:
+                job.cache_hits += 1
+        if submitted:
+            # Outside the lock: the callback runs inline if the parse already finished
+            future.add_done_callback(lambda f, key=key: self._parse_done(key, f))
+        return future
+
+    def _parse_done(self, key: str, future: Future) -> None:
+        if future.exception() is None:
+            self.parse_cache.put(key, future.result())
+        with self._lock:
+            self._parsing.pop(key, None)
+
+    def _parse_chunk(self, job: ConversionJob, chunk: List[Tuple[str, str]]) -> list:
+        """
+        Scheduled task: parse one chunk of a job's PDFs. Returns InvoiceData lists (None on failure).
+
+        PDFs are submitted to the pool one at a time, so the pool never holds
+        more parses than the scheduler has running tasks: a ledger the
+        scheduler starts waits for at most one parse, not a whole chunk.
+        """
+        from invoice_processor import InvoiceData
+
+        results = []
+        for sha256, path in chunk:
+            name = os.path.basename(path)
+            try:
+                parsed = [InvoiceData.from_dict(d) for d in self._parse_cached(job, sha256, path).result()]
+            except Exception as e:
+                job.messages.append(f"Failed: {name}: {e}")
+                results.append(None)
+                continue
+            good = [inv for inv in parsed if inv.invoice_number]
+            if good:
+                job.messages.append(f"Parsed: {name} ({len(good)} invoice(s))")
+            else:
+                job.messages.append(f"Failed: {name}: {', '.join(parsed[0].extraction_errors) or 'Unknown error'}")
+            results.append(good)
+        return results
+
+    def _finish_invoices(self, job: ConversionJob, chunk_results: List[list]) -> List[str]:
+        """Finalize step: write the CSVs from every chunk's invoices."""
+        from invoice_processor import generate_csv
+
+        invoices = [inv for chunk in chunk_results for good in chunk if good for inv in good]
+        if not invoices:
+            raise RuntimeError("No invoices were successfully parsed.")
+        files = generate_csv(invoices, job.output_dir, group_by_gstin=job.inputs["group_by_gstin"])
+        job.messages.append(f"Generated {len(files)} CSV file(s) from {len(invoices)} invoice(s)")
+        return self._list_outputs(job)
+
+    def output_path(self, job_id: str, name: str) -> Optional[str]:
+        """Path of a finished job's output file, or None if there is no such file."""
+        job = self.jobs.get(job_id)
+        if job is None or name not in job.outputs:
+            return None
+        return os.path.join(job.output_dir, name)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            states = [job.status for job in self.jobs.values()]
+            parsing = len(self._parsing)
+        return {
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+            "done": states.count("done"),
+            "failed": states.count("failed"),
+            "parses_in_flight": parsing,
+            "parse_cache_hits": self.parse_cache.hits,
+            "parse_cache_misses": self.parse_cache.misses,
+            "scheduler": self.scheduler.metrics(),
+        }
+
+    def shutdown(self) -> None:
+        self.scheduler.shutdown(wait=True)
+        self.pool.shutdown(wait=True)
+
+
+def upload_filename(name: str) -> str:
+    """
+    Last component of a client-supplied upload name, splitting on both "/" and
+    "\\" (os.path.basename only knows the local separator). Returns "" for
+    names that cannot be stored (empty or hidden).
+    """
+    filename = name.replace("\\", "/").rsplit("/", 1)[-1]
+    if not filename or filename.startswith("."):
+        return ""
+    return filename
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end; the ConversionService is on self.server.service."""
+
+    server_version = "KaleConversion/1.0"
+
+    def _send_json(self, code: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length > 0 else b""
+
+    def _parts(self) -> List[str]:
+        return [unquote(p) for p in self.path.split("?", 1)[0].strip("/").split("/") if p]
+
+    def do_PUT(self) -> None:
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "uploads":
+            self._send_json(404, {"error": "Not found"})
+            return
+        filename = upload_filename(parts[1])
+        if not filename:
+            self._send_json(400, {"error": "Invalid filename"})
+            return
+        upload_id = self.server.service.store_upload(filename, self._read_body())
+        self._send_json(201, {"upload": upload_id})
+
+    def do_POST(self) -> None:
+        if self._parts() != ["jobs"]:
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            request = json.loads(self._read_body() or b"{}")
+            job = self.server.service.submit(request, submitter=self.client_address[0])
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, job.to_dict())
+
+    def do_GET(self) -> None:
+        service: ConversionService = self.server.service
+        parts = self._parts()
+        if parts == ["status"]:
+            self._send_json(200, service.status())
+        elif len(parts) == 2 and parts[0] == "jobs" and parts[1] in service.jobs:
+            self._send_json(200, service.jobs[parts[1]].to_dict())
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "files":
+            path = service.output_path(parts[1], parts[3])
+            if path is None:
+                self._send_json(404, {"error": "Not found"})
+                return
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv" if path.endswith(".csv") else "application/octet-stream")
+            self.send_header("Content-Disposition", f'attachment; filename="{parts[3]}"')
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}", flush=True)
+
+
+def make_server(service: ConversionService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """HTTP server bound to host:port (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), ConversionRequestHandler)
+    server.service = service
+    return server
+
+
+def main(argv: List[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Shared local conversion service for ledgers and invoice PDFs.")
+    arg_parser.add_argument("--data-dir", required=True, help="Folder for uploads, caches and results")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: localhost only)")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    arg_parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    args = arg_parser.parse_args(argv)
+
+    service = ConversionService(args.data_dir, workers=args.workers)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} (data: {service.data_dir})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
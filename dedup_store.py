@@ -0,0 +1,137 @@
+"""
+Duplicate Detection Store
+Remembers which records were already emitted to Logisys CSVs, within a batch
+and across runs, so the same invoice or receipt is never written twice.
+"""
+
+import csv
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+
+class EmittedKeyIndex:
+    """
+    Set of previously emitted record keys backed by a SQLite table.
+
+    All stored keys are loaded into an in-memory set when the index opens, so
+    lookups are O(1) regardless of history size. Keys accepted during a batch
+    are held in memory until commit() writes them in one transaction.
+    """
+
+    def __init__(self, db_path: Optional[str], table: str, columns: Sequence[str]):
+        """
+        Args:
+            db_path: SQLite file (None keeps the index in memory for this batch only)
+            table: Table holding this record type's keys
+            columns: Names of the key columns, in key-tuple order
+        """
+        self.db_path = db_path
+        self.table = table
+        self.columns = list(columns)
+        self.seen: Set[Tuple[str, ...]] = set()
+        self.pending: List[Tuple[str, ...]] = []
+        self.suppressed: List[Tuple[Tuple[str, ...], str]] = []  # (key, reason)
+        self._history: Set[Tuple[str, ...]] = set()
+        self._accepted: Set[Tuple[str, ...]] = set()  # Keys emitted by this batch
+
+        if db_path:
+            with closing(self._connect()) as conn, conn:
+                cols = ", ".join(f'"{c}" TEXT NOT NULL' for c in self.columns)
+                key = ", ".join(f'"{c}"' for c in self.columns)
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}" ({cols}, emitted_at TEXT, PRIMARY KEY ({key}))'
+                )
+                rows = conn.execute(f'SELECT {key} FROM "{table}"').fetchall()
+            self._history = {tuple(r) for r in rows}
+            self.seen = set(self._history)
+
+    def _connect(self) -> sqlite3.Connection:
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        return sqlite3.connect(self.db_path)
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def __contains__(self, key: Tuple[str, ...]) -> bool:
+        return key in self.seen
+
+    def check_and_add(self, key: Tuple[str, ...], skip_history: bool = True) -> bool:
+        """
+        Record key as emitted. Returns False (and records it as suppressed) if it is a duplicate.
+
+        With skip_history False, only keys already emitted by this batch count
+        as duplicates; keys from earlier runs are emitted again.
+        """
+        if key in self._accepted or (skip_history and key in self.seen):
+            reason = "Duplicate within batch" if key in self._accepted else "Emitted in a previous run"
+            self.suppressed.append((key, reason))
+            return False
+        self._accepted.add(key)
+        if key not in self.seen:
+            self.seen.add(key)
+            self.pending.append(key)
+        return True
+
+    def filter_new(self, keys: Iterable[Tuple[str, ...]]) -> List[bool]:
+        """
+        Bulk check_and_add: one flag per key, True where the key is new. The
+        batch is anti-joined against the index with one set difference;
+        only the first occurrence of a new key within the batch is new.
+        """
+        keys = [tuple(key) for key in keys]
+        new = set(keys) - self.seen
+        flags = []
+        for key in keys:
+            if key in new:
+                new.discard(key)
+                flags.append(True)
+                self.pending.append(key)
+                self._accepted.add(key)
+            else:
+                flags.append(False)
+                reason = "Emitted in a previous run" if key in self._history else "Duplicate within batch"
+                self.suppressed.append((key, reason))
+        self.seen.update(keys)
+        return flags
+
+    def mark_emitted(self, keys: Iterable[Tuple[str, ...]]) -> None:
+        """Record keys as emitted without suppressing anything (duplicates are ignored)."""
+        keys = set(tuple(key) for key in keys)
+        self._accepted.update(keys)
+        for key in keys - self.seen:
+            self.seen.add(key)
+            self.pending.append(key)
+
+    def commit(self) -> int:
+        """Persist keys accepted since the last commit. Returns how many were written."""
+        if not self.pending:
+            return 0
+        count = len(self.pending)
+        if self.db_path:
+            now = datetime.now().isoformat(timespec="seconds")
+            placeholders = ", ".join("?" for _ in self.columns)
+            key = ", ".join(f'"{c}"' for c in self.columns)
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    f'INSERT OR IGNORE INTO "{self.table}" ({key}, emitted_at) VALUES ({placeholders}, ?)',
+                    [tuple(k) + (now,) for k in self.pending],
+                )
+            self._history.update(self.pending)
+        self.pending = []
+        return count
+
+    def write_report(self, path: str) -> Optional[str]:
+        """Write the suppressed-duplicates report as CSV. Returns None if nothing was suppressed."""
+        if not self.suppressed:
+            return None
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns + ["Reason"])
+            for key, reason in self.suppressed:
+                writer.writerow(list(key) + [reason])
+        return path
@@ -0,0 +1,152 @@
+"""
+Input Schema
+Declared columns for an input file type (Ledger Report, Job Register): the
+accepted header aliases for each column and whether it is read as text.
+Only the declared columns are parsed, identifiers are read as strings
+(so BOE numbers never round-trip through float), and the columns are
+renamed to their canonical names.
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+
+def _cell_text(value):
+    """An Excel cell value as read() reads a text column (whole floats without .0, blanks as NaN)."""
+    if value is None:
+        return float("nan")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+@dataclass(frozen=True)
+class SchemaColumn:
+    """One declared column: canonical name, header aliases (in priority order) and dtype."""
+    name: str
+    aliases: Tuple[str, ...]
+    required: bool = True
+    text: bool = True  # False: let the reader infer (e.g. Excel date cells)
+
+
+class InputSchema:
+    """Declared columns of one input file type."""
+
+    def __init__(self, kind: str, columns: Sequence[SchemaColumn]):
+        self.kind = kind
+        self.columns = list(columns)
+        self._wanted = {alias for col in self.columns for alias in col.aliases}
+
+    def resolve(self, header: Sequence[str]) -> Dict[str, str]:
+        """
+        Header column -> canonical name, taking the first alias present for
+        each declared column.
+
+        Raises:
+            ValueError: A required column has none of its aliases in the header
+        """
+        present = set(header)
+        mapping: Dict[str, str] = {}
+        for col in self.columns:
+            actual = next((a for a in col.aliases if a in present), None)
+            if actual is not None:
+                mapping[actual] = col.name
+            elif col.required:
+                raise ValueError(f"{col.name} column not found in {self.kind} file. "
+                                 f"Available columns: {list(header)}")
+        return mapping
+
+    def _dtype(self) -> Dict[str, type]:
+        return {alias: str for col in self.columns if col.text for alias in col.aliases}
+
+    def read(
+        self,
+        path: str,
+        sheet_name: Union[int, str] = 0,
+        skiprows: Optional[Sequence[int]] = None
+    ) -> pd.DataFrame:
+        """
+        Read only the declared columns of a CSV or Excel file, renamed to
+        their canonical names. The header is resolved as the reader sees it,
+        so the file is parsed once; the full header row is kept in
+        df.attrs["header"].
+
+        Raises:
+            ValueError: Unsupported file type or a required column is missing
+        """
+        seen: Dict[str, None] = {}  # header names in order (the CSV reader asks more than once)
+
+        def use_column(name: str) -> bool:
+            seen.setdefault(name)
+            return name in self._wanted
+
+        lower = path.lower()
+        if lower.endswith('.csv'):
+            df = pd.read_csv(path, usecols=use_column, dtype=self._dtype(), skiprows=skiprows)
+        elif lower.endswith('.xlsx'):
+            df = pd.read_excel(path, sheet_name=sheet_name, usecols=use_column, dtype=self._dtype(),
+                               skiprows=skiprows, engine='openpyxl')
+        else:
+            raise ValueError(f"Unsupported {self.kind} file format: {path}")
+
+        header = list(seen)
+        mapping = self.resolve(header)
+        df = df[list(mapping)].rename(columns=mapping)
+        df.attrs["header"] = header
+        return df
+
+    def read_xlsx_rows(self, path: str, min_row: int, sheet_name: Union[int, str] = 0) -> pd.DataFrame:
+        """
+        Declared columns of an xlsx sheet's rows from min_row on (1-based;
+        row 1 is the header), streamed with openpyxl's read-only reader so
+        the rows before it are never turned into cells or a DataFrame. Values
+        are converted as read() converts them; the header row is kept in
+        df.attrs["header"].
+
+        Raises:
+            ValueError: A required column is missing
+        """
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+            header_cells = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ()))
+            while header_cells and header_cells[-1] is None:
+                header_cells.pop()
+            header = [f"Unnamed: {i}" if h is None else str(h) for i, h in enumerate(header_cells)]
+            mapping = self.resolve(header)
+            text = {col.name: col.text for col in self.columns}
+            columns = [(header.index(actual), text[name]) for actual, name in mapping.items()]
+            rows = []
+            for values in sheet.iter_rows(min_row=max(min_row, 2), values_only=True):
+                cells = [values[i] if i < len(values) else None for i, _ in columns]
+                rows.append([_cell_text(v) if is_text else v for v, (_, is_text) in zip(cells, columns)])
+        finally:
+            workbook.close()
+
+        while rows and all(pd.isna(v) for v in rows[-1]):
+            rows.pop()  # Trailing empty rows, which read() does not return either
+        df = pd.DataFrame(rows, columns=list(mapping.values()))
+        df.attrs["header"] = header
+        return df
+
+    def read_csv_header(self, path: str) -> List[str]:
+        """Header row of a CSV file."""
+        return list(pd.read_csv(path, nrows=0).columns)
+
+    def read_csv_rows(self, data: bytes, header: Sequence[str]) -> pd.DataFrame:
+        """
+        Declared columns of header-less CSV rows (e.g. a tail read from a
+        byte offset), given the file's header row.
+
+        Raises:
+            ValueError: A required column is missing from header
+        """
+        mapping = self.resolve(header)
+        df = pd.read_csv(io.BytesIO(data), header=None, names=list(header),
+                         usecols=list(mapping), dtype=self._dtype())
+        return df[list(mapping)].rename(columns=mapping)
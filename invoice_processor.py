@@ -4,13 +4,19 @@ Invoice Parser Module for Airline PDF Invoices
 Extracts data from Air India, Air India Express, IndiGo, Akasa Air, and Gulf Air invoices.
 """
 
+import atexit
+import os
 import re
+import sys
+import threading
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
 import pdfplumber
 
+from normalize import parse_amount, parse_date_to_standard
+
 
 @dataclass
 class InvoiceData:
@@ -51,6 +57,7 @@ class InvoiceData:
             "invoice_type": self.invoice_type,
             "customer_name": self.customer_name,
             "customer_gstin": self.customer_gstin,
+            "vendor_gstin": self.vendor_gstin,
             "place_of_supply": self.place_of_supply,
             "state_code": self.state_code,
             "currency": self.currency,
@@ -70,6 +77,12 @@ class InvoiceData:
             "flight_to": self.flight_to,
             "extraction_errors": self.extraction_errors
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvoiceData":
+        """Rebuild from to_dict() output (raw_text is not serialized)."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
 
 
 # GSTIN State Code to State Name mapping
@@ -87,53 +100,14 @@ GSTIN_STATE_MAP = {
 }
 
 
-def parse_date_to_standard(date_str: str) -> str:
-    """Convert various date formats to DD-MMM-YYYY format."""
-    if not date_str:
-        return ""
-    
-    date_str = date_str.strip()
-    
-    # Try different date formats
-    formats = [
-        "%d/%m/%Y",      # 15/05/2025
-        "%d-%m-%Y",      # 15-05-2025
-
-        "%d-%b-%Y",      # 15-May-2025
-        "%d-%B-%Y",      # 15-May-2025
-        "%Y-%m-%d",      # 2025-05-15
-        "%d %b %Y",      # 15 May 2025
-        "%d %B %Y",      # 15 May 2025
-    ]
-    
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt.strftime("%d-%b-%Y") # Title Case: 14-May-2025
-        except ValueError:
-            continue
-    
-    return date_str  # Return as-is if no format matches
-
-
-def parse_amount(amount_str: str) -> float:
-    """Parse amount string to float, handling commas and currency symbols."""
-    if not amount_str:
-        return 0.0
-    
-    # Remove currency symbols, commas, percent, and whitespace
-    cleaned = re.sub(r'[₹$,%\s]', '', str(amount_str))
-    
-    try:
-        return float(cleaned)
-    except ValueError:
-        return 0.0
-
-
 class BaseParser(ABC):
     """Abstract base class for airline invoice parsers."""
     
     airline_name: str = ""
+    # Invoice number and invoice date (group 1); together they mark an
+    # invoice's header page when splitting multi-invoice PDFs
+    invoice_number_re: Optional[re.Pattern] = None
+    invoice_date_re: Optional[re.Pattern] = None
     
     @abstractmethod
     def can_parse(self, text: str) -> bool:
@@ -155,6 +129,22 @@ class BaseParser(ABC):
                 return default
         return default
     
+    def invoice_number(self, text: str, invoice_type: str = "") -> str:
+        """
+        Invoice number if text is an invoice's header page, else "" (used to
+        detect invoice boundaries). A header page carries both the invoice
+        number and the invoice date, and the number has a digit, so a label
+        such as "Invoice Notes" on a continuation page does not start one.
+        """
+        if self.invoice_number_re is None:
+            return self.extract(text, invoice_type).invoice_number
+        match = self.invoice_number_re.search(text)
+        if match is None or not any(c.isdigit() for c in match.group(1)):
+            return ""
+        if self.invoice_date_re is not None and not self.invoice_date_re.search(text):
+            return ""
+        return match.group(1).strip()
+    
     def _extract_gstin_state(self, gstin: str) -> tuple:
         """Extract state code and name from GSTIN."""
         if len(gstin) >= 2:
@@ -168,6 +158,8 @@ class AirIndiaParser(BaseParser):
     """Parser for Air India and Air India LTD invoices."""
     
     airline_name = "AIR INDIA"
+    invoice_number_re = re.compile(r'(?:Invoice|Debit\s*Note)\s*Number\s*[:\s]*([A-Z0-9]+)', re.IGNORECASE)
+    invoice_date_re = re.compile(r'(?:Invoice|Debit\s*Note)\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})', re.IGNORECASE)
     
     def can_parse(self, text: str) -> bool:
         return "AIR INDIA LTD" in text.upper() and "AIR INDIA EXPRESS" not in text.upper()
@@ -176,7 +168,7 @@ class AirIndiaParser(BaseParser):
         data = InvoiceData(airline=self.airline_name, invoice_type=invoice_type, raw_text=text)
         
         # Invoice/Debit Note Number - handle both formats
-        inv_match = re.search(r'(?:Invoice|Debit\s*Note)\s*Number\s*[:\s]*([A-Z0-9]+)', text, re.IGNORECASE)
+        inv_match = self.invoice_number_re.search(text)
         if inv_match:
             data.invoice_number = inv_match.group(1).strip()
         
@@ -186,7 +178,7 @@ class AirIndiaParser(BaseParser):
             data.vendor_gstin = vendor_match.group(1)
         
         # Invoice/Debit Note Date
-        date_match = re.search(r'(?:Invoice|Debit\s*Note)\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})', text, re.IGNORECASE)
+        date_match = self.invoice_date_re.search(text)
         if date_match:
             data.invoice_date = parse_date_to_standard(date_match.group(1))
         
@@ -269,6 +261,8 @@ class AirIndiaExpressParser(BaseParser):
     """Parser for Air India Express invoices."""
     
     airline_name = "AIR INDIA EXPRESS"
+    invoice_number_re = re.compile(r'Invoice\s*Number\s*[:\s]*([A-Z0-9]+)', re.IGNORECASE)
+    invoice_date_re = re.compile(r'Invoice\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})', re.IGNORECASE)
     
     def can_parse(self, text: str) -> bool:
         return "AIR INDIA EXPRESS" in text.upper()
@@ -277,7 +271,7 @@ class AirIndiaExpressParser(BaseParser):
         data = InvoiceData(airline=self.airline_name, invoice_type=invoice_type, raw_text=text)
         
         # Invoice Number
-        inv_match = re.search(r'Invoice\s*Number\s*[:\s]*([A-Z0-9]+)', text, re.IGNORECASE)
+        inv_match = self.invoice_number_re.search(text)
         if inv_match:
             data.invoice_number = inv_match.group(1).strip()
             
@@ -287,7 +281,7 @@ class AirIndiaExpressParser(BaseParser):
             data.vendor_gstin = vendor_match.group(1)
         
         # Invoice Date
-        date_match = re.search(r'Invoice\s*Date\s*[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{4})', text, re.IGNORECASE)
+        date_match = self.invoice_date_re.search(text)
         if date_match:
             data.invoice_date = parse_date_to_standard(date_match.group(1))
         
@@ -363,6 +357,8 @@ class IndiGoParser(BaseParser):
     """Parser for IndiGo (InterGlobe Aviation) invoices."""
     
     airline_name = "INDIGO"
+    invoice_number_re = re.compile(r'Number\s*[:\s]*([A-Z]{2}\d+[A-Z]{2}\d+)')
+    invoice_date_re = re.compile(r'Date\s*[:\s]*(\d{1,2}[^\w\d]+[A-Za-z]{3}[^\w\d]+\d{4})', re.IGNORECASE)
     
     def can_parse(self, text: str) -> bool:
         return "INDIGO" in text.upper() or "INTERGLOBE AVIATION" in text.upper()
@@ -371,7 +367,7 @@ class IndiGoParser(BaseParser):
         data = InvoiceData(airline=self.airline_name, invoice_type=invoice_type, raw_text=text)
         
         # Invoice Number (format: KA1252612CR78975)
-        inv_match = re.search(r'Number\s*[:\s]*([A-Z]{2}\d+[A-Z]{2}\d+)', text)
+        inv_match = self.invoice_number_re.search(text)
         if inv_match:
             data.invoice_number = inv_match.group(1).strip()
         
@@ -381,14 +377,12 @@ class IndiGoParser(BaseParser):
         # [^\w\d]+ : One or more non-alphanumeric chars as separator
         # [A-Za-z]{3} : 3-letter month
         # \d{4} : 4-digit year
-        date_match = re.search(r'Date\s*[:\s]*(\d{1,2}[^\w\d]+[A-Za-z]{3}[^\w\d]+\d{4})', text, re.IGNORECASE)
+        date_match = self.invoice_date_re.search(text)
         if date_match:
             # Normalize to standard format: replace spaces/separators with single dash
             raw_date = re.sub(r'[^\w\d]+', '-', date_match.group(1))
             data.invoice_date = parse_date_to_standard(raw_date)
         
-            data.invoice_date = parse_date_to_standard(raw_date)
-        
         # Vendor GSTIN (Supplier) - appears before Customer GSTIN
         vendor_match = re.search(r'GSTIN\s*[:\s]*(\d{2}[A-Z]{5}\d{4}[A-Z]\d[A-Z\d]{2})', text, re.IGNORECASE)
         # Ensure it's not the customer one if they appear close
@@ -555,6 +549,8 @@ class AkasaAirParser(BaseParser):
     """Parser for Akasa Air (SNV Aviation) invoices."""
     
     airline_name = "AKASA AIR"
+    invoice_number_re = re.compile(r'(?:Invoice|Debit\s*Note)\s*Number\s*[:\s]*([A-Z0-9]+)', re.IGNORECASE)
+    invoice_date_re = re.compile(r'(?:Invoice|Debit\s*Note)\s*Date\s*[:\s]*(\d{1,2}-[A-Za-z]{3}-\d{4})', re.IGNORECASE)
     
     def can_parse(self, text: str) -> bool:
         return "AKASA" in text.upper() or "SNV AVIATION" in text.upper()
@@ -563,12 +559,12 @@ class AkasaAirParser(BaseParser):
         data = InvoiceData(airline=self.airline_name, invoice_type=invoice_type, raw_text=text)
         
         # Invoice/Debit Note Number
-        inv_match = re.search(r'(?:Invoice|Debit\s*Note)\s*Number\s*[:\s]*([A-Z0-9]+)', text, re.IGNORECASE)
+        inv_match = self.invoice_number_re.search(text)
         if inv_match:
             data.invoice_number = inv_match.group(1).strip()
         
         # Invoice/Debit Note Date (format: 22-Oct-2025)
-        date_match = re.search(r'(?:Invoice|Debit\s*Note)\s*Date\s*[:\s]*(\d{1,2}-[A-Za-z]{3}-\d{4})', text, re.IGNORECASE)
+        date_match = self.invoice_date_re.search(text)
         if date_match:
             data.invoice_date = parse_date_to_standard(date_match.group(1))
         
@@ -679,6 +675,8 @@ class GulfAirParser(BaseParser):
     """Parser for Gulf Air invoices."""
     
     airline_name = "GULF AIR"
+    invoice_number_re = re.compile(r'Invoice\s*No\b\.?\s*[:\s]*([A-Z0-9/]+)', re.IGNORECASE)
+    invoice_date_re = re.compile(r'Invoice\s*Date\s*[:\s]*(\d{1,2}-\d{1,2}-\d{4})', re.IGNORECASE)
     
     def can_parse(self, text: str) -> bool:
         return "GULF AIR" in text.upper()
@@ -687,12 +685,12 @@ class GulfAirParser(BaseParser):
         data = InvoiceData(airline=self.airline_name, invoice_type=invoice_type, raw_text=text)
         
         # Invoice Number (format: TKMHP/2510/04496)
-        inv_match = re.search(r'Invoice\s*No\s*[:\s]*([A-Z0-9/]+)', text, re.IGNORECASE)
+        inv_match = self.invoice_number_re.search(text)
         if inv_match:
             data.invoice_number = inv_match.group(1).strip()
         
         # Invoice Date (format: 21-10-2025)
-        date_match = re.search(r'Invoice\s*Date\s*[:\s]*(\d{1,2}-\d{1,2}-\d{4})', text, re.IGNORECASE)
+        date_match = self.invoice_date_re.search(text)
         if date_match:
             data.invoice_date = parse_date_to_standard(date_match.group(1))
         
@@ -757,41 +755,384 @@ def detect_invoice_type(filename: str) -> str:
     return "UNKNOWN"
 
 
-def extract_text_from_pdf(pdf_path: str, page_num: int = None) -> str:
-    """Extract text from PDF. If page_num is None, extracts all pages."""
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        if page_num is not None:
-            if page_num < len(pdf.pages):
-                pages = [pdf.pages[page_num]]
+# ============================================================
+# TEXT EXTRACTION BACKENDS
+# ============================================================
+
+class TextExtractor(ABC):
+    """Abstract base class for PDF text extraction backends."""
+    
+    name: str = ""
+    
+    @abstractmethod
+    def iter_page_texts(self, pdf_path: str, page_num: Optional[int] = None) -> Iterator[str]:
+        """Yield the raw text of every page (or only page_num if given)."""
+        pass
+
+
+class PdfplumberExtractor(TextExtractor):
+    """Reference backend - the extraction every parser regex was written against."""
+    
+    name = "pdfplumber"
+    
+    def iter_page_texts(self, pdf_path: str, page_num: Optional[int] = None) -> Iterator[str]:
+        with pdfplumber.open(pdf_path) as pdf:
+            if page_num is not None:
+                if page_num < len(pdf.pages):
+                    pages = [pdf.pages[page_num]]
+                else:
+                    pages = []
             else:
-                pages = []
-        else:
-            pages = pdf.pages
+                pages = pdf.pages
             
-        for page in pages:
-            t = page.extract_text(x_tolerance=1)
-            if t:
-                # Fix numbers split across lines by PDF extraction
-                # e.g., "10,864.0\n0" -> "10,864.00" or "11,838.\n00" -> "11,838.00"
-                t = re.sub(r'(\d\.\d)\n(\d)', r'\1\2', t)
-                t = re.sub(r'(\d\.)\n(\d)', r'\1\2', t)
-                text += t + "\n"
+            for page in pages:
+                try:
+                    yield page.extract_text(x_tolerance=1) or ""
+                finally:
+                    # Release this page's chars/lines/layout caches now rather
+                    # than when the whole document closes (close() on newer
+                    # pdfplumber, flush_cache() on older releases)
+                    release = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+                    if release is not None:
+                        release()
+
+
+class PdfminerExtractor(TextExtractor):
+    """
+    Raw pdfminer.six layout backend.
+    
+    Skips pdfplumber's per-character object model and rebuilds table rows
+    directly from pdfminer's text lines: lines whose vertical centres are
+    within line_tolerance points are joined left-to-right with a space.
+    """
+    
+    name = "pdfminer"
+    line_tolerance = 3.0
+    
+    def iter_page_texts(self, pdf_path: str, page_num: Optional[int] = None) -> Iterator[str]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LAParams, LTTextContainer, LTTextLine
+        
+        page_numbers = [page_num] if page_num is not None else None
+        for layout in extract_pages(pdf_path, page_numbers=page_numbers, laparams=LAParams()):
+            fragments = []
+            for element in layout:
+                if not isinstance(element, LTTextContainer):
+                    continue
+                lines = element if not isinstance(element, LTTextLine) else [element]
+                for line in lines:
+                    content = line.get_text().strip()
+                    if content:
+                        fragments.append(((line.y0 + line.y1) / 2, line.x0, content))
+            yield self._join_rows(fragments)
+    
+    def _join_rows(self, fragments: list) -> str:
+        """Group (y, x, text) fragments into visual rows, top of page first."""
+        rows = []
+        for y, x, content in sorted(fragments, key=lambda f: (-f[0], f[1])):
+            if rows and abs(rows[-1][0] - y) <= self.line_tolerance:
+                rows[-1][1].append((x, content))
+            else:
+                rows.append((y, [(x, content)]))
+        return "\n".join(" ".join(c for _, c in sorted(cells)) for _, cells in rows)
+
+
+class PdfiumExtractor(TextExtractor):
+    """pdfium (pypdfium2) backend - native code, fastest when installed."""
+    
+    name = "pdfium"
+    
+    def iter_page_texts(self, pdf_path: str, page_num: Optional[int] = None) -> Iterator[str]:
+        import pypdfium2 as pdfium
+        
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            if page_num is not None:
+                indices = [page_num] if page_num < len(pdf) else []
+            else:
+                indices = range(len(pdf))
+            for index in indices:
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+
+TEXT_EXTRACTORS: Dict[str, TextExtractor] = {
+    extractor.name: extractor
+    for extractor in (PdfplumberExtractor(), PdfminerExtractor(), PdfiumExtractor())
+}
+
+# pdfplumber is the reference: fast backends fall back to it when their
+# output breaks a parser.
+REFERENCE_TEXT_BACKEND = "pdfplumber"
+DEFAULT_TEXT_BACKEND = REFERENCE_TEXT_BACKEND
+
+# Per-airline backend override, keyed by BaseParser.airline_name.
+# e.g. {"INDIGO": "pdfminer"} - run `python benchmarks.py extractors <pdfs>`
+# first to confirm field accuracy for that airline.
+AIRLINE_TEXT_BACKENDS: Dict[str, str] = {}
+
+
+@dataclass
+class ExtractionStats:
+    """Per-file extraction metrics filled in by extract_text_from_pdf."""
+    backend: str = ""
+    pages: int = 0
+    peak_rss_mb: float = 0.0
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (0.0 if unavailable)."""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+            
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize / (1024 * 1024)
+            return 0.0
+        if os.path.exists("/proc/self/statm"):
+            with open("/proc/self/statm") as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        import resource
+        # No current-RSS source: fall back to the process high-water mark (bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def fix_split_numbers(text: str) -> str:
+    """Fix numbers split across lines by PDF extraction.
+    
+    e.g., "10,864.0\\n0" -> "10,864.00" or "11,838.\\n00" -> "11,838.00"
+    """
+    text = re.sub(r'(\d\.\d)\n(\d)', r'\1\2', text)
+    text = re.sub(r'(\d\.)\n(\d)', r'\1\2', text)
     return text
 
 
-def parse_invoice(pdf_path: str) -> InvoiceData:
+def extract_page_texts(
+    pdf_path: str,
+    page_num: int = None,
+    backend: str = DEFAULT_TEXT_BACKEND,
+    stats: Optional[ExtractionStats] = None
+) -> List[str]:
+    """Extract the text of each page separately (empty pages included).
+    
+    Pages are processed one at a time and released after their text is
+    taken. If stats is given, it receives the page count and the peak RSS
+    sampled after each page.
     """
-    Parse an invoice PDF and extract structured data.
+    page_texts = []
+    peak_rss = current_rss_mb() if stats is not None else 0.0
+    for t in TEXT_EXTRACTORS[backend].iter_page_texts(pdf_path, page_num):
+        page_texts.append(fix_split_numbers(t) if t else "")
+        if stats is not None:
+            peak_rss = max(peak_rss, current_rss_mb())
+    if stats is not None:
+        stats.backend = backend
+        stats.pages = len(page_texts)
+        stats.peak_rss_mb = max(stats.peak_rss_mb, peak_rss)
+    return page_texts
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    page_num: int = None,
+    backend: str = DEFAULT_TEXT_BACKEND,
+    stats: Optional[ExtractionStats] = None
+) -> str:
+    """Extract text from PDF. If page_num is None, extracts all pages."""
+    return "".join(t + "\n" for t in extract_page_texts(pdf_path, page_num, backend, stats) if t)
+
+
+def find_parser(text: str) -> Optional[BaseParser]:
+    """Return the first parser that recognises the text, or None."""
+    for parser in PARSERS:
+        if parser.can_parse(text):
+            return parser
+    return None
+
+
+def sniff_airline(pdf_path: str) -> str:
+    """Detect the airline from the first page using the cheapest backend."""
+    for backend in ("pdfium", "pdfminer", REFERENCE_TEXT_BACKEND):
+        try:
+            text = extract_text_from_pdf(pdf_path, page_num=0, backend=backend)
+        except ImportError:
+            continue
+        parser = find_parser(text)
+        return parser.airline_name if parser else ""
+    return ""
+
+
+def select_text_backend(pdf_path: str) -> tuple:
+    """Pick the extraction backend configured for this PDF's airline.
+    
+    Returns (backend name, sniffed airline); the airline is empty when no
+    per-airline overrides are configured and sniffing was skipped.
+    """
+    if not AIRLINE_TEXT_BACKENDS:
+        return DEFAULT_TEXT_BACKEND, ""
+    airline = sniff_airline(pdf_path)
+    return AIRLINE_TEXT_BACKENDS.get(airline, DEFAULT_TEXT_BACKEND), airline
+
+
+def parse_text(text: str, invoice_type: str) -> InvoiceData:
+    """Run the matching airline parser over extracted text and validate it."""
+    parser = find_parser(text)
+    if parser is None:
+        # No parser matched
+        data = InvoiceData(raw_text=text)
+        data.extraction_errors.append(f"Unknown invoice format - no parser matched")
+        return data
+    
+    data = parser.extract(text, invoice_type)
+    
+    # Validate required fields
+    if not data.invoice_number:
+        data.extraction_errors.append("Invoice number not found")
+    if not data.invoice_date:
+        data.extraction_errors.append("Invoice date not found")
+    if not data.customer_gstin:
+        data.extraction_errors.append("Customer GSTIN not found")
+    if data.total_amount == 0:
+        data.extraction_errors.append("Total amount not found or is zero")
+    
+    return data
+
+
+def is_equivalent_extraction(data: InvoiceData, expected_airline: str) -> bool:
+    """Equivalence check for fast-backend output.
+    
+    The fast text is accepted only if the same parser matched and every
+    required field validated; anything else is treated as a broken parse.
+    """
+    return bool(data.airline) and data.airline == expected_airline and not data.extraction_errors
+
+
+def split_invoice_segments(page_texts: List[str], invoice_type: str) -> List[str]:
+    """
+    Split a PDF's pages into one text segment per invoice.
+    
+    A page starts a new segment when it carries an invoice number not seen
+    on the previous page. Pages without an invoice number (continuations)
+    stay with the current invoice, and consecutive pages repeating the same
+    number are joined as before. A later, non-adjacent copy of an invoice
+    that already has a segment is collapsed: it and its continuation pages
+    are dropped.
+    
+    Returns:
+        List of segment texts in document order
+    """
+    texts = [t for t in page_texts if t]
+    if len(texts) <= 1:
+        return ["".join(t + "\n" for t in texts)] if texts else []
+    
+    doc_parser = find_parser("\n".join(texts))
+    segments: Dict[str, List[str]] = {}
+    leading: List[str] = []
+    current = None  # invoice number of the segment being filled
+    collapsing = False
+    
+    for page in texts:
+        parser = find_parser(page) or doc_parser
+        number = parser.invoice_number(page, invoice_type) if parser else ""
+        
+        if number and number != current:
+            collapsing = number in segments
+            current = number
+            if not collapsing:
+                segments[number] = []
+        if collapsing:
+            continue
+        if current is None:
+            leading.append(page)
+        else:
+            segments[current].append(page)
+    
+    if not segments:
+        return ["".join(t + "\n" for t in leading)]
+    
+    segment_pages = list(segments.values())
+    segment_pages[0] = leading + segment_pages[0]
+    return ["".join(t + "\n" for t in pages) for pages in segment_pages]
+
+
+# Segments at or above this count are parsed on the shared process pool
+PARALLEL_SEGMENT_THRESHOLD = 4
+_segment_pool = None
+_segment_pool_lock = threading.Lock()
+
+
+def _get_segment_pool():
+    """Lazily create the process pool shared by all multi-invoice PDFs."""
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _segment_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        return _segment_pool
+
+
+def shutdown_segment_pool() -> None:
+    """Stop the segment pool's worker processes (a later large PDF starts a new pool)."""
+    global _segment_pool
+    with _segment_pool_lock:
+        pool, _segment_pool = _segment_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+atexit.register(shutdown_segment_pool)  # For callers outside a batch (e.g. parse_invoices)
+
+
+def parse_segments(segments: List[str], invoice_type: str, parallel: bool = True) -> List[InvoiceData]:
+    """Parse each invoice segment independently, in parallel for large PDFs (unless parallel is False)."""
+    if parallel and len(segments) >= PARALLEL_SEGMENT_THRESHOLD and (os.cpu_count() or 1) > 1:
+        pool = _get_segment_pool()
+        return list(pool.map(parse_text, segments, [invoice_type] * len(segments)))
+    return [parse_text(segment, invoice_type) for segment in segments]
+
+
+def parse_invoices(
+    pdf_path: str,
+    backend: Optional[str] = None,
+    stats: Optional[ExtractionStats] = None,
+    parallel: bool = True
+) -> List[InvoiceData]:
+    """
+    Parse an invoice PDF that may hold several invoices.
     
     Args:
         pdf_path: Path to the PDF file
+        backend: Text extraction backend name (default: per-airline selection)
+        stats: Optional ExtractionStats to receive page count and peak RSS
+        parallel: Parse large PDFs' segments on the shared process pool. Pass
+            False from pool workers, so they do not each start a nested pool.
         
     Returns:
-        InvoiceData object with extracted information
+        List of InvoiceData, one per distinct invoice in the PDF (never empty)
     """
-    import os
-    
     filename = os.path.basename(pdf_path)
     invoice_type = detect_invoice_type(filename)
     
@@ -799,37 +1140,56 @@ def parse_invoice(pdf_path: str) -> InvoiceData:
     if "CREDIT" in filename.upper():
         data = InvoiceData()
         data.extraction_errors.append("Credit notes are not supported")
-        return data
+        return [data]
     
-    # Extract text from all pages to handle duplicates/split content
-    text = extract_text_from_pdf(pdf_path, page_num=None)
+    expected_airline = ""
+    if backend is None:
+        backend, expected_airline = select_text_backend(pdf_path)
     
-    if not text:
+    # Extract every page, then split into per-invoice segments
+    try:
+        page_texts = extract_page_texts(pdf_path, page_num=None, backend=backend, stats=stats)
+    except ImportError:
+        # Backend library not installed - use the reference backend
+        backend = REFERENCE_TEXT_BACKEND
+        page_texts = extract_page_texts(pdf_path, page_num=None, backend=backend, stats=stats)
+    
+    invoices = parse_segments(split_invoice_segments(page_texts, invoice_type), invoice_type, parallel)
+    
+    if backend != REFERENCE_TEXT_BACKEND:
+        if not expected_airline and invoices:
+            expected_airline = invoices[0].airline
+        if not invoices or not all(is_equivalent_extraction(d, expected_airline) for d in invoices):
+            page_texts = extract_page_texts(pdf_path, page_num=None, backend=REFERENCE_TEXT_BACKEND, stats=stats)
+            invoices = parse_segments(split_invoice_segments(page_texts, invoice_type), invoice_type, parallel)
+    
+    if not invoices:
         data = InvoiceData()
         data.extraction_errors.append("Could not extract text from PDF")
-        return data
+        invoices = [data]
+    return invoices
+
+
+def parse_invoice(
+    pdf_path: str,
+    backend: Optional[str] = None,
+    stats: Optional[ExtractionStats] = None
+) -> InvoiceData:
+    """
+    Parse an invoice PDF and extract structured data.
     
-    # Try each parser
-    for parser in PARSERS:
-        if parser.can_parse(text):
-            data = parser.extract(text, invoice_type)
-            
-            # Validate required fields
-            if not data.invoice_number:
-                data.extraction_errors.append("Invoice number not found")
-            if not data.invoice_date:
-                data.extraction_errors.append("Invoice date not found")
-            if not data.customer_gstin:
-                data.extraction_errors.append("Customer GSTIN not found")
-            if data.total_amount == 0:
-                data.extraction_errors.append("Total amount not found or is zero")
-            
-            return data
+    For PDFs holding several invoices this returns the first one; use
+    parse_invoices to get them all.
     
-    # No parser matched
-    data = InvoiceData(raw_text=text)
-    data.extraction_errors.append(f"Unknown invoice format - no parser matched")
-    return data
+    Args:
+        pdf_path: Path to the PDF file
+        backend: Text extraction backend name (default: per-airline selection)
+        stats: Optional ExtractionStats to receive page count and peak RSS
+        
+    Returns:
+        InvoiceData object with extracted information
+    """
+    return parse_invoices(pdf_path, backend=backend, stats=stats)[0]
 
 
 
@@ -842,12 +1202,17 @@ Generates CSV files matching the 41-column template format.
 """
 
 import csv
+import io
 import os
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from dataclasses import dataclass
 
-# Import from invoice_parser
+from dedup_store import EmittedKeyIndex
+from invoice_store import INVOICE_STORE_DB, InvoiceStore
+from logisys_template import CSV_HEADERS, RowTemplate
+from output_parts import write_parts
+from xlsx_output import XlsxTemplateWriter
 
 
 # Map state codes to branch names for the template
@@ -893,52 +1258,6 @@ CUSTOMER_GSTIN_MAP = {
     "27AACCN5739J2Z3": "ISD"
 }
 
-# 41 CSV Headers matching the template
-CSV_HEADERS = [
-    "Entry Date",           # 1
-    "Posting Date",         # 2
-    "Organization",         # 3
-    "Organization Branch",  # 4
-    "Vendor Inv No",        # 5
-    "Vendor Inv Date",      # 6
-    "Currency",             # 7
-    "ExchRate",             # 8
-    "Narration",            # 9
-    "Due Date",             # 10
-    "Charge or GL",         # 11
-    "Charge or GL Name",    # 12
-    "Charge or GL Amount",  # 13
-    "DR or CR",             # 14
-    "Cost Center",          # 15
-    "Branch",               # 16
-    " Charge Narration",    # 17
-    "TaxGroup",             # 18
-    "Tax Type",             # 19
-    "SAC or HSN",           # 20
-    "Taxcode1",             # 21
-    "Taxcode1 Amt",         # 22
-    "Taxcode2",             # 23
-    "Taxcode2 Amt",         # 24
-    "Taxcode3",             # 25
-    "Taxcode3 Amt",         # 26
-    "Taxcode4",             # 27
-    "Taxcode4 Amt",         # 28
-    "Avail Tax Credit",     # 29
-    "LOB",                  # 30
-    "Ref Type",             # 31
-    "Ref No",               # 32
-    "Amount",               # 33
-    "Start Date",           # 34
-    "End Date",             # 35
-    "WH Tax Code",          # 36
-    "WH Tax Percentage",    # 37
-    "WH Tax Taxable",       # 38
-    "WH Tax Amount",        # 39
-    "Round Off",            # 40
-    "CC Code",              # 41
-]
-
-
 def get_current_date_formatted() -> str:
     """Get current date in DD-MMM-YYYY format."""
     return datetime.now().strftime("%d-%b-%Y") # Title Case
@@ -980,13 +1299,27 @@ def generate_narration(airline: str, routing: str, pnr: str = "", passenger: str
     return narration
 
 
-def invoice_to_csv_row(
+# Per-invoice columns of the template, in the order invoice_to_template_row fills them
+INVOICE_ROW_TEMPLATE = RowTemplate(
+    [
+        "Entry Date", "Posting Date", "Organization", "Organization Branch",
+        "Vendor Inv No", "Vendor Inv Date", "Currency", "Narration", "Due Date",
+        "Charge or GL", "Charge or GL Name", "Charge or GL Amount", "Branch",
+        " Charge Narration", "TaxGroup", "Tax Type", "SAC or HSN",
+        "Taxcode1", "Taxcode1 Amt", "Taxcode2", "Taxcode2 Amt",
+        "Avail Tax Credit", "Amount",
+    ],
+    constants={"ExchRate": "1", "DR or CR": "Dr", "Round Off": "Yes"},
+)
+
+
+def invoice_to_template_row(
     invoice: InvoiceData, 
     entry_date: Optional[str] = None,
     is_non_taxable: bool = False,
     charge_amount: Optional[float] = None
-) -> Dict[str, Any]:
-    """Convert InvoiceData to a CSV row dictionary.
+) -> tuple:
+    """Convert InvoiceData to a CSV row tuple in CSV_HEADERS order.
     
     Args:
         invoice: InvoiceData object
@@ -1021,9 +1354,8 @@ def invoice_to_csv_row(
              state_code = invoice.vendor_gstin[:2]
              org_branch = STATE_TO_BRANCH.get(state_code, "")
     
-    # Determine DR or CR based on invoice type
-    # Since Credit Notes are filtered out, both Tax Invoices and Debit Notes are Dr entries
-    dr_cr = "Dr"
+    # DR or CR is a template constant: since Credit Notes are filtered out,
+    # both Tax Invoices and Debit Notes are Dr entries
     
     # Generate narration
     narration = generate_narration(
@@ -1046,8 +1378,6 @@ def invoice_to_csv_row(
     taxcode1_amt = ""
     taxcode2 = ""
     taxcode2_amt = ""
-    taxcode3 = ""
-    taxcode3_amt = ""
     
     if not is_non_taxable:
         if invoice.igst_amount > 0:
@@ -1073,57 +1403,49 @@ def invoice_to_csv_row(
         expense_head = "TRAVELLING EXP. (AIRLINE MISC CHARGES)"
         sac_code = "996429"
 
-    # Build the row
-    row = {
-        "Entry Date": entry_date,
-        "Posting Date": entry_date,
-        "Organization": map_airline_to_organization(invoice.airline),
-        "Organization Branch": org_branch,
-        "Vendor Inv No": invoice.invoice_number,
-        "Vendor Inv Date": invoice.invoice_date,
-        "Currency": invoice.currency,
-        "ExchRate": "1",
-        "Narration": narration,
-        "Due Date": entry_date,
-        "Charge or GL": expense_head,
-        "Charge or GL Name": expense_head,
-        "Charge or GL Amount": str(amount),
-        "DR or CR": dr_cr,
-        "Cost Center": "",
-        "Branch": branch,
-        " Charge Narration": "AIRPORT CHARGES" if is_non_taxable else "BASE FARE",
-        "TaxGroup": "GSTIN" if invoice.customer_gstin and not is_non_taxable else "",
-        "Tax Type": "Non-Taxable" if is_non_taxable else "Taxable",
-        "SAC or HSN": sac_code if not is_non_taxable else "",  # Air Transport SAC code only for taxable
-        "Taxcode1": taxcode1,
-        "Taxcode1 Amt": taxcode1_amt,
-        "Taxcode2": taxcode2,
-        "Taxcode2 Amt": taxcode2_amt,
-        "Taxcode3": taxcode3,
-        "Taxcode3 Amt": taxcode3_amt,
-        "Taxcode4": "",
-        "Taxcode4 Amt": "",
-        "Avail Tax Credit": "100" if (invoice.igst_amount > 0 or invoice.cgst_amount > 0 or invoice.sgst_amount > 0) else "Yes",
-        "LOB": "",
-        "Ref Type": "",
-        "Ref No": "",
-        "Amount": str(invoice.taxable_value + invoice.non_taxable_value + invoice.igst_amount + invoice.cgst_amount + invoice.sgst_amount),  # Grand total for the invoice
-        "Start Date": "",
-        "End Date": "",
-        "WH Tax Code": "",
-        "WH Tax Percentage": "",
-        "WH Tax Taxable": "",
-        "WH Tax Amount": "",
-        "Round Off": "Yes",
-        "CC Code": "",
-    }
-    
-    return row
+    # Build the row (variable columns only, in INVOICE_ROW_TEMPLATE order)
+    return INVOICE_ROW_TEMPLATE.row((
+        entry_date,
+        entry_date,
+        map_airline_to_organization(invoice.airline),
+        org_branch,
+        invoice.invoice_number,
+        invoice.invoice_date,
+        invoice.currency,
+        narration,
+        entry_date,
+        expense_head,
+        expense_head,
+        str(amount),
+        branch,
+        "AIRPORT CHARGES" if is_non_taxable else "BASE FARE",
+        "GSTIN" if invoice.customer_gstin and not is_non_taxable else "",
+        "Non-Taxable" if is_non_taxable else "Taxable",
+        sac_code if not is_non_taxable else "",  # Air Transport SAC code only for taxable
+        taxcode1,
+        taxcode1_amt,
+        taxcode2,
+        taxcode2_amt,
+        "100" if (invoice.igst_amount > 0 or invoice.cgst_amount > 0 or invoice.sgst_amount > 0) else "Yes",
+        str(invoice.taxable_value + invoice.non_taxable_value + invoice.igst_amount + invoice.cgst_amount + invoice.sgst_amount),  # Grand total for the invoice
+    ))
 
 
-def invoice_to_csv_rows(invoice: InvoiceData, entry_date: Optional[str] = None) -> List[Dict[str, Any]]:
+def invoice_to_csv_row(
+    invoice: InvoiceData, 
+    entry_date: Optional[str] = None,
+    is_non_taxable: bool = False,
+    charge_amount: Optional[float] = None
+) -> Dict[str, Any]:
+    """Convert InvoiceData to a CSV row dictionary (see invoice_to_template_row)."""
+    return INVOICE_ROW_TEMPLATE.to_dict(
+        invoice_to_template_row(invoice, entry_date, is_non_taxable, charge_amount)
+    )
+
+
+def invoice_to_template_rows(invoice: InvoiceData, entry_date: Optional[str] = None) -> List[tuple]:
     """
-    Convert InvoiceData to one or more CSV row dictionaries.
+    Convert InvoiceData to one or more CSV row tuples.
     Creates separate rows for taxable and non-taxable amounts (e.g., Akasa airport charges).
     
     Args:
@@ -1131,7 +1453,7 @@ def invoice_to_csv_rows(invoice: InvoiceData, entry_date: Optional[str] = None)
         entry_date: Entry date in DD-MMM-YYYY format
         
     Returns:
-        List of row dictionaries
+        List of row tuples in CSV_HEADERS order
     """
     if entry_date is None:
         entry_date = get_current_date_formatted()
@@ -1140,22 +1462,45 @@ def invoice_to_csv_rows(invoice: InvoiceData, entry_date: Optional[str] = None)
     
     # Main taxable entry
     if invoice.taxable_value > 0:
-        rows.append(invoice_to_csv_row(invoice, entry_date, is_non_taxable=False))
+        rows.append(invoice_to_template_row(invoice, entry_date, is_non_taxable=False))
     elif invoice.total_amount > 0 and invoice.non_taxable_value == 0:
         # No taxable value but has total - use total as taxable
-        rows.append(invoice_to_csv_row(invoice, entry_date, is_non_taxable=False))
+        rows.append(invoice_to_template_row(invoice, entry_date, is_non_taxable=False))
     
     # Non-taxable entry (airport charges, etc.) - separate row with same invoice number
     if invoice.non_taxable_value > 0:
-        rows.append(invoice_to_csv_row(invoice, entry_date, is_non_taxable=True))
+        rows.append(invoice_to_template_row(invoice, entry_date, is_non_taxable=True))
     
     # If no rows created (edge case), create at least one
     if not rows:
-        rows.append(invoice_to_csv_row(invoice, entry_date, is_non_taxable=False))
+        rows.append(invoice_to_template_row(invoice, entry_date, is_non_taxable=False))
     
     return rows
 
 
+def invoice_to_csv_rows(invoice: InvoiceData, entry_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Convert InvoiceData to one or more CSV row dictionaries (see invoice_to_template_rows)."""
+    return [INVOICE_ROW_TEMPLATE.to_dict(row) for row in invoice_to_template_rows(invoice, entry_date)]
+
+
+# Columns of the emitted-invoice key: same vendor, number and date = same invoice
+INVOICE_KEY_COLUMNS = ["Vendor GSTIN", "Invoice Number", "Invoice Date"]
+
+
+def invoice_key(invoice: InvoiceData) -> tuple:
+    """Duplicate-detection key for an invoice."""
+    return (
+        invoice.vendor_gstin.strip().upper(),
+        invoice.invoice_number.strip().upper(),
+        invoice.invoice_date.strip().upper(),
+    )
+
+
+def open_invoice_index(db_path: Optional[str]) -> EmittedKeyIndex:
+    """Open the emitted-invoice index (db_path None = this batch only)."""
+    return EmittedKeyIndex(db_path, "emitted_invoices", INVOICE_KEY_COLUMNS)
+
+
 def group_invoices_by_gstin(invoices: List[InvoiceData]) -> Dict[str, List[InvoiceData]]:
     """Group invoices by customer GSTIN for separate output files."""
     groups = {}
@@ -1167,68 +1512,251 @@ def group_invoices_by_gstin(invoices: List[InvoiceData]) -> Dict[str, List[Invoi
     return groups
 
 
+def csv_group_filename(group_key: str) -> str:
+    """Output filename for a GSTIN group, e.g. Flight_Exp_Maharashtra_J1Z4_14FEB.csv."""
+    # Get state name for filename
+    if group_key != "UNKNOWN" and group_key != "all" and len(group_key) >= 2:
+        state = STATE_TO_BRANCH.get(group_key[:2], "Unknown")
+    else:
+        state = "Unknown"
+    
+    # Create filename with timestamp to avoid overwriting
+    timestamp = datetime.now().strftime("%d%b").upper() # 14FEB
+    gstin_suffix = group_key[-4:] if len(group_key) >= 4 else group_key
+    state_clean = state.replace(" ", "")
+    return f"Flight_Exp_{state_clean}_{gstin_suffix}_{timestamp}.csv"
+
+
+# Rendered CSV text held in memory across all groups before spilling to disk
+DEFAULT_CSV_MEMORY_BUDGET_MB = 64
+
+
+class _CsvGroup:
+    """Output state of one GSTIN group: in-memory row buffer plus its spill file."""
+    
+    def __init__(self, path: str, spill_path: str):
+        self.path = path
+        self.spill_path = spill_path
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.invoice_count = 0
+        self.unit_sizes: List[int] = []  # Rows per invoice, for splitting into parts
+        self.spilled = False
+
+
+class GroupedCsvWriter:
+    """
+    Writes invoices into one Logisys CSV per customer GSTIN as they arrive.
+    
+    Each invoice is rendered to CSV text as soon as it is added, so the
+    InvoiceData (and its raw text) need not be kept. When the buffered text of
+    all groups exceeds the memory budget, the largest buffers are appended to
+    per-group spill files in output_dir; close() appends what is left and
+    renames each spill file to its Flight_Exp_... name. Output is the same as
+    grouping everything in memory first. With max_rows_per_file, each group
+    is written as numbered parts that never split an invoice's rows. With
+    xlsx, a Flight_Exp_<date>.xlsx review copy is streamed from the spill
+    files too, one sheet per group. With a store, every parsed invoice
+    (duplicates included) is also upserted into the analytics database.
+    """
+    
+    def __init__(
+        self,
+        output_dir: str,
+        group_by_gstin: bool = True,
+        duplicate_index: Optional[EmittedKeyIndex] = None,
+        memory_budget_mb: float = DEFAULT_CSV_MEMORY_BUDGET_MB,
+        max_rows_per_file: Optional[int] = None,
+        xlsx: bool = False,
+        store: Optional[InvoiceStore] = None,
+        skip_emitted: bool = True
+    ):
+        """
+        Args:
+            output_dir: Directory to write CSV files to
+            group_by_gstin: If True, creates separate CSV for each GSTIN
+            duplicate_index: If given, written invoices are recorded in it and
+                duplicates (earlier in this batch or, with skip_emitted, in a
+                previous run) are skipped and listed in a Duplicates_Report CSV
+            memory_budget_mb: Buffered CSV text allowed before spilling to disk
+            max_rows_per_file: If given, split each group file into parts of
+                at most this many rows (plus a _manifest.json)
+            xlsx: Also write the rows to an xlsx workbook, one sheet per group
+            store: If given, every parsed invoice is upserted into it (the
+                store is closed by close() / discard())
+            skip_emitted: If False, invoices emitted in previous runs are
+                written again (and still recorded)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.group_by_gstin = group_by_gstin
+        self.duplicate_index = duplicate_index
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.max_rows_per_file = max_rows_per_file
+        self.xlsx = xlsx
+        self.store = store
+        self.skip_emitted = skip_emitted
+        self.entry_date = get_current_date_formatted()
+        self.groups: Dict[str, _CsvGroup] = {}
+        self.buffered = 0
+    
+    def add(self, invoice: InvoiceData) -> bool:
+        """Add one invoice. Returns False if it was skipped as a duplicate."""
+        failed = bool(invoice.extraction_errors and not invoice.invoice_number)
+        if self.store is not None and not failed:
+            self.store.add(invoice)
+        if self.duplicate_index is not None and not failed:
+            if not self.duplicate_index.check_and_add(invoice_key(invoice), self.skip_emitted):
+                return False
+        
+        if self.group_by_gstin:
+            key = invoice.customer_gstin if invoice.customer_gstin else "UNKNOWN"
+        else:
+            key = "all"
+        group = self.groups.get(key)
+        if group is None:
+            filename = csv_group_filename(key)
+            spill_name = f".{os.path.splitext(filename)[0]}.{len(self.groups)}.partial"
+            group = self.groups[key] = _CsvGroup(
+                os.path.join(self.output_dir, filename),
+                os.path.join(self.output_dir, spill_name),
+            )
+        group.invoice_count += 1
+        if failed:
+            return True  # Counted in its group, but no rows for failed extractions
+        
+        # Get all rows (may be multiple for taxable + non-taxable split)
+        before = group.buffer.tell()
+        rows = invoice_to_template_rows(invoice, self.entry_date)
+        group.writer.writerows(rows)
+        group.unit_sizes.append(len(rows))
+        self.buffered += group.buffer.tell() - before
+        if self.buffered > self.memory_budget:
+            # Largest groups first, until half the budget is free again
+            for largest in sorted(self.groups.values(), key=lambda g: g.buffer.tell(), reverse=True):
+                if self.buffered <= self.memory_budget // 2:
+                    break
+                self._spill(largest)
+        return True
+    
+    def _spill(self, group: _CsvGroup) -> None:
+        """Append a group's buffered rows to its spill file (header on first write)."""
+        text = group.buffer.getvalue()
+        if group.spilled and not text:
+            return
+        with open(group.spill_path, 'a' if group.spilled else 'w', newline='', encoding='utf-8') as f:
+            if not group.spilled:
+                INVOICE_ROW_TEMPLATE.writer(f)  # Header row
+            f.write(text)
+        group.buffer.seek(0)
+        group.buffer.truncate()
+        group.spilled = True
+        self.buffered -= len(text)
+    
+    def close(self) -> List[str]:
+        """Finalize every group file. Returns the generated file paths."""
+        generated_files = []
+        workbook = None
+        if self.xlsx:
+            workbook = XlsxTemplateWriter(
+                os.path.join(self.output_dir, f"Flight_Exp_{datetime.now().strftime('%d%b').upper()}.xlsx"),
+                INVOICE_ROW_TEMPLATE,
+            )
+        for key, group in self.groups.items():
+            self._spill(group)
+            if workbook is not None:
+                with open(group.spill_path, newline='', encoding='utf-8') as f:
+                    rows = csv.reader(f)
+                    next(rows)  # Header row
+                    workbook.write_sheet(key if self.group_by_gstin else "Invoices", rows)
+            if self.max_rows_per_file:
+                with open(group.spill_path, newline='', encoding='utf-8') as f:
+                    rows = csv.reader(f)
+                    next(rows)  # Header row
+                    parts = write_parts(INVOICE_ROW_TEMPLATE, group.path, rows,
+                                        group.unit_sizes, self.max_rows_per_file)
+                os.remove(group.spill_path)
+                generated_files.extend(part.path for part in parts)
+                print(f"Generated: {group.path} ({group.invoice_count} invoice(s), {len(parts)} part(s))")
+                continue
+            os.replace(group.spill_path, group.path)
+            generated_files.append(group.path)
+            print(f"Generated: {group.path} ({group.invoice_count} invoice(s))")
+        if workbook is not None and self.groups:
+            generated_files.append(workbook.save())
+            print(f"Generated: {workbook.path} ({len(self.groups)} sheet(s))")
+        self.groups = {}
+        self.buffered = 0
+        self._close_store()
+        
+        if self.duplicate_index is not None:
+            self.duplicate_index.commit()
+            report = self.duplicate_index.write_report(
+                os.path.join(self.output_dir, f"Duplicates_Report_{datetime.now().strftime('%d%b').upper()}.csv")
+            )
+            if report:
+                print(f"Skipped {len(self.duplicate_index.suppressed)} duplicate invoice(s): {report}")
+        
+        return generated_files
+    
+    def discard(self) -> None:
+        """Drop all buffered rows and remove spill files without producing output."""
+        for group in self.groups.values():
+            if group.spilled and os.path.exists(group.spill_path):
+                os.remove(group.spill_path)
+        self.groups = {}
+        self.buffered = 0
+        self._close_store()  # Parsed invoices are kept even when no CSV is written
+    
+    def _close_store(self) -> None:
+        if self.store is not None:
+            self.store.close()
+            print(f"Stored {self.store.written} invoice(s) in {self.store.db_path}")
+            self.store = None
+
+
 def generate_csv(
-    invoices: List[InvoiceData],
+    invoices: Iterable[InvoiceData],
     output_dir: str,
     group_by_gstin: bool = True,
-    filename_prefix: str = "transport_expenses"
+    filename_prefix: str = "transport_expenses",
+    duplicate_index: Optional[EmittedKeyIndex] = None,
+    memory_budget_mb: float = DEFAULT_CSV_MEMORY_BUDGET_MB,
+    max_rows_per_file: Optional[int] = None,
+    xlsx: bool = False,
+    store: Optional[InvoiceStore] = None
 ) -> List[str]:
     """
-    Generate CSV file(s) from a list of InvoiceData objects.
+    Generate CSV file(s) from InvoiceData objects.
     
     Args:
-        invoices: List of InvoiceData objects
+        invoices: InvoiceData objects (any iterable; a generator is consumed
+            without holding every invoice in memory)
         output_dir: Directory to write CSV files to
         group_by_gstin: If True, creates separate CSV for each GSTIN
         filename_prefix: Prefix for output filenames
+        duplicate_index: If given, invoices already in the index (earlier in
+            this batch or in a previous run) are skipped and listed in a
+            Duplicates_Report CSV; emitted invoices are recorded in it
+        memory_budget_mb: Buffered CSV text allowed before spilling to disk
+        max_rows_per_file: If given, split each output file into numbered
+            parts of at most this many rows, never splitting an invoice
+        xlsx: Also write an xlsx review copy (one sheet per GSTIN group)
+        store: If given, every parsed invoice is upserted into this
+            analytics store (closed when done)
         
     Returns:
         List of generated file paths
     """
-    os.makedirs(output_dir, exist_ok=True)
-    generated_files = []
-    
-    if group_by_gstin:
-        groups = group_invoices_by_gstin(invoices)
-    else:
-        groups = {"all": invoices}
-    
-    entry_date = get_current_date_formatted()
-    
-    for gstin, inv_list in groups.items():
-        # Get state name for filename
-        if gstin != "UNKNOWN" and gstin != "all" and len(gstin) >= 2:
-            state = STATE_TO_BRANCH.get(gstin[:2], "Unknown")
-        else:
-            state = "Unknown"
-        
-        # Create filename with timestamp to avoid overwriting
-        # Create filename with timestamp to avoid overwriting
-        timestamp = datetime.now().strftime("%d%b").upper() # 14FEB
-        gstin_suffix = gstin[-4:] if len(gstin) >= 4 else gstin
-        
-        # Format: Flight_Exp_Maharashtra_J1Z4_14FEB.csv
-        state_clean = state.replace(" ", "")
-        filename = f"Flight_Exp_{state_clean}_{gstin_suffix}_{timestamp}.csv"
-        filepath = os.path.join(output_dir, filename)
-        
-        # Write CSV
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-            writer.writeheader()
-            
-            for inv in inv_list:
-                if inv.extraction_errors and not inv.invoice_number:
-                    continue  # Skip failed extractions
-                # Get all rows (may be multiple for taxable + non-taxable split)
-                rows = invoice_to_csv_rows(inv, entry_date)
-                for row in rows:
-                    writer.writerow(row)
-        
-        generated_files.append(filepath)
-        print(f"Generated: {filepath} ({len(inv_list)} invoice(s))")
-    
-    return generated_files
+    writer = GroupedCsvWriter(output_dir, group_by_gstin, duplicate_index, memory_budget_mb,
+                              max_rows_per_file, xlsx, store)
+    try:
+        for inv in invoices:
+            writer.add(inv)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.close()
 
 
 def generate_single_csv(
@@ -1248,17 +1776,13 @@ def generate_single_csv(
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     entry_date = get_current_date_formatted()
     
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-        writer.writeheader()
-        
-        for inv in invoices:
-            if inv.extraction_errors and not inv.invoice_number:
-                continue  # Skip failed extractions
-            # Get all rows (may be multiple for taxable + non-taxable split)
-            rows = invoice_to_csv_rows(inv, entry_date)
-            for row in rows:
-                writer.writerow(row)
+    # Get all rows (may be multiple for taxable + non-taxable split)
+    INVOICE_ROW_TEMPLATE.write_csv(output_path, [
+        row
+        for inv in invoices
+        if not (inv.extraction_errors and not inv.invoice_number)  # Skip failed extractions
+        for row in invoice_to_template_rows(inv, entry_date)
+    ])
     
     print(f"Generated: {output_path} ({len(invoices)} invoice(s))")
     return output_path
@@ -1266,6 +1790,314 @@ def generate_single_csv(
 
 
 
+# ============================================================
+# BATCH CHECKPOINT JOURNAL SECTION
+# ============================================================
+"""
+Crash-safe checkpoint journal for invoice batches.
+Each completed file is appended as one JSON line so an interrupted batch can
+be resumed: journalled files are replayed, only the remainder is parsed.
+"""
+
+import hashlib
+import json
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BatchJournal:
+    """Append-only JSON-lines journal of the files completed in a batch."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            complete = 0  # Bytes up to the end of the last complete line
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn last line from a crash mid-write
+                    complete += len(line)
+                    try:
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        continue
+                    self.entries[entry["path"]] = entry
+            if complete < os.path.getsize(path):
+                # Cut the torn line off, or the next record would be appended to it
+                with open(path, 'r+b') as f:
+                    f.truncate(complete)
+    
+    @classmethod
+    def for_batch(cls, pdf_paths: List[str], journal_dir: str) -> "BatchJournal":
+        """Open the journal for this exact set of files (same selection = same journal)."""
+        batch_id = hashlib.sha256(
+            "\n".join(sorted(os.path.abspath(p) for p in pdf_paths)).encode("utf-8")
+        ).hexdigest()[:16]
+        os.makedirs(journal_dir, exist_ok=True)
+        return cls(os.path.join(journal_dir, f"batch_{batch_id}.jsonl"))
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def lookup(self, pdf_path: str, file_hash: str) -> Optional[List[InvoiceData]]:
+        """Journalled invoices for this file, or None if it is new or has changed."""
+        entry = self.entries.get(os.path.abspath(pdf_path))
+        if entry is None or entry["sha256"] != file_hash:
+            return None
+        return [InvoiceData.from_dict(d) for d in entry["invoices"]]
+    
+    def record(self, pdf_path: str, file_hash: str, invoices: List[InvoiceData]) -> None:
+        """Append a completed file and force it to disk."""
+        entry = {
+            "path": os.path.abspath(pdf_path),
+            "sha256": file_hash,
+            "invoices": [inv.to_dict() for inv in invoices],
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[entry["path"]] = entry
+    
+    def discard(self) -> None:
+        """Delete the journal once the batch has produced its output."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = {}
+
+
+
+
+# ============================================================
+# INCREMENTAL FOLDER SECTION
+# ============================================================
+"""
+Incremental folder mode.
+A manifest in the invoice folder records each processed PDF's size, mtime,
+hash and emitted invoice keys; later runs stat the folder and parse only
+files that are new or changed.
+"""
+
+
+class FolderManifest:
+    """Record of the PDFs already processed from one folder."""
+    
+    FILENAME = ".invoice_manifest.json"
+    
+    def __init__(self, folder: str):
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, self.FILENAME)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._scanned: Dict[str, tuple] = {}  # name -> (size, mtime_ns, sha256 or "") from the last scan
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get("files", {})
+    
+    def scan(self) -> List[str]:
+        """
+        Return the PDFs that are new or changed since they were recorded.
+        
+        Unchanged size and mtime means unchanged file - it is not opened.
+        Files whose stat changed are hashed, and skipped if the content is
+        still the same (e.g. only copied or touched).
+        """
+        changed = []
+        self._scanned = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                    continue
+                st = entry.stat()
+                known = self.files.get(entry.name)
+                if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                    self._scanned[entry.name] = (st.st_size, st.st_mtime_ns, known["sha256"])
+                    continue
+                digest = file_sha256(entry.path) if known else ""
+                self._scanned[entry.name] = (st.st_size, st.st_mtime_ns, digest)
+                if known and known["sha256"] == digest:
+                    known["size"], known["mtime_ns"] = st.st_size, st.st_mtime_ns
+                    continue
+                changed.append(entry.path)
+        return sorted(changed)
+    
+    def record(self, pdf_path: str, invoices: List[InvoiceData], sha256: str = "") -> None:
+        """
+        Mark a file as processed, with the keys of the invoices it emitted.
+        
+        sha256 is the digest the batch already computed; without it the one
+        from scan() is used, and the file is only hashed if neither exists.
+        """
+        name = os.path.basename(pdf_path)
+        scanned = self._scanned.get(name)
+        if scanned is None:
+            st = os.stat(pdf_path)
+            scanned = (st.st_size, st.st_mtime_ns, "")
+        size, mtime_ns, scanned_sha256 = scanned
+        self.files[name] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "sha256": sha256 or scanned_sha256 or file_sha256(pdf_path),
+            "row_ids": ["|".join(invoice_key(inv)) for inv in invoices],
+        }
+    
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+
+
+# ============================================================
+# BATCH ENGINE SECTION
+# ============================================================
+"""
+Invoice batch engine shared by the GUI and the command line.
+Parses files one by one (replaying journalled ones) and keeps progress
+counters: files/pages done, moving-window throughput, ETA and per-airline
+invoice counts.
+"""
+
+import time
+from collections import deque
+
+
+@dataclass
+class FileResult:
+    """Outcome of one PDF in a batch."""
+    path: str
+    invoices: List[InvoiceData] = field(default_factory=list)
+    stats: Optional[ExtractionStats] = None  # None when replayed from the journal
+    error: str = ""
+    sha256: str = ""  # Content digest, computed once for the journal and manifest
+    
+    @property
+    def parsed(self) -> List[InvoiceData]:
+        """Invoices that yielded an invoice number."""
+        return [inv for inv in self.invoices if inv.invoice_number]
+    
+    @property
+    def replayed(self) -> bool:
+        return self.stats is None and not self.error
+
+
+class BatchProgress:
+    """Running counters for an invoice batch."""
+    
+    def __init__(self, total_files: int, window_seconds: float = 30.0):
+        self.total_files = total_files
+        self.window_seconds = window_seconds
+        self.files_done = 0
+        self.files_failed = 0
+        self.pages_done = 0
+        self.per_airline: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self._window = deque([(self.started, 0)])  # (time, files_done) samples
+    
+    def file_done(self, result: FileResult) -> None:
+        """Account for one finished file."""
+        self.files_done += 1
+        if result.stats is not None:
+            self.pages_done += result.stats.pages
+        parsed = result.parsed
+        if not parsed:
+            self.files_failed += 1
+        for inv in parsed:
+            self.per_airline[inv.airline] = self.per_airline.get(inv.airline, 0) + 1
+        
+        now = time.monotonic()
+        self._window.append((now, self.files_done))
+        while len(self._window) > 2 and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+    
+    @property
+    def files_per_second(self) -> float:
+        """Throughput over the last window_seconds."""
+        (t0, n0), (t1, n1) = self._window[0], self._window[-1]
+        return (n1 - n0) / (t1 - t0) if t1 > t0 else 0.0
+    
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.files_per_second
+        if rate <= 0:
+            return None
+        return (self.total_files - self.files_done) / rate
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict copy of the counters, safe to hand to another thread."""
+        return {
+            "files_done": self.files_done,
+            "files_failed": self.files_failed,
+            "total_files": self.total_files,
+            "pages_done": self.pages_done,
+            "files_per_second": self.files_per_second,
+            "eta_seconds": self.eta_seconds,
+            "elapsed_seconds": time.monotonic() - self.started,
+            "per_airline": dict(self.per_airline),
+            "status_line": self.status_line(),
+        }
+    
+    def status_line(self) -> str:
+        """One-line summary, e.g. for the CLI or the GUI stats panel."""
+        eta = self.eta_seconds
+        eta_text = f"{int(eta // 60)}m{int(eta % 60):02d}s" if eta is not None else "--"
+        line = (
+            f"Files {self.files_done}/{self.total_files}"
+            + (f" ({self.files_failed} failed)" if self.files_failed else "")
+            + f" | Pages {self.pages_done} | {self.files_per_second:.1f} files/s | ETA {eta_text}"
+        )
+        if self.per_airline:
+            line += " | " + ", ".join(f"{a} {n}" for a, n in sorted(self.per_airline.items()))
+        return line
+
+
+def iter_invoice_batch(
+    pdf_paths: List[str],
+    journal: Optional["BatchJournal"] = None,
+    progress: Optional[BatchProgress] = None
+) -> Iterator[FileResult]:
+    """
+    Parse PDFs one at a time, yielding a FileResult per file. The segment
+    pool's workers are stopped when the batch ends (or is abandoned).
+    
+    Args:
+        pdf_paths: PDF files in batch order
+        journal: If given, completed files are replayed from / recorded to it
+        progress: If given, updated before each result is yielded
+    """
+    try:
+        for pdf_path in pdf_paths:
+            result = FileResult(pdf_path)
+            try:
+                file_hash = result.sha256 = file_sha256(pdf_path)
+                invoices = journal.lookup(pdf_path, file_hash) if journal is not None else None
+                if invoices is None:
+                    result.stats = ExtractionStats()
+                    invoices = parse_invoices(pdf_path, stats=result.stats)
+                    if journal is not None:
+                        journal.record(pdf_path, file_hash, invoices)
+                result.invoices = invoices
+            except Exception as e:
+                result.error = str(e)
+            if progress is not None:
+                progress.file_done(result)
+            yield result
+    finally:
+        shutdown_segment_pool()
+
+
+
+
 # ============================================================
 # GUI APP SECTION
 # ============================================================
@@ -1282,7 +2114,7 @@ from datetime import datetime
 from pathlib import Path
 from tkinter import (
     Tk, Frame, Label, Button, Entry, Text, Scrollbar, Canvas,
-    filedialog, messagebox, StringVar, IntVar, BooleanVar,
+    filedialog, messagebox, StringVar, IntVar, BooleanVar, TclError,
     ttk, END, WORD, VERTICAL, RIGHT, LEFT, BOTH, Y, X, TOP, BOTTOM, NW, W, E, N, S
 )
 from typing import List, Optional
@@ -1311,6 +2143,36 @@ LOG_BG = "#FAFBFC"
 LOG_FG = "#1E1E1E"
 
 
+# Log widget limits: oldest lines are trimmed beyond MAX_LOG_LINES, and one
+# polling tick inserts at most MAX_EVENTS_PER_TICK queued events
+MAX_LOG_LINES = 5000
+MAX_EVENTS_PER_TICK = 2000
+LOG_POLL_MS = 100
+
+
+@dataclass
+class UiEvent:
+    """Event posted by the worker thread for the Tk main loop to apply."""
+    kind: str                  # "log", "progress" or "done"
+    message: str = ""
+    tag: Optional[str] = None
+    timestamp: str = ""
+    data: Any = None           # BatchProgress snapshot for "progress"
+
+
+@dataclass
+class ProcessingOptions:
+    """GUI settings read on the Tk thread when processing starts, for the worker thread."""
+    files: List[str]
+    output_dir: str
+    manifest: Optional[FolderManifest]
+    group_by_gstin: bool
+    skip_duplicates: bool
+    max_rows_per_file: Optional[int]
+    xlsx: bool
+    save_to_store: bool
+
+
 class LogRedirector:
     """Redirect print statements to the GUI log."""
     
@@ -1319,7 +2181,8 @@ class LogRedirector:
         self.queue = queue
     
     def write(self, message):
-        self.queue.put(message)
+        if message.strip():
+            self.queue.put(UiEvent("log", message.strip(), timestamp=datetime.now().strftime("%H:%M:%S")))
     
     def flush(self):
         pass
@@ -1336,6 +2199,16 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def app_base_dir():
+    """Directory of the executable (frozen) or of this script."""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+# Persistent record of every invoice written to a CSV
+INVOICE_HISTORY_DB = "invoice_history.sqlite"
+
 
 class InvoiceParserApp:
     """Main application class for the Invoice Parser GUI."""
@@ -1351,8 +2224,13 @@ class InvoiceParserApp:
         
         # Variables
         self.selected_files: List[str] = []
+        self.manifest: Optional[FolderManifest] = None  # Set in incremental folder mode
         self.output_dir = StringVar(value=os.getcwd())
         self.group_by_gstin = BooleanVar(value=True)
+        self.skip_duplicates = BooleanVar(value=True)
+        self.max_rows_per_file = IntVar(value=0)  # 0 = no limit
+        self.write_xlsx = BooleanVar(value=False)
+        self.save_to_store = BooleanVar(value=False)
         self.is_processing = False
         self.log_queue = queue.Queue()
         
@@ -1519,7 +2397,28 @@ class InvoiceParserApp:
         btn_frame.pack(fill=X)
 
         ttk.Button(btn_frame, text="Select Files", command=self._select_files, style="Modern.TButton").pack(side=LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="Select Folder (New Files Only)", command=self._select_folder_incremental, style="Modern.TButton").pack(side=LEFT, padx=(0, 10))
         ttk.Button(btn_frame, text="Clear Selection", command=self._clear_files, style="Modern.TButton").pack(side=LEFT)
+        ttk.Checkbutton(
+            btn_frame, text="Skip invoices already exported",
+            variable=self.skip_duplicates, style="Modern.TCheckbutton",
+        ).pack(side=LEFT, padx=(20, 0))
+        Label(
+            btn_frame, text="Max rows per file (0 = no limit):",
+            fg=TEXT_SECONDARY, bg=CARD_BG, font=("Segoe UI", 10),
+        ).pack(side=LEFT, padx=(20, 5))
+        ttk.Spinbox(
+            btn_frame, from_=0, to=100000, increment=100, width=8,
+            textvariable=self.max_rows_per_file,
+        ).pack(side=LEFT)
+        ttk.Checkbutton(
+            btn_frame, text="Also write .xlsx",
+            variable=self.write_xlsx, style="Modern.TCheckbutton",
+        ).pack(side=LEFT, padx=(20, 0))
+        ttk.Checkbutton(
+            btn_frame, text="Save to analytics store",
+            variable=self.save_to_store, style="Modern.TCheckbutton",
+        ).pack(side=LEFT, padx=(20, 0))
 
         # --- Action Row ---
         action_frame = Frame(body, bg=BG_COLOR)
@@ -1534,7 +2433,7 @@ class InvoiceParserApp:
         self.process_btn.pack(side=LEFT, padx=(0, 20))
 
         self.progress = ttk.Progressbar(
-            action_frame, mode="indeterminate", length=300,
+            action_frame, mode="determinate", length=300,
             style="blue.Horizontal.TProgressbar",
         )
         self.progress.pack(side=LEFT, padx=(0, 15))
@@ -1542,6 +2441,10 @@ class InvoiceParserApp:
         self.status_label = Label(action_frame, text="Ready", fg=TEXT_SECONDARY, bg=BG_COLOR, font=("Segoe UI", 9))
         self.status_label.pack(side=LEFT)
 
+        # --- Batch Stats Panel ---
+        self.stats_label = Label(body, text="", fg=TEXT_SECONDARY, bg=BG_COLOR, font=("Segoe UI", 9), anchor=W)
+        self.stats_label.pack(fill=X, pady=(0, 10))
+
         # --- Log Section Card ---
         # Occupy remaining space
         log_card = ttk.LabelFrame(body, text="  Processing Log  ", style="Card.TLabelframe", padding=15)
@@ -1584,29 +2487,41 @@ class InvoiceParserApp:
         clear_log_btn.pack(side=RIGHT)
     
     def _log(self, message: str, tag: str = None):
-        """Add a message to the log text widget."""
-        self.log_text.configure(state="normal")
+        """Queue a message for the log widget (safe to call from any thread)."""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted = f"[{timestamp}] {message}\n"
-        
-        if tag:
-            self.log_text.insert(END, formatted, tag)
-        else:
-            self.log_text.insert(END, formatted)
-        
-        self.log_text.see(END)
-        self.log_text.configure(state="disabled")
+        self.log_queue.put(UiEvent("log", message, tag, timestamp))
     
     def _start_log_polling(self):
-        """Poll the log queue and update the text widget."""
+        """Drain queued events and apply them to the widgets in one batch."""
+        chunks = []
+        actions = []
         try:
-            while True:
-                message = self.log_queue.get_nowait()
-                if message.strip():
-                    self._log(message.strip())
+            for _ in range(MAX_EVENTS_PER_TICK):
+                event = self.log_queue.get_nowait()
+                if event.kind == "log":
+                    chunks.extend((f"[{event.timestamp}] {event.message}\n", event.tag or ()))
+                else:
+                    actions.append(event)
         except queue.Empty:
             pass
-        self.root.after(100, self._start_log_polling)
+        
+        if chunks:
+            self.log_text.configure(state="normal")
+            self.log_text.insert(END, *chunks)
+            line_count = int(self.log_text.index("end-1c").split(".")[0])
+            if line_count > MAX_LOG_LINES:
+                self.log_text.delete("1.0", f"{line_count - MAX_LOG_LINES + 1}.0")
+            self.log_text.see(END)
+            self.log_text.configure(state="disabled")
+        
+        for event in actions:
+            if event.kind == "progress":
+                self.progress.configure(maximum=max(event.data["total_files"], 1), value=event.data["files_done"])
+                self.stats_label.configure(text=event.data["status_line"])
+            elif event.kind == "done":
+                self._processing_complete()
+        
+        self.root.after(LOG_POLL_MS, self._start_log_polling)
     
     def _select_files(self):
         """Open file dialog to select PDF files."""
@@ -1616,11 +2531,24 @@ class InvoiceParserApp:
         )
         if files:
             self.selected_files = list(files)
+            self.manifest = None
             self._update_file_list()
     
+    def _select_folder_incremental(self):
+        """Select a folder and queue only PDFs that are new or changed since the last run."""
+        folder = filedialog.askdirectory(title="Select Invoice Folder")
+        if not folder:
+            return
+        self.manifest = FolderManifest(folder)
+        self.selected_files = self.manifest.scan()
+        self._update_file_list()
+        self._log(f"{folder}: {len(self.selected_files)} new or changed PDF(s), "
+                  f"{len(self.manifest.files)} already processed", "info")
+    
     def _clear_files(self):
         """Clear the file selection."""
         self.selected_files = []
+        self.manifest = None
         self._update_file_list()
     
     def _update_file_list(self):
@@ -1645,77 +2573,127 @@ class InvoiceParserApp:
         
         if self.is_processing:
             return
+        try:
+            max_rows = self.max_rows_per_file.get()
+        except TclError:
+            max_rows = -1
+        if max_rows < 0:
+            messagebox.showwarning("Invalid Setting", "Max rows per file must be a whole number (0 = no limit).")
+            return
+        # Asked up front: CSV rows are written to it while the PDFs are parsed
+        output_dir = filedialog.askdirectory(
+            title="Select Output Directory for CSV",
+            initialdir=self.output_dir.get(),
+        )
+        if not output_dir:
+            return
+        self.output_dir.set(output_dir)
+        # Tk variables are read here, on the Tk thread; the worker only sees this snapshot
+        options = ProcessingOptions(
+            files=list(self.selected_files),
+            output_dir=output_dir,
+            manifest=self.manifest,
+            group_by_gstin=self.group_by_gstin.get(),
+            skip_duplicates=self.skip_duplicates.get(),
+            max_rows_per_file=max_rows or None,
+            xlsx=self.write_xlsx.get(),
+            save_to_store=self.save_to_store.get(),
+        )
         
         self.is_processing = True
         self.process_btn.configure(state="disabled")
-        self.progress.start(10)
+        self.progress.configure(maximum=len(self.selected_files), value=0)
+        self.stats_label.configure(text="")
         self.status_label.configure(text="Processing...", fg=ACCENT)
         
         # Start background thread
-        thread = threading.Thread(target=self._process_invoices, daemon=True)
+        thread = threading.Thread(target=self._process_invoices, args=(options,), daemon=True)
         thread.start()
     
-    def _process_invoices(self):
-        """Process all selected invoices (runs in background thread)."""
+    def _process_invoices(self, options: ProcessingOptions):
+        """Process all selected invoices (runs in background thread; no Tk calls)."""
         try:
-            parsed_invoices: List[InvoiceData] = []
-            total = len(self.selected_files)
+            total = len(options.files)
             success_count = 0
             failed_count = 0
+            parsed_count = 0
             
             self._log(f"Starting to process {total} file(s)...", "info")
             
-            for i, pdf_path in enumerate(self.selected_files, 1):
-                filename = os.path.basename(pdf_path)
-                
-                try:
-                    self._log(f"[{i}/{total}] Parsing: {filename}")
-                    invoice = parse_invoice(pdf_path)
+            journal = BatchJournal.for_batch(options.files, os.path.join(app_base_dir(), "journals"))
+            if len(journal):
+                self._log(f"Resuming batch: {len(journal)} file(s) already completed", "info")
+            
+            # Invoices are written (and spilled to disk past the budget) as files
+            # finish, so only rendered CSV text - not every InvoiceData - stays in memory
+            # Written invoices are always recorded; the option only decides whether
+            # invoices exported in earlier runs are skipped
+            duplicate_index = open_invoice_index(os.path.join(app_base_dir(), INVOICE_HISTORY_DB))
+            csv_writer = GroupedCsvWriter(
+                options.output_dir,
+                group_by_gstin=options.group_by_gstin,
+                duplicate_index=duplicate_index,
+                max_rows_per_file=options.max_rows_per_file,
+                xlsx=options.xlsx,
+                store=InvoiceStore(os.path.join(app_base_dir(), INVOICE_STORE_DB)) if options.save_to_store else None,
+                skip_emitted=options.skip_duplicates,
+            )
+            progress = BatchProgress(total)
+            manifest = options.manifest
+            try:
+                for i, result in enumerate(iter_invoice_batch(options.files, journal, progress), 1):
+                    filename = os.path.basename(result.path)
+                    self.log_queue.put(UiEvent("progress", data=progress.snapshot()))
                     
-                    if invoice.invoice_number:
-                        parsed_invoices.append(invoice)
-                        self._log(f"  ✓ {invoice.airline}: {invoice.invoice_number} | Total: ₹{invoice.total_amount}", "success")
+                    if result.error:
+                        self._log(f"[{i}/{total}] {filename}", None)
+                        self._log(f"  ✗ Error processing {filename}: {result.error}", "error")
+                        failed_count += 1
+                        continue
+                    
+                    self._log(f"[{i}/{total}] {'Replayed' if result.replayed else 'Parsed'}: {filename}")
+                    parsed = result.parsed
+                    if parsed:
+                        for invoice in parsed:
+                            csv_writer.add(invoice)
+                            self._log(f"  ✓ {invoice.airline}: {invoice.invoice_number} | Total: ₹{invoice.total_amount}", "success")
+                        parsed_count += len(parsed)
+                        if manifest is not None:
+                            manifest.record(result.path, parsed, result.sha256)  # Saved only after the CSVs are written
+                        if result.stats is not None:
+                            self._log(f"    {result.stats.pages} page(s) via {result.stats.backend} | Peak RSS: {result.stats.peak_rss_mb:.0f} MB")
                         success_count += 1
                     else:
+                        invoice = result.invoices[0]
                         errors = ", ".join(invoice.extraction_errors) if invoice.extraction_errors else "Unknown error"
                         self._log(f"  ✗ Failed: {errors}", "error")
                         failed_count += 1
-                        
-                except Exception as e:
-                    self._log(f"  ✗ Error processing {filename}: {str(e)}", "error")
-                    failed_count += 1
+            except BaseException:
+                csv_writer.discard()
+                raise
             
-            # Generate CSV
-            if parsed_invoices:
+            # Finish the CSV file(s)
+            if parsed_count:
                 self._log(f"\nGenerating CSV file(s)...", "info")
-
-                # Ask user where to save
-                output_dir = filedialog.askdirectory(
-                    title="Select Output Directory for CSV",
-                    initialdir=os.getcwd(),
-                )
-                if not output_dir:
-                    self._log("CSV generation cancelled by user.", "warning")
-                    return
-
-                self.output_dir.set(output_dir)
-                
                 try:
-                    generated_files = generate_csv(
-                        parsed_invoices,
-                        output_dir,
-                        group_by_gstin=self.group_by_gstin.get()
-                    )
+                    generated_files = csv_writer.close()
                     
                     for f in generated_files:
                         self._log(f"  ✓ Created: {os.path.basename(f)}", "success")
+                    for key, reason in duplicate_index.suppressed:
+                        self._log(f"  ⚠ Skipped duplicate {key[1]} ({reason})", "warning")
                     
+                    if manifest is not None:
+                        manifest.save()
+                    journal.discard()
                     self._log(f"\n✓ Complete! Processed {success_count}/{total} invoices.", "success")
-                    self._log(f"  Output directory: {output_dir}", "info")
+                    self._log(f"  Output directory: {options.output_dir}", "info")
                     
                 except Exception as e:
+                    csv_writer.discard()
                     self._log(f"  ✗ CSV generation error: {str(e)}", "error")
             else:
+                csv_writer.discard()
                 self._log("No invoices were successfully parsed.", "warning")
             
             if failed_count > 0:
@@ -1726,18 +2704,128 @@ class InvoiceParserApp:
         
         finally:
             # Update UI in main thread
-            self.root.after(0, self._processing_complete)
+            self.log_queue.put(UiEvent("done"))
     
     def _processing_complete(self):
         """Called when processing is complete."""
         self.is_processing = False
         self.process_btn.configure(state="normal")
-        self.progress.stop()
         self.status_label.configure(text="Complete", fg=SUCCESS_GREEN)
 
 
+def collect_pdf_paths(paths: List[str]) -> List[str]:
+    """Expand folders into the PDF files they contain (sorted by name)."""
+    pdf_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdf_paths.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".pdf")
+            )
+        else:
+            pdf_paths.append(path)
+    return pdf_paths
+
+
+def run_cli(argv: List[str]) -> int:
+    """Command-line batch mode: parse PDFs and write the Logisys CSV(s)."""
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(
+        prog="invoice_processor",
+        description="Parse airline invoice PDFs and generate Logisys CSV files.",
+    )
+    arg_parser.add_argument("paths", nargs="+", help="PDF files or folders of PDFs")
+    arg_parser.add_argument("-o", "--output-dir", default=os.getcwd(), help="Directory for the CSV files")
+    arg_parser.add_argument("--single-file", action="store_true", help="One CSV instead of one per customer GSTIN")
+    arg_parser.add_argument("--include-duplicates", action="store_true", help="Do not skip invoices exported in previous runs (they are still recorded)")
+    arg_parser.add_argument("--status-interval", type=float, default=5.0, help="Seconds between status lines")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="For folders, parse only PDFs new or changed since the last incremental run")
+    arg_parser.add_argument("--memory-budget-mb", type=float, default=DEFAULT_CSV_MEMORY_BUDGET_MB,
+                            help="CSV rows buffered in memory before spilling to disk")
+    arg_parser.add_argument("--max-rows-per-file", type=int, default=None,
+                            help="Split each CSV into numbered parts of at most this many rows")
+    arg_parser.add_argument("--xlsx", action="store_true",
+                            help="Also write an xlsx copy (one sheet per customer GSTIN) for review in Excel")
+    arg_parser.add_argument("--store", nargs="?", const=os.path.join(app_base_dir(), INVOICE_STORE_DB),
+                            help="Also upsert every parsed invoice into an analytics SQLite store "
+                                 f"(default: {INVOICE_STORE_DB} next to the program); query it with invoice_store.py")
+    args = arg_parser.parse_args(argv)
+    if args.max_rows_per_file is not None and args.max_rows_per_file <= 0:
+        arg_parser.error("--max-rows-per-file must be positive")
+    
+    manifests: List[FolderManifest] = []
+    if args.incremental:
+        pdf_paths = []
+        for path in args.paths:
+            if os.path.isdir(path):
+                manifest = FolderManifest(path)
+                pdf_paths.extend(manifest.scan())
+                manifests.append(manifest)
+            else:
+                pdf_paths.append(path)
+        if not pdf_paths:
+            print("No new or changed PDF files.")
+            return 0
+    else:
+        pdf_paths = collect_pdf_paths(args.paths)
+    if not pdf_paths:
+        print("No PDF files found.")
+        return 1
+    
+    journal = BatchJournal.for_batch(pdf_paths, os.path.join(app_base_dir(), "journals"))
+    if len(journal):
+        print(f"Resuming batch: {len(journal)} file(s) already completed")
+    
+    # Rows are written (and spilled to disk past the budget) as files finish,
+    # so only rendered CSV text - not every InvoiceData - stays in memory
+    duplicate_index = open_invoice_index(os.path.join(app_base_dir(), INVOICE_HISTORY_DB))
+    csv_writer = GroupedCsvWriter(
+        args.output_dir, group_by_gstin=not args.single_file,
+        duplicate_index=duplicate_index, memory_budget_mb=args.memory_budget_mb,
+        max_rows_per_file=args.max_rows_per_file, xlsx=args.xlsx,
+        store=InvoiceStore(args.store) if args.store else None,
+        skip_emitted=not args.include_duplicates,
+    )
+    folders = {m.folder: m for m in manifests}
+    progress = BatchProgress(len(pdf_paths))
+    parsed_count = 0
+    last_status = time.monotonic()
+    for result in iter_invoice_batch(pdf_paths, journal, progress):
+        if result.error or not result.parsed:
+            reason = result.error or ", ".join(result.invoices[0].extraction_errors) or "Unknown error"
+            print(f"Failed: {os.path.basename(result.path)}: {reason}")
+        else:
+            manifest = folders.get(os.path.dirname(os.path.abspath(result.path)))
+            if manifest is not None:
+                manifest.record(result.path, result.parsed, result.sha256)  # Saved only after the CSVs are written
+        for inv in result.parsed:
+            csv_writer.add(inv)
+        parsed_count += len(result.parsed)
+        if time.monotonic() - last_status >= args.status_interval:
+            print(progress.status_line())
+            last_status = time.monotonic()
+    print(progress.status_line())
+    
+    if not parsed_count:
+        csv_writer.discard()
+        print("No invoices were successfully parsed.")
+        return 1
+    
+    csv_writer.close()
+    for manifest in manifests:
+        manifest.save()
+    journal.discard()
+    return 0
+
+
 def main():
-    """Main entry point."""
+    """Main entry point. With arguments, runs the command-line batch mode."""
+    import multiprocessing
+    multiprocessing.freeze_support()  # Segment pool workers in the PyInstaller build
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     root = Tk()
     app = InvoiceParserApp(root)
     root.mainloop()
@@ -0,0 +1,229 @@
+"""
+Invoice Store
+Optional SQLite sink for every parsed invoice, so questions like "total IGST
+to IndiGo for GSTIN ...J1Z4 in Q2" can be answered without reparsing PDFs.
+Invoices are upserted (same vendor GSTIN, invoice number and date = same
+invoice) in batched transactions, with indexes on customer GSTIN, vendor
+GSTIN, airline, invoice date and PNR.
+
+Usage:
+    python invoice_store.py --db invoice_store.sqlite query "SELECT ..." [-p VALUE ...]
+    python invoice_store.py --db invoice_store.sqlite export "SELECT * FROM invoices WHERE ..." OUT.csv
+
+Dates are queryable as invoice_date_iso (YYYY-MM-DD), e.g.
+
+    SELECT SUM(igst_amount) FROM invoices
+    WHERE airline = 'IndiGo' AND customer_gstin LIKE '%J1Z4'
+      AND invoice_date_iso BETWEEN '2025-07-01' AND '2025-09-30'
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+# Default store file, next to the executable / script
+INVOICE_STORE_DB = "invoice_store.sqlite"
+
+# InvoiceData fields kept in the store (raw_text and extraction_errors are not)
+INVOICE_TEXT_FIELDS = [
+    "airline", "invoice_number", "invoice_date", "invoice_type", "customer_name",
+    "customer_gstin", "vendor_gstin", "place_of_supply", "state_code", "currency",
+    "pnr", "passenger_name", "routing", "flight_from", "flight_to",
+]
+INVOICE_AMOUNT_FIELDS = [
+    "taxable_value", "non_taxable_value", "cgst_rate", "cgst_amount", "sgst_rate",
+    "sgst_amount", "igst_rate", "igst_amount", "total_amount",
+]
+INVOICE_FIELDS = INVOICE_TEXT_FIELDS + INVOICE_AMOUNT_FIELDS
+
+# Same invoice = same vendor, number and date (as the emitted-invoice index)
+INVOICE_STORE_KEY = ["vendor_gstin", "invoice_number", "invoice_date"]
+
+INDEXED_COLUMNS = ["customer_gstin", "vendor_gstin", "airline", "invoice_date_iso", "pnr"]
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def app_base_dir() -> str:
+    """Directory of the executable (frozen) or of this script, as in invoice_processor."""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def _iso_date(text: str) -> Optional[str]:
+    """YYYY-MM-DD for a DD-MMM-YYYY invoice date, None if it does not parse."""
+    try:
+        return datetime.strptime(text.strip(), "%d-%b-%Y").date().isoformat()
+    except (AttributeError, ValueError):
+        return None
+
+
+class InvoiceStore:
+    """
+    Upserts parsed invoices into a SQLite table. Invoices are buffered and
+    written batch_size at a time, each batch in one transaction; close()
+    writes the rest.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.pending: List[tuple] = []
+        self.written = 0
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        with self.conn:
+            cols = ", ".join(
+                [f"{f} TEXT NOT NULL DEFAULT ''" for f in INVOICE_TEXT_FIELDS]
+                + [f"{f} REAL NOT NULL DEFAULT 0" for f in INVOICE_AMOUNT_FIELDS]
+            )
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS invoices ({cols}, invoice_date_iso TEXT, stored_at TEXT, "
+                f"UNIQUE ({', '.join(INVOICE_STORE_KEY)}))"
+            )
+            for column in INDEXED_COLUMNS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS invoices_{column} ON invoices ({column})")
+
+    def __enter__(self) -> "InvoiceStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, invoice: Any) -> bool:
+        """Queue one InvoiceData. Returns False (and stores nothing) if it has no invoice number."""
+        if not invoice.invoice_number:
+            return False
+        self.pending.append(
+            tuple(getattr(invoice, f) for f in INVOICE_FIELDS) + (_iso_date(invoice.invoice_date),)
+        )
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """Upsert the queued invoices in one transaction. Returns how many were written."""
+        if not self.pending:
+            return 0
+        columns = INVOICE_FIELDS + ["invoice_date_iso", "stored_at"]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in INVOICE_STORE_KEY)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO invoices ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+                f"ON CONFLICT ({', '.join(INVOICE_STORE_KEY)}) DO UPDATE SET {updates}",
+                [row + (now,) for row in self.pending],
+            )
+        count = len(self.pending)
+        self.written += count
+        self.pending = []
+        return count
+
+    def close(self) -> None:
+        """Write queued invoices and close the database."""
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+
+def _connect_read_only(db_path: str) -> sqlite3.Connection:
+    """
+    Raises:
+        FileNotFoundError: No store at db_path
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Invoice store not found: {db_path}")
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+
+def run_query(db_path: str, sql: str, params: Sequence[Any] = ()) -> Tuple[List[str], List[tuple]]:
+    """Column names and rows of a query against the store (opened read-only)."""
+    with closing(_connect_read_only(db_path)) as conn:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description or []]
+        return columns, cursor.fetchall()
+
+
+def iter_invoices(db_path: str, sql: str, params: Sequence[Any] = ()) -> Iterator[Any]:
+    """
+    InvoiceData for each row of a query selecting from invoices (e.g.
+    SELECT * FROM invoices WHERE ...). Columns that are not InvoiceData
+    fields are ignored.
+
+    Raises:
+        ValueError: The query does not return the invoice number column
+    """
+    from invoice_processor import InvoiceData
+
+    with closing(_connect_read_only(db_path)) as conn:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description or []]
+        if "invoice_number" not in columns:
+            raise ValueError("Query must select invoice columns (e.g. SELECT * FROM invoices ...)")
+        wanted = [(i, c) for i, c in enumerate(columns) if c in INVOICE_FIELDS]
+        for row in cursor:
+            yield InvoiceData(**{c: row[i] for i, c in wanted})
+
+
+def export_csv(db_path: str, sql: str, output_path: str, params: Sequence[Any] = ()) -> int:
+    """
+    Write the invoices a query selects as a Logisys template CSV, built with
+    invoice_to_csv_rows as for freshly parsed invoices. Returns the row count.
+    """
+    from invoice_processor import INVOICE_ROW_TEMPLATE, get_current_date_formatted, invoice_to_csv_rows
+
+    entry_date = get_current_date_formatted()
+    count = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=INVOICE_ROW_TEMPLATE.headers)
+        writer.writeheader()
+        for invoice in iter_invoices(db_path, sql, params):
+            rows = invoice_to_csv_rows(invoice, entry_date)
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def main(argv: List[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Query the invoice store or export a query to a Logisys CSV.")
+    arg_parser.add_argument("--db", default=os.path.join(app_base_dir(), INVOICE_STORE_DB),
+                            help="Invoice store SQLite file")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("query", help="Run a SQL query and print the result")
+    p.add_argument("sql", help="SQL query (table: invoices)")
+    p.add_argument("-p", "--param", action="append", default=[], help="Value for a ? placeholder (repeatable)")
+
+    p = sub.add_parser("export", help="Write the invoices a query selects as a Logisys template CSV")
+    p.add_argument("sql", help="SQL query selecting invoice rows, e.g. SELECT * FROM invoices WHERE ...")
+    p.add_argument("output", help="Output CSV path")
+    p.add_argument("-p", "--param", action="append", default=[], help="Value for a ? placeholder (repeatable)")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        if args.command == "query":
+            columns, rows = run_query(args.db, args.sql, args.param)
+            writer = csv.writer(sys.stdout, lineterminator="\n")
+            writer.writerow(columns)
+            writer.writerows(rows)
+            print(f"({len(rows)} row(s))", file=sys.stderr)
+        else:
+            count = export_csv(args.db, args.sql, args.output, args.param)
+            print(f"Exported {count} row(s) to {args.output}")
+    except (sqlite3.Error, FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
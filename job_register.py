@@ -0,0 +1,362 @@
+"""
+Job Register Index
+Loads a Job Register (CSV or Excel) once into a BOE No -> Job No lookup and
+caches it per file, reloading only when the file changes on disk.
+
+Registers only grow (new BE rows are appended daily), so an index remembers
+how far it read: the row count, the byte offset of its last row (CSV) and
+that row's values. When the file has only grown and its last indexed row is
+unchanged, just the tail is parsed (seeking past the indexed bytes of a CSV,
+streaming an xlsx from its last indexed row) and merged; otherwise the index is
+rebuilt.
+
+Several registers (one per fiscal year and branch) can be merged into one
+index: they are loaded in parallel, BOEs that map to different Job Nos in
+different registers are reported as conflicts (the first register in the
+given order wins), and the register indexes are cached together in one
+file on disk so the merged index reloads without reparsing any register
+that has not changed.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from input_schema import InputSchema, SchemaColumn
+
+# Header aliases accepted for each required Job Register column
+POSSIBLE_BOE_COLUMNS = ["BOE No", "BE No.", "BE No", "BOE No.", "BOE Number", "Bill of Entry No"]
+POSSIBLE_JOB_COLUMNS = ["Job No.", "Job No", "Job Number", "Ref No", "Reference No"]
+
+# Only these two columns are read, as text
+JOB_REGISTER_SCHEMA = InputSchema("Job Register", [
+    SchemaColumn("BOE No", tuple(POSSIBLE_BOE_COLUMNS)),
+    SchemaColumn("Job No", tuple(POSSIBLE_JOB_COLUMNS)),
+])
+
+
+def _row_fingerprint(boe: Any, job_no: Any) -> str:
+    return f"{boe!r}|{job_no!r}"
+
+
+def _last_row_offset(path: str, size: int) -> int:
+    """Byte offset where the last line of a CSV starts (ignoring a final newline)."""
+    end = size - 1  # Skip the trailing newline, if any
+    block = 64 * 1024
+    with open(path, 'rb') as f:
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block)
+            f.seek(start)
+            found = f.read(pos - start).rfind(b"\n")
+            if found >= 0:
+                return start + found + 1
+            pos = start
+    return 0
+
+
+class JobRegisterIndex:
+    """BOE No -> Job No lookup built from one Job Register file."""
+
+    def __init__(
+        self,
+        path: str,
+        jobs: Dict[str, Any],
+        size: int = 0,
+        mtime_ns: int = 0,
+        rows: int = 0,
+        header: Optional[List[str]] = None,
+        last_row: str = "",
+        last_row_offset: int = 0
+    ):
+        self.path = path
+        self.jobs = jobs  # lower-cased BOE No -> Job No (first occurrence wins)
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # How far the file was indexed, for append-only refreshes
+        self.rows = rows
+        self.header = header or []
+        self.last_row = last_row  # fingerprint of the last indexed row
+        self.last_row_offset = last_row_offset  # CSV: byte offset of that row
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    @classmethod
+    def load(cls, path: str) -> "JobRegisterIndex":
+        """
+        Read a Job Register and index it.
+
+        Raises:
+            ValueError: Unsupported file type or a required column is missing
+        """
+        st = os.stat(path)
+        df = JOB_REGISTER_SCHEMA.read(path)
+        index = cls(path, {}, st.st_size, st.st_mtime_ns, header=df.attrs["header"])
+        index._add_rows(df)
+        if path.lower().endswith('.csv') and index.rows:
+            index.last_row_offset = _last_row_offset(path, st.st_size)
+        return index
+
+    def _add_rows(self, df) -> None:
+        # BOE numbers are read as text, so only case and whitespace need normalizing
+        boes = df["BOE No"].astype(str).str.strip().str.lower()
+        for boe, job_no in zip(boes, df["Job No"]):
+            self.jobs.setdefault(boe, job_no)
+        if len(df):
+            self.rows += len(df)
+            self.last_row = _row_fingerprint(df["BOE No"].iat[-1], df["Job No"].iat[-1])
+
+    def refresh(self) -> Optional["JobRegisterIndex"]:
+        """
+        Index extended with the rows appended since this one was built, or
+        None if the file was changed in any other way (rebuild it instead).
+        """
+        st = os.stat(self.path)
+        if not self.rows or st.st_size < self.size:
+            return None
+        try:
+            if self.path.lower().endswith('.csv'):
+                if JOB_REGISTER_SCHEMA.read_csv_header(self.path) != self.header:
+                    return None
+                with open(self.path, 'rb') as f:
+                    f.seek(self.last_row_offset)
+                    tail = f.read(st.st_size - self.last_row_offset)
+                df = JOB_REGISTER_SCHEMA.read_csv_rows(tail, self.header)
+            else:
+                # Stream from the last indexed row (re-read to check it); the
+                # rows before it are not converted
+                df = JOB_REGISTER_SCHEMA.read_xlsx_rows(self.path, min_row=self.rows + 1)
+                if df.attrs["header"] != self.header:
+                    return None
+        except (OSError, ValueError):
+            return None
+        if not len(df) or _row_fingerprint(df["BOE No"].iat[0], df["Job No"].iat[0]) != self.last_row:
+            return None
+
+        index = JobRegisterIndex(
+            self.path, dict(self.jobs), st.st_size, st.st_mtime_ns,
+            self.rows, self.header, self.last_row, self.last_row_offset,
+        )
+        index._add_rows(df.iloc[1:])  # The first row is the one already indexed
+        if self.path.lower().endswith('.csv') and len(df) > 1:
+            index.last_row_offset = _last_row_offset(self.path, st.st_size)
+        return index
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": os.path.abspath(self.path),
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "rows": self.rows,
+            "header": self.header,
+            "last_row": self.last_row,
+            "last_row_offset": self.last_row_offset,
+            "jobs": self.jobs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "JobRegisterIndex":
+        return cls(
+            data["path"], data["jobs"], data["size"], data["mtime_ns"],
+            data["rows"], data["header"], data["last_row"], data["last_row_offset"],
+        )
+
+    def lookup(self, boe_number: Any) -> Optional[Any]:
+        """Job No for a BOE No, or None if it is not in the register."""
+        return self.jobs.get(str(boe_number).strip().lower())
+
+    def source(self, boe_number: Any) -> Optional[str]:
+        """Register file name a BOE No was found in."""
+        return os.path.basename(self.path) if self.lookup(boe_number) is not None else None
+
+
+REGISTER_SUFFIXES = ('.csv', '.xlsx')
+
+
+def resolve_register_paths(selection: Iterable[str]) -> List[str]:
+    """
+    Register files for a selection of files and/or folders (each folder
+    expanded to its .csv/.xlsx files by name), without duplicates.
+    """
+    paths: List[str] = []
+    seen = set()
+    for item in selection:
+        if os.path.isdir(item):
+            found = sorted(
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.lower().endswith(REGISTER_SUFFIXES) and not name.startswith(('~$', '.'))
+            )
+        else:
+            found = [item]
+        for path in found:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+
+class MergedJobRegisterIndex:
+    """BOE No -> Job No lookup over several registers, remembering each match's source."""
+
+    def __init__(
+        self,
+        paths: List[str],
+        jobs: Dict[str, Tuple[Any, int]],
+        conflicts: Dict[str, List[Tuple[int, Any]]]
+    ):
+        self.paths = paths
+        self.jobs = jobs  # lower-cased BOE No -> (Job No, index into paths)
+        self.conflicts = conflicts  # BOE No -> [(index into paths, Job No), ...] when registers disagree
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    @classmethod
+    def merge(cls, paths: List[str], indexes: List[JobRegisterIndex]) -> "MergedJobRegisterIndex":
+        jobs: Dict[str, Tuple[Any, int]] = {}
+        conflicts: Dict[str, List[Tuple[int, Any]]] = {}
+        for i, index in enumerate(indexes):
+            for boe, job_no in index.jobs.items():
+                existing = jobs.get(boe)
+                if existing is None:
+                    jobs[boe] = (job_no, i)
+                elif not _same_job(existing[0], job_no):
+                    conflicts.setdefault(boe, [(existing[1], existing[0])]).append((i, job_no))
+        return cls(list(paths), jobs, conflicts)
+
+    def lookup(self, boe_number: Any) -> Optional[Any]:
+        """Job No for a BOE No (from the first register listing it), or None."""
+        entry = self.jobs.get(str(boe_number).strip().lower())
+        return entry[0] if entry is not None else None
+
+    def source(self, boe_number: Any) -> Optional[str]:
+        """Register file name the Job No for a BOE No came from."""
+        entry = self.jobs.get(str(boe_number).strip().lower())
+        return os.path.basename(self.paths[entry[1]]) if entry is not None else None
+
+    def conflict_report(self) -> List[str]:
+        """One line per BOE No that maps to different Job Nos in different registers."""
+        return [
+            f"BOE No. {boe}: " + ", ".join(f"{job_no} ({os.path.basename(self.paths[i])})" for i, job_no in entries)
+            for boe, entries in sorted(self.conflicts.items())
+        ]
+
+
+def _same_job(a: Any, b: Any) -> bool:
+    # Blank Job Nos (NaN) compare equal to each other
+    return a == b or (a != a and b != b)
+
+
+_cache: Dict[str, JobRegisterIndex] = {}
+_cache_lock = threading.Lock()
+
+
+def _current_index(path: str, previous: Optional[JobRegisterIndex], size: int, mtime_ns: int) -> Optional[JobRegisterIndex]:
+    """previous if the file is unchanged, refreshed if it was only appended to, else None."""
+    if previous is None:
+        return None
+    if previous.size == size and previous.mtime_ns == mtime_ns:
+        return previous
+    return previous.refresh()
+
+
+def get_job_register_index(path: str) -> JobRegisterIndex:
+    """Cached index for a register file; refreshed or rebuilt when its size or mtime changes."""
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _cache_lock:
+        previous = _cache.get(key)
+    index = _current_index(path, previous, st.st_size, st.st_mtime_ns) or JobRegisterIndex.load(path)
+    with _cache_lock:
+        _cache[key] = index
+    return index
+
+
+# Register paths (in merge order) -> (stamps, merged index): only the latest
+# merge per set of registers is kept, so growing registers do not pile up
+_merged_cache: Dict[Tuple[str, ...], Tuple[List[List[Any]], MergedJobRegisterIndex]] = {}
+
+
+def _register_stamps(paths: List[str]) -> List[List[Any]]:
+    stamps = []
+    for path in paths:
+        st = os.stat(path)
+        stamps.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return stamps
+
+
+def _read_index_cache(cache_path: Optional[str]) -> Dict[str, JobRegisterIndex]:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {entry["path"]: JobRegisterIndex.from_dict(entry) for entry in data["registers"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}  # Unreadable cache: rebuild
+
+
+def get_merged_job_register_index(
+    paths: List[str],
+    cache_path: Optional[str] = None,
+    max_workers: Optional[int] = None
+) -> MergedJobRegisterIndex:
+    """
+    Merged index over several registers (in the given order). Each register
+    index is taken from this process or from cache_path while the file is
+    unchanged, refreshed from its tail if rows were only appended, and
+    otherwise rebuilt; rebuilds run in parallel worker processes. The merged
+    index is kept in memory per set of (unchanged) registers.
+
+    Raises:
+        ValueError: No registers, or a register cannot be indexed
+    """
+    if not paths:
+        raise ValueError("No Job Register files selected")
+    stamps = _register_stamps(paths)
+    memo_key = tuple(key for key, _, _ in stamps)
+    with _cache_lock:
+        memo = _merged_cache.get(memo_key)
+    if memo is not None and memo[0] == stamps:
+        return memo[1]
+
+    with _cache_lock:
+        in_memory = {key: _cache.get(key) for key, _, _ in stamps}
+    on_disk = _read_index_cache(cache_path)
+    indexes: Dict[int, JobRegisterIndex] = {}
+    to_load = []
+    for i, (path, (key, size, mtime_ns)) in enumerate(zip(paths, stamps)):
+        for previous in (in_memory[key], on_disk.get(key)):
+            index = _current_index(path, previous, size, mtime_ns)
+            if index is not None:
+                indexes[i] = index
+                break
+        else:
+            to_load.append(i)
+    workers = min(len(to_load), max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(JobRegisterIndex.load, [paths[i] for i in to_load]))
+    else:
+        loaded = [JobRegisterIndex.load(paths[i]) for i in to_load]
+    for i, index in zip(to_load, loaded):
+        indexes[i] = index
+    with _cache_lock:
+        for i, index in indexes.items():
+            _cache[stamps[i][0]] = index
+
+    ordered = [indexes[i] for i in range(len(paths))]
+    merged = MergedJobRegisterIndex.merge(paths, ordered)
+    saved = [(on_disk[key].size, on_disk[key].mtime_ns) if key in on_disk else None for key, _, _ in stamps]
+    if cache_path and (len(on_disk) != len(paths) or saved != [(size, mtime_ns) for _, size, mtime_ns in stamps]):
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"registers": [index.to_dict() for index in ordered]}, f)
+        os.replace(tmp_path, cache_path)
+    with _cache_lock:
+        _merged_cache[memo_key] = (stamps, merged)
+    return merged
@@ -0,0 +1,272 @@
+"""
+Job Scheduler
+Priority scheduling for conversion jobs so a large invoice reprocess cannot
+starve a small urgent ledger conversion.
+
+A job is a list of tasks (a big invoice job is split into chunks) plus an
+optional finalize step. Worker threads repeatedly pick the next task from
+all queued jobs:
+
+    1. best priority class (a waiting job is promoted one class per
+       aging_seconds, so bulk work is never starved outright; only time
+       spent with no task of the job running counts as waiting)
+    2. submitter with the fewest running tasks, then the fewest tasks
+       served so far (fair sharing between users)
+    3. submission order
+
+Jobs whose type is at its concurrency cap are skipped until a slot frees.
+Because selection happens per task, a small job submitted mid-way through
+a large one runs after the current chunk rather than after the whole job.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+
+# Lower value = scheduled first
+PRIORITY_CLASSES = {"urgent": 0, "normal": 1, "bulk": 2}
+
+
+class ScheduledJob:
+    """A submitted job: its pending tasks, results and timing metrics."""
+
+    def __init__(
+        self,
+        job_id: str,
+        job_type: str,
+        priority: str,
+        submitter: str,
+        tasks: List[Callable[[], Any]],
+        finalize: Optional[Callable[[List[Any]], Any]],
+        seq: int
+    ):
+        self.id = job_id
+        self.job_type = job_type
+        self.priority = priority
+        self.submitter = submitter
+        self.seq = seq
+        self.pending = deque(enumerate(tasks))
+        self.total_tasks = len(tasks)
+        self.running = 0
+        self.completed_tasks = 0
+        self.results: List[Any] = [None] * len(tasks)
+        self.finalize = finalize
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.status = "queued"  # queued -> running -> done | failed
+
+        self.submitted_at = datetime.now()
+        self._submitted = time.monotonic()
+        self._waiting_since = self._submitted  # last time the job went idle (for aging)
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.run_seconds = 0.0  # summed task (and finalize) time
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    @property
+    def queue_wait_seconds(self) -> float:
+        """Time from submission to the first task starting (so far, if still queued)."""
+        end = self._started if self._started is not None else time.monotonic()
+        return end - self._submitted
+
+    def metrics(self) -> Dict[str, Any]:
+        end = self._finished if self._finished is not None else time.monotonic()
+        return {
+            "priority": self.priority,
+            "submitter": self.submitter,
+            "tasks_done": self.completed_tasks,
+            "tasks_total": self.total_tasks,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "run_seconds": round(self.run_seconds, 3),
+            "elapsed_seconds": round(end - self._submitted, 3),
+        }
+
+
+class JobScheduler:
+    """Runs job tasks on worker threads in priority / fair-share order."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        type_limits: Optional[Dict[str, int]] = None,
+        aging_seconds: float = 300.0
+    ):
+        """
+        Args:
+            workers: Tasks run concurrently (worker threads)
+            type_limits: Max concurrently running tasks per job type
+            aging_seconds: Wait after which a job with no task running moves
+                up one priority class
+        """
+        self.type_limits = dict(type_limits or {})
+        self.aging_seconds = aging_seconds
+        self._jobs: List[ScheduledJob] = []  # jobs with tasks pending or running
+        self._running_by_type: Counter = Counter()
+        self._running_by_submitter: Counter = Counter()
+        self._served: Counter = Counter()
+        self._finished: deque = deque(maxlen=1000)  # recent jobs for aggregate metrics
+        self._seq = count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"scheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        job_id: str,
+        job_type: str,
+        tasks: List[Callable[[], Any]],
+        priority: str = "normal",
+        submitter: str = "",
+        finalize: Optional[Callable[[List[Any]], Any]] = None
+    ) -> ScheduledJob:
+        """
+        Queue a job. finalize(task_results) runs once after the last task;
+        its return value becomes job.result. If a task raises, the job's
+        remaining tasks are dropped and the job fails.
+
+        Raises:
+            ValueError: Unknown priority class or no tasks
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority: {priority} (expected one of {', '.join(PRIORITY_CLASSES)})")
+        if not tasks:
+            raise ValueError("A job needs at least one task")
+        job = ScheduledJob(job_id, job_type, priority, submitter, tasks, finalize, next(self._seq))
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            self._jobs.append(job)
+            self._cond.notify()
+        return job
+
+    def _pick(self) -> Optional[ScheduledJob]:
+        """Next job to take a task from (caller holds the lock)."""
+        now = time.monotonic()
+        best, best_key = None, None
+        for job in self._jobs:
+            if not job.pending:
+                continue
+            limit = self.type_limits.get(job.job_type)
+            if limit is not None and self._running_by_type[job.job_type] >= limit:
+                continue
+            if job.running or self.aging_seconds <= 0:
+                promoted = 0  # A job being served is not waiting
+            else:
+                promoted = int((now - job._waiting_since) / self.aging_seconds)
+            key = (
+                max(0, PRIORITY_CLASSES[job.priority] - promoted),
+                self._running_by_submitter[job.submitter],
+                self._served[job.submitter],
+                job.seq,
+            )
+            if best_key is None or key < best_key:
+                best, best_key = job, key
+        return best
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._pick()
+                while job is None and not self._shutdown:
+                    self._cond.wait()
+                    job = self._pick()
+                if job is None:
+                    return
+                index, task = job.pending.popleft()
+                job.running += 1
+                job._waiting_since = time.monotonic()
+                self._running_by_type[job.job_type] += 1
+                self._running_by_submitter[job.submitter] += 1
+                self._served[job.submitter] += 1
+                if job._started is None:
+                    job._started = time.monotonic()
+                    job.status = "running"
+
+            start = time.perf_counter()
+            error = None
+            try:
+                result = task()
+            except Exception as e:
+                result, error = None, e
+            elapsed = time.perf_counter() - start
+
+            with self._cond:
+                job.results[index] = result
+                job.run_seconds += elapsed
+                job.running -= 1
+                job.completed_tasks += 1
+                if not job.running:
+                    job._waiting_since = time.monotonic()
+                self._running_by_type[job.job_type] -= 1
+                self._running_by_submitter[job.submitter] -= 1
+                if error is not None and job.error is None:
+                    job.error = error
+                    job.pending.clear()  # No point running the rest
+                last = not job.pending and job.running == 0
+                if last:
+                    self._jobs.remove(job)
+                self._cond.notify_all()  # A type or submitter slot freed up
+            if last:
+                self._complete(job)
+
+    def _complete(self, job: ScheduledJob) -> None:
+        if job.error is None and job.finalize is not None:
+            start = time.perf_counter()
+            try:
+                job.result = job.finalize(job.results)
+            except Exception as e:
+                job.error = e
+            job.run_seconds += time.perf_counter() - start
+        elif job.error is None:
+            job.result = job.results
+        job.status = "failed" if job.error is not None else "done"
+        job._finished = time.monotonic()
+        with self._cond:
+            self._finished.append(job)
+        job._done.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth plus average queue wait / run time per job type (recent jobs)."""
+        with self._cond:
+            queued = sum(1 for job in self._jobs if job._started is None)
+            running = dict(+self._running_by_type)
+            finished = list(self._finished)
+        by_type: Dict[str, Dict[str, Any]] = {}
+        for job in finished:
+            entry = by_type.setdefault(job.job_type, {"jobs": 0, "queue_wait": 0.0, "run": 0.0})
+            entry["jobs"] += 1
+            entry["queue_wait"] += job.queue_wait_seconds
+            entry["run"] += job.run_seconds
+        return {
+            "queued_jobs": queued,
+            "running_tasks": running,
+            "finished": {
+                job_type: {
+                    "jobs": e["jobs"],
+                    "avg_queue_wait_seconds": round(e["queue_wait"] / e["jobs"], 3),
+                    "avg_run_seconds": round(e["run"] / e["jobs"], 3),
+                }
+                for job_type, e in by_type.items()
+            },
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs; workers exit once no runnable task is left."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
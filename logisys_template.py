@@ -0,0 +1,123 @@
+"""
+Logisys Template
+The 41-column purchase template shared by the Invoice Parser and the Ledger
+converter, plus a row builder that fills only the per-row columns.
+"""
+
+import csv
+from operator import itemgetter
+from typing import Any, Dict, IO, Iterable, List, Sequence, Tuple
+
+# 41 CSV Headers matching the template
+CSV_HEADERS = [
+    "Entry Date",           # 1
+    "Posting Date",         # 2
+    "Organization",         # 3
+    "Organization Branch",  # 4
+    "Vendor Inv No",        # 5
+    "Vendor Inv Date",      # 6
+    "Currency",             # 7
+    "ExchRate",             # 8
+    "Narration",            # 9
+    "Due Date",             # 10
+    "Charge or GL",         # 11
+    "Charge or GL Name",    # 12
+    "Charge or GL Amount",  # 13
+    "DR or CR",             # 14
+    "Cost Center",          # 15
+    "Branch",               # 16
+    " Charge Narration",    # 17
+    "TaxGroup",             # 18
+    "Tax Type",             # 19
+    "SAC or HSN",           # 20
+    "Taxcode1",             # 21
+    "Taxcode1 Amt",         # 22
+    "Taxcode2",             # 23
+    "Taxcode2 Amt",         # 24
+    "Taxcode3",             # 25
+    "Taxcode3 Amt",         # 26
+    "Taxcode4",             # 27
+    "Taxcode4 Amt",         # 28
+    "Avail Tax Credit",     # 29
+    "LOB",                  # 30
+    "Ref Type",             # 31
+    "Ref No",               # 32
+    "Amount",               # 33
+    "Start Date",           # 34
+    "End Date",             # 35
+    "WH Tax Code",          # 36
+    "WH Tax Percentage",    # 37
+    "WH Tax Taxable",       # 38
+    "WH Tax Amount",        # 39
+    "Round Off",            # 40
+    "CC Code",              # 41
+]
+
+
+class RowTemplate:
+    """
+    Builds template rows as tuples in header order.
+
+    Columns listed in variable_columns are supplied per row (in that order);
+    every other column is a constant fixed when the template is created
+    (empty string unless given in constants). A row is assembled by one
+    itemgetter over the per-row values followed by the constants, so no
+    per-row dict or key lookup is involved.
+    """
+
+    def __init__(
+        self,
+        variable_columns: Sequence[str],
+        constants: Dict[str, Any] = None,
+        headers: Sequence[str] = CSV_HEADERS
+    ):
+        """
+        Raises:
+            ValueError: Unknown column, or a column both variable and constant
+        """
+        constants = constants or {}
+        self.headers = list(headers)
+        self.variable_columns = list(variable_columns)
+
+        unknown = [c for c in self.variable_columns + list(constants) if c not in self.headers]
+        if unknown:
+            raise ValueError(f"Columns not in template: {unknown}")
+        overlap = [c for c in self.variable_columns if c in constants]
+        if overlap:
+            raise ValueError(f"Columns both variable and constant: {overlap}")
+
+        constant_columns = [h for h in self.headers if h not in self.variable_columns]
+        self.constants: Tuple[Any, ...] = tuple(constants.get(h, "") for h in constant_columns)
+        # Position of each header in (variable values + constants)
+        source = {c: i for i, c in enumerate(self.variable_columns + constant_columns)}
+        self._gather = itemgetter(*(source[h] for h in self.headers))
+
+    def row(self, values: Sequence[Any]) -> Tuple[Any, ...]:
+        """Full row for one tuple of variable-column values."""
+        return self._gather(tuple(values) + self.constants)
+
+    def rows(self, values: Iterable[Sequence[Any]]) -> List[Tuple[Any, ...]]:
+        """Full rows for many tuples of variable-column values."""
+        gather, constants = self._gather, self.constants
+        return [gather(tuple(v) + constants) for v in values]
+
+    def rows_from_columns(self, columns: Sequence[Sequence[Any]]) -> List[Tuple[Any, ...]]:
+        """Full rows from one sequence per variable column (columnar input)."""
+        gather, constants = self._gather, self.constants
+        return [gather(v + constants) for v in zip(*columns)]
+
+    def to_dict(self, row: Sequence[Any]) -> Dict[str, Any]:
+        """Header -> value mapping for a built row."""
+        return dict(zip(self.headers, row))
+
+    def writer(self, f: IO[str], lineterminator: str = "\r\n", header: bool = True):
+        """csv.writer on an open file (newline=''), with the header row written."""
+        writer = csv.writer(f, lineterminator=lineterminator)
+        if header:
+            writer.writerow(self.headers)
+        return writer
+
+    def write_csv(self, path: str, rows: Iterable[Sequence[Any]], lineterminator: str = "\r\n") -> None:
+        """Write header and rows to path in one writerows call."""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            self.writer(f, lineterminator).writerows(rows)
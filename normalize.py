@@ -0,0 +1,139 @@
+"""
+Normalization Kernels
+Shared date and amount normalization for the Invoice Parser and the Ledger
+converter. Formats are sniffed with compiled patterns in one pass (no
+exception-driven strptime loop) and repeated dates are served from bounded
+LRU caches. Vectorized variants accept lists or pandas Series.
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Output format used everywhere in the Logisys templates: 14-May-2025
+STANDARD_DATE_FORMAT = "%d-%b-%Y"
+
+_MONTHS = {}
+for _number, (_abbr, _full) in enumerate(zip(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"),
+    ("january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"),
+), 1):
+    _MONTHS[_abbr] = _number
+    _MONTHS[_full] = _number
+
+# Accepted layouts (same set as the former strptime loop):
+#   15/05/2025  15-05-2025  15-May-2025  15-May-2025(full)  2025-05-15  15 May 2025
+_DAY = r'(3[01]|[12]\d|0[1-9]|[1-9])'
+_MONTH = r'(1[0-2]|0[1-9]|[1-9])'
+_NUMERIC_DMY = re.compile(_DAY + r'([/-])' + _MONTH + r'\2(\d{4})')
+_NUMERIC_YMD = re.compile(r'(\d{4})-' + _MONTH + '-' + _DAY)
+_NAMED_DMY = re.compile(_DAY + r'(?:-([A-Za-z]+)-|\s+([A-Za-z]+)\s+)(\d{4})')
+
+# Characters stripped from amounts: currency symbols, commas, percent, whitespace
+_AMOUNT_STRIP = {ord(c): None for c in "₹$,%"}
+_AMOUNT_STRIP.update({c: None for c in range(0x3001) if chr(c).isspace()})
+
+
+def _sniff_date(date_str: str) -> Optional[Tuple[int, int, int]]:
+    """Return (year, month, day) if the string matches a supported layout."""
+    match = _NUMERIC_DMY.fullmatch(date_str)
+    if match:
+        return int(match.group(4)), int(match.group(3)), int(match.group(1))
+    match = _NUMERIC_YMD.fullmatch(date_str)
+    if match:
+        return int(match.group(1)), int(match.group(2)), int(match.group(3))
+    match = _NAMED_DMY.fullmatch(date_str)
+    if match:
+        month = _MONTHS.get((match.group(2) or match.group(3)).lower())
+        if month:
+            return int(match.group(4)), month, int(match.group(1))
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(date_str: str) -> str:
+    ymd = _sniff_date(date_str)
+    if ymd is None:
+        return date_str
+    try:
+        return datetime(*ymd).strftime(STANDARD_DATE_FORMAT)  # Title Case: 14-May-2025
+    except ValueError:
+        return date_str  # e.g. 31/02/2025
+
+
+def parse_date_to_standard(date_str: str) -> str:
+    """Convert various date formats to DD-MMM-YYYY format."""
+    if not date_str:
+        return ""
+    # Return as-is (stripped) if no format matches
+    return _parse_date_cached(date_str.strip())
+
+
+def parse_amount(amount_str: str) -> float:
+    """Parse amount string to float, handling commas and currency symbols."""
+    if not amount_str:
+        return 0.0
+    amount_str = str(amount_str)
+    try:
+        # Fast path: plain "12,345.00" - if this parses, stripping the full
+        # symbol/whitespace set could not give a different result
+        return float(amount_str.replace(",", ""))
+    except ValueError:
+        pass
+    try:
+        return float(amount_str.translate(_AMOUNT_STRIP))
+    except ValueError:
+        return 0.0
+
+
+def parse_dates(values: Iterable[str]) -> Any:
+    """Vectorized parse_date_to_standard: a Series maps to a Series, anything else to a list."""
+    if hasattr(values, "map"):
+        return values.map(parse_date_to_standard)
+    return [parse_date_to_standard(v) for v in values]
+
+
+def parse_amounts(values: Iterable[str]) -> Any:
+    """Vectorized parse_amount: a Series maps to a Series, anything else to a list."""
+    if hasattr(values, "map"):
+        return values.map(parse_amount)
+    return [parse_amount(v) for v in values]
+
+
+@lru_cache(maxsize=4096)
+def _to_datetime_cached(value: Any) -> Tuple[Optional[str], str]:
+    import pandas as pd
+    try:
+        ts = pd.to_datetime(value)
+    except Exception as e:
+        return None, str(e)
+    if pd.isna(ts):  # Check for NaT
+        return None, ""
+    return ts.strftime(STANDARD_DATE_FORMAT), ""
+
+
+def format_ledger_dates(values: Any) -> List[Tuple[Optional[str], str]]:
+    """
+    Format a ledger date column as DD-MMM-YYYY, one (text, error) pair per row.
+
+    text is None for missing or unparseable dates; error holds the parse
+    error message (empty for missing values/NaT). Datetime columns are
+    formatted in one vectorized call; anything else is parsed once per
+    distinct value with pd.to_datetime, so results match per-row parsing.
+    """
+    import pandas as pd
+
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        formatted = series.dt.strftime(STANDARD_DATE_FORMAT)
+        return [(None, "") if pd.isna(text) else (text, "") for text in formatted]
+
+    results = []
+    for value in series:
+        try:
+            results.append(_to_datetime_cached(value))
+        except TypeError:  # Unhashable cell - parse without the cache
+            results.append(_to_datetime_cached.__wrapped__(value))
+    return results
@@ -0,0 +1,76 @@
+"""
+Output Index
+Content-addressed record of converted outputs in an output folder. A
+conversion key is the hash of the input files' contents, the rule set and
+the run date; if an unchanged output for the same key already exists, it can
+be reused instead of recomputing it.
+"""
+
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Any, Dict, Iterable, Optional
+
+INDEX_FILENAME = ".output_index.json"
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def conversion_key(input_paths: Iterable[str], rules_fingerprint: str, run_date: Optional[date] = None) -> str:
+    """Hash of the inputs' contents (in the given order), the rule set and the run date."""
+    digest = hashlib.sha256()
+    for path in input_paths:
+        digest.update(f"input:{file_sha256(path)}\n".encode())
+    digest.update(f"rules:{rules_fingerprint}\n".encode())
+    digest.update(f"date:{(run_date or date.today()).isoformat()}\n".encode())
+    return digest.hexdigest()
+
+
+class OutputIndex:
+    """Conversion key -> output file in one folder, kept in a hidden JSON file there."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_FILENAME)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("outputs", {})
+            except (OSError, ValueError):
+                self.entries = {}  # Unreadable index: start over
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Path of the output recorded for key, if it still exists unmodified."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        path = os.path.join(self.folder, entry["file"])
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            return None
+        return path
+
+    def record(self, key: str, output_path: str) -> None:
+        """Remember output_path (inside the folder) as the output for key and save."""
+        st = os.stat(output_path)
+        self.entries[key] = {
+            "file": os.path.basename(output_path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"outputs": self.entries}, f, indent=1)
+        os.replace(tmp_path, self.path)
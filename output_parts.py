@@ -0,0 +1,126 @@
+"""
+Output Parts
+Splits a Logisys CSV into files of at most max_rows data rows, for upload
+portals that reject large files. Rows come in units (all rows of one
+invoice, or one ledger row) that are never split across files. Parts are
+named <stem>_part01.csv, <stem>_part02.csv, ... and written concurrently;
+<stem>_manifest.json lists every part with its row count and SHA-256.
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import islice
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from logisys_template import RowTemplate
+
+DEFAULT_PART_WORKERS = 4
+
+
+@dataclass
+class OutputPart:
+    """One written part file."""
+    path: str
+    rows: int
+    units: int
+    sha256: str
+
+
+def plan_parts(unit_sizes: Sequence[int], max_rows: int) -> List[Tuple[int, int]]:
+    """
+    (rows, units) per part, filling each part with whole units up to
+    max_rows. A unit larger than max_rows gets a part of its own.
+
+    Raises:
+        ValueError: max_rows is not positive
+    """
+    if max_rows <= 0:
+        raise ValueError(f"max_rows must be positive, got {max_rows}")
+    parts: List[Tuple[int, int]] = []
+    rows = units = 0
+    for size in unit_sizes:
+        if units and rows + size > max_rows:
+            parts.append((rows, units))
+            rows = units = 0
+        rows += size
+        units += 1
+    if units or not parts:
+        parts.append((rows, units))
+    return parts
+
+
+def part_paths(path: str, count: int) -> List[str]:
+    """Sequential part file names for path (path itself if there is one part)."""
+    if count == 1:
+        return [path]
+    stem, ext = os.path.splitext(path)
+    width = max(2, len(str(count)))
+    return [f"{stem}_part{n:0{width}d}{ext}" for n in range(1, count + 1)]
+
+
+def manifest_path(path: str) -> str:
+    return os.path.splitext(path)[0] + "_manifest.json"
+
+
+def _write_part(
+    template: RowTemplate,
+    path: str,
+    rows: List[Sequence[Any]],
+    units: int,
+    lineterminator: str
+) -> OutputPart:
+    buffer = io.StringIO()
+    template.writer(buffer, lineterminator).writerows(rows)
+    data = buffer.getvalue().encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return OutputPart(path, len(rows), units, hashlib.sha256(data).hexdigest())
+
+
+def write_parts(
+    template: RowTemplate,
+    path: str,
+    rows: Iterable[Sequence[Any]],
+    unit_sizes: Sequence[int],
+    max_rows: int,
+    lineterminator: str = "\r\n",
+    max_workers: int = DEFAULT_PART_WORKERS
+) -> List[OutputPart]:
+    """
+    Write rows (consumed as a stream, unit_sizes[i] rows per unit) as parts
+    of path, plus the manifest. At most about two parts per worker are held
+    in memory at a time.
+
+    Raises:
+        ValueError: max_rows is not positive
+    """
+    plan = plan_parts(unit_sizes, max_rows)
+    paths = part_paths(path, len(plan))
+    rows = iter(rows)
+    parts: List[OutputPart] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = []
+        for part_path, (count, units) in zip(paths, plan):
+            chunk = list(islice(rows, count))
+            pending.append(pool.submit(_write_part, template, part_path, chunk, units, lineterminator))
+            if len(pending) >= 2 * max_workers:
+                parts.append(pending.pop(0).result())
+        parts.extend(future.result() for future in pending)
+
+    manifest = {
+        "file": os.path.basename(path),
+        "max_rows": max_rows,
+        "total_rows": sum(p.rows for p in parts),
+        "parts": [dict(asdict(p), path=os.path.basename(p.path)) for p in parts],
+    }
+    tmp_path = manifest_path(path) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(path))
+    return parts
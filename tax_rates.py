@@ -0,0 +1,280 @@
+"""
+Tax Rates
+GST rate table for ledger charges: per SAC code and effective date range,
+the tax components for intra-state (CGST + SGST) and inter-state (IGST)
+supplies. Amounts are computed with Decimal and rounded half-up to paise.
+
+Config format (tax_rates.json):
+
+    {
+      "home_state": "27",
+      "rates": [
+        {"sac": "996712", "effective_from": "2017-07-01", "effective_to": null,
+         "intra": [["Central GST", "9"], ["State GST", "9"]],
+         "inter": [["Integrated GST", "18"]]}
+      ]
+    }
+
+Up to four components per supply type fill Taxcode1..Taxcode4.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PAISE = Decimal("0.01")
+MAX_TAX_COMPONENTS = 4
+
+# Branch state for the Kale ledger (THANE, Maharashtra)
+DEFAULT_HOME_STATE = "27"
+
+# GST state codes by state / UT name (upper case)
+GST_STATE_CODES = {
+    "JAMMU AND KASHMIR": "01", "HIMACHAL PRADESH": "02", "PUNJAB": "03",
+    "CHANDIGARH": "04", "UTTARAKHAND": "05", "HARYANA": "06", "DELHI": "07",
+    "RAJASTHAN": "08", "UTTAR PRADESH": "09", "BIHAR": "10", "SIKKIM": "11",
+    "ARUNACHAL PRADESH": "12", "NAGALAND": "13", "MANIPUR": "14", "MIZORAM": "15",
+    "TRIPURA": "16", "MEGHALAYA": "17", "ASSAM": "18", "WEST BENGAL": "19",
+    "JHARKHAND": "20", "ODISHA": "21", "CHHATTISGARH": "22", "CHATTISGARH": "22",
+    "MADHYA PRADESH": "23", "GUJARAT": "24", "DAMAN AND DIU": "25",
+    "DADRA AND NAGAR HAVELI": "26", "DADRA AND NAGAR HAVELI AND DAMAN AND DIU": "26",
+    "MAHARASHTRA": "27", "KARNATAKA": "29", "GOA": "30", "LAKSHADWEEP": "31",
+    "KERALA": "32", "TAMIL NADU": "33", "PUDUCHERRY": "34",
+    "ANDAMAN AND NICOBAR ISLANDS": "35", "TELANGANA": "36", "ANDHRA PRADESH": "37",
+    "LADAKH": "38",
+}
+
+# Ledger columns that can identify the consignee's state (first present wins)
+POSSIBLE_STATE_COLUMNS = [
+    "Consignee GSTIN", "GSTIN", "Customer GSTIN", "Place of Supply", "State Code", "State",
+]
+
+# Taxcode1, Taxcode1 Amt, ... Taxcode4, Taxcode4 Amt
+TaxColumns = Tuple[str, str, str, str, str, str, str, str]
+NO_TAX: TaxColumns = ("",) * (2 * MAX_TAX_COMPONENTS)
+
+
+@dataclass(frozen=True)
+class TaxRate:
+    """Tax components for one SAC code over an effective date range."""
+    sac: str
+    effective_from: date
+    effective_to: Optional[date]
+    intra: Tuple[Tuple[str, Decimal], ...]
+    inter: Tuple[Tuple[str, Decimal], ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaxRate":
+        """
+        Raises:
+            ValueError: Missing keys, bad dates or rates, or too many components
+        """
+        try:
+            def components(key: str) -> Tuple[Tuple[str, Decimal], ...]:
+                parts = tuple((str(name), Decimal(str(rate))) for name, rate in data.get(key, []))
+                if len(parts) > MAX_TAX_COMPONENTS:
+                    raise ValueError(f"At most {MAX_TAX_COMPONENTS} '{key}' tax components are supported")
+                return parts
+            effective_to = data.get("effective_to")
+            return cls(
+                sac=str(data["sac"]),
+                effective_from=date.fromisoformat(data["effective_from"]),
+                effective_to=date.fromisoformat(effective_to) if effective_to else None,
+                intra=components("intra"),
+                inter=components("inter"),
+            )
+        except (KeyError, TypeError, InvalidOperation) as e:
+            raise ValueError(f"Invalid tax rate entry {data!r}: {e}") from e
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sac": self.sac,
+            "effective_from": self.effective_from.isoformat(),
+            "effective_to": self.effective_to.isoformat() if self.effective_to else None,
+            "intra": [[name, str(rate)] for name, rate in self.intra],
+            "inter": [[name, str(rate)] for name, rate in self.inter],
+        }
+
+
+# GST on port/terminal handling (SAC 996712) since GST began: 9% + 9% or 18% IGST
+DEFAULT_TAX_RATES = [
+    TaxRate(
+        sac="996712",
+        effective_from=date(2017, 7, 1),
+        effective_to=None,
+        intra=(("Central GST", Decimal("9")), ("State GST", Decimal("9"))),
+        inter=(("Integrated GST", Decimal("18")),),
+    ),
+]
+
+
+def state_code(value: Any) -> Optional[str]:
+    """GST state code from a GSTIN, a numeric state code or a state name."""
+    if not isinstance(value, str):
+        if isinstance(value, (int, float)) and value == value:  # Excel numeric state code
+            value = str(int(value))
+        else:
+            return None
+    text = value.strip().upper()
+    if len(text) == 15 and text[:2].isdigit():  # GSTIN
+        return text[:2]
+    if text.isdigit() and len(text) <= 2:
+        return text.zfill(2)
+    if len(text) > 5 and text[:2].isdigit() and text[2] in " -":  # "27-Maharashtra"
+        return text[:2]
+    return GST_STATE_CODES.get(text)
+
+
+class TaxRateTable:
+    """Rate entries indexed by SAC and effective date."""
+
+    def __init__(self, rates: Sequence[TaxRate], home_state: str = DEFAULT_HOME_STATE):
+        """
+        Raises:
+            ValueError: Overlapping date ranges for one SAC
+        """
+        self.rates = list(rates)
+        self.home_state = str(home_state).zfill(2)
+        self._by_sac: Dict[str, Tuple[List[date], List[TaxRate]]] = {}
+        for sac in {r.sac for r in self.rates}:
+            entries = sorted((r for r in self.rates if r.sac == sac), key=lambda r: r.effective_from)
+            for prev, cur in zip(entries, entries[1:]):
+                if prev.effective_to is None or prev.effective_to >= cur.effective_from:
+                    raise ValueError(f"Overlapping tax rate periods for SAC {sac} "
+                                     f"({prev.effective_from} and {cur.effective_from})")
+            self._by_sac[sac] = ([r.effective_from for r in entries], entries)
+
+    def fingerprint(self) -> str:
+        """Hash of the table, for output reuse keys."""
+        payload = {"home_state": self.home_state, "rates": sorted((r.to_dict() for r in self.rates), key=json.dumps)}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def rate_for(self, sac: str, on: date) -> Optional[TaxRate]:
+        """Entry in force for sac on a date, or None."""
+        index = self._by_sac.get(sac)
+        if index is None:
+            return None
+        starts, entries = index
+        pos = bisect.bisect_right(starts, on) - 1
+        if pos < 0:
+            return None
+        entry = entries[pos]
+        if entry.effective_to is not None and on > entry.effective_to:
+            return None
+        return entry
+
+    def interstate_flags(self, values: Iterable[Any]) -> List[bool]:
+        """Per row: is the supply inter-state? Resolved once per distinct value; unknown = intra-state."""
+        cache: Dict[Any, bool] = {}
+        flags = []
+        for value in values:
+            key = value if isinstance(value, str) or value is None else repr(value)
+            flag = cache.get(key)
+            if flag is None:
+                code = state_code(value)
+                flag = cache[key] = code is not None and code != self.home_state
+            flags.append(flag)
+        return flags
+
+    def compute(
+        self,
+        sacs: Sequence[str],
+        amounts: Sequence[str],
+        txn_dates: Sequence[date],
+        interstate: Sequence[bool]
+    ) -> List[Optional[TaxColumns]]:
+        """
+        Taxcode1..4 names and amounts per row. Each distinct (SAC, amount,
+        rate period, supply type) combination is computed once and shared.
+        Rows without a SAC get NO_TAX; rows whose SAC has no rate on that
+        date get None.
+
+        Raises:
+            ValueError: A charge amount is not a number
+        """
+        memo: Dict[tuple, Optional[TaxColumns]] = {}
+        results: List[Optional[TaxColumns]] = []
+        for sac, amount, on, inter in zip(sacs, amounts, txn_dates, interstate):
+            if not sac:
+                results.append(NO_TAX)
+                continue
+            rate = self.rate_for(sac, on)
+            key = (amount, id(rate), inter)
+            if key not in memo:
+                memo[key] = None if rate is None else self._tax_columns(amount, rate.inter if inter else rate.intra)
+            results.append(memo[key])
+        return results
+
+    @staticmethod
+    def _tax_columns(amount: str, components: Tuple[Tuple[str, Decimal], ...]) -> TaxColumns:
+        try:
+            base = Decimal(str(amount))
+        except InvalidOperation:
+            raise ValueError(f"Charge amount is not a number: {amount!r}")
+        cells: List[str] = []
+        for name, rate in components:
+            tax = (base * rate / 100).quantize(PAISE, rounding=ROUND_HALF_UP)
+            cells.extend((name, str(tax)))
+        cells.extend([""] * (2 * MAX_TAX_COMPONENTS - len(cells)))
+        return tuple(cells)
+
+    @classmethod
+    def load(cls, path: str) -> "TaxRateTable":
+        """
+        Read a tax rates JSON file.
+
+        Raises:
+            ValueError: Malformed file or entries
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid tax rates file {path}: {e}") from e
+        if not isinstance(config, dict) or not isinstance(config.get("rates"), list):
+            raise ValueError(f"Invalid tax rates file {path}: expected {{'home_state': ..., 'rates': [...]}}")
+        return cls([TaxRate.from_dict(r) for r in config["rates"]], config.get("home_state", DEFAULT_HOME_STATE))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"home_state": self.home_state, "rates": [r.to_dict() for r in self.rates]}, f, indent=2)
+            f.write("\n")
+
+
+@lru_cache(maxsize=4096)
+def parse_txn_date(text: str) -> date:
+    """Date from create_csv's DD-MMM-YYYY Vendor Inv Date text (cached per distinct value)."""
+    return datetime.strptime(text, "%d-%b-%Y").date()
+
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def get_tax_rates(path: Optional[str]) -> TaxRateTable:
+    """
+    Table from path, cached until the file changes; the built-in rates if
+    path is None or the file does not exist.
+
+    Raises:
+        ValueError: Malformed rates file
+    """
+    if not path or not os.path.exists(path):
+        return TaxRateTable(DEFAULT_TAX_RATES)
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == (st.st_size, st.st_mtime_ns):
+            return cached[1]
+    table = TaxRateTable.load(key)
+    with _cache_lock:
+        _cache[key] = ((st.st_size, st.st_mtime_ns), table)
+    return table
@@ -0,0 +1,59 @@
+import os
+
+from invoice_processor import BatchJournal, InvoiceData
+
+
+def invoice(number):
+    return InvoiceData(airline="INDIGO", invoice_number=number, invoice_date="14-Feb-2025",
+                       taxable_value=100.0, raw_text="not journalled")
+
+
+def test_recorded_files_are_replayed_after_reopening(tmp_path):
+    journal = BatchJournal(str(tmp_path / "batch.jsonl"))
+    journal.record("a.pdf", "hash-a", [invoice("KA1"), invoice("KA2")])
+    journal.record("b.pdf", "hash-b", [])
+
+    reopened = BatchJournal(journal.path)
+    assert len(reopened) == 2
+    replayed = reopened.lookup("a.pdf", "hash-a")
+    assert [inv.invoice_number for inv in replayed] == ["KA1", "KA2"]
+    assert replayed[0].taxable_value == 100.0
+    assert replayed[0].raw_text == ""
+    assert reopened.lookup("b.pdf", "hash-b") == []
+
+
+def test_changed_or_unknown_files_are_not_replayed(tmp_path):
+    journal = BatchJournal(str(tmp_path / "batch.jsonl"))
+    journal.record("a.pdf", "hash-a", [invoice("KA1")])
+    assert journal.lookup("a.pdf", "other-hash") is None
+    assert journal.lookup("c.pdf", "hash-c") is None
+
+
+def test_torn_last_line_is_dropped_and_later_records_survive(tmp_path):
+    journal = BatchJournal(str(tmp_path / "batch.jsonl"))
+    journal.record("a.pdf", "hash-a", [invoice("KA1")])
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"path": "b.pdf", "sha2')  # Crash mid-write
+
+    resumed = BatchJournal(journal.path)
+    assert len(resumed) == 1
+    resumed.record("c.pdf", "hash-c", [invoice("KA3")])
+
+    reopened = BatchJournal(journal.path)
+    assert len(reopened) == 2
+    assert reopened.lookup("c.pdf", "hash-c")[0].invoice_number == "KA3"
+
+
+def test_same_selection_opens_the_same_journal(tmp_path):
+    first = BatchJournal.for_batch(["x/b.pdf", "x/a.pdf"], str(tmp_path))
+    second = BatchJournal.for_batch(["x/a.pdf", "x/b.pdf"], str(tmp_path))
+    other = BatchJournal.for_batch(["x/a.pdf"], str(tmp_path))
+    assert first.path == second.path != other.path
+
+
+def test_discard_removes_the_journal(tmp_path):
+    journal = BatchJournal(str(tmp_path / "batch.jsonl"))
+    journal.record("a.pdf", "hash-a", [])
+    journal.discard()
+    assert not os.path.exists(journal.path)
+    assert len(journal) == 0
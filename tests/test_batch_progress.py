@@ -0,0 +1,92 @@
+import invoice_processor
+from invoice_processor import (
+    BatchJournal,
+    BatchProgress,
+    ExtractionStats,
+    FileResult,
+    InvoiceData,
+    iter_invoice_batch,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def result(airlines=("INDIGO",), pages=2, failed=False):
+    invoices = [InvoiceData(airline=a, invoice_number="" if failed else f"N{i}") for i, a in enumerate(airlines)]
+    return FileResult("x.pdf", invoices, ExtractionStats(pages=pages))
+
+
+def test_counters_and_status_line(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(invoice_processor.time, "monotonic", clock)
+    progress = BatchProgress(total_files=4)
+    clock.now += 2
+    progress.file_done(result(("INDIGO", "INDIGO")))
+    clock.now += 2
+    progress.file_done(result(("GULF AIR",), pages=3))
+    clock.now += 2
+    progress.file_done(result(failed=True))
+    progress.file_done(FileResult("replayed.pdf", [InvoiceData(airline="INDIGO", invoice_number="N9")]))
+
+    snap = progress.snapshot()
+    assert (snap["files_done"], snap["files_failed"], snap["pages_done"]) == (4, 1, 7)
+    assert snap["per_airline"] == {"INDIGO": 3, "GULF AIR": 1}
+    assert snap["files_per_second"] == 4 / 6
+    assert snap["eta_seconds"] == 0
+    assert snap["status_line"] == (
+        "Files 4/4 (1 failed) | Pages 7 | 0.7 files/s | ETA 0m00s | GULF AIR 1, INDIGO 3")
+
+
+def test_throughput_uses_the_recent_window(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(invoice_processor.time, "monotonic", clock)
+    progress = BatchProgress(total_files=100, window_seconds=10)
+    assert progress.eta_seconds is None
+    assert progress.status_line().endswith("ETA --")
+
+    clock.now += 100  # A slow first file
+    progress.file_done(result())
+    for _ in range(10):
+        clock.now += 1
+        progress.file_done(result())
+    # Only the last ~10 seconds count: 1 file/s, 89 files left
+    assert progress.files_per_second == 1.0
+    assert progress.eta_seconds == 89.0
+    assert "ETA 1m29s" in progress.status_line()
+
+
+def test_batch_replays_journalled_files(tmp_path, monkeypatch):
+    pdfs = []
+    for name in ("a.pdf", "b.pdf", "bad.pdf"):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        pdfs.append(str(path))
+    parsed = []
+
+    def fake_parse(pdf_path, stats=None):
+        parsed.append(pdf_path)
+        if pdf_path.endswith("bad.pdf"):
+            raise ValueError("broken PDF")
+        stats.pages = 1
+        return [InvoiceData(airline="INDIGO", invoice_number=pdf_path[-5:])]
+
+    monkeypatch.setattr(invoice_processor, "parse_invoices", fake_parse)
+    journal = BatchJournal(str(tmp_path / "journal.jsonl"))
+    first = list(iter_invoice_batch(pdfs, journal, BatchProgress(3)))
+    assert [r.error for r in first] == ["", "", "broken PDF"]
+    assert parsed == pdfs
+
+    parsed.clear()
+    progress = BatchProgress(3)
+    second = list(iter_invoice_batch(pdfs, BatchJournal(journal.path), progress))
+    assert parsed == [pdfs[2]]  # Only the failed file is parsed again
+    assert [r.replayed for r in second] == [True, True, False]
+    assert [inv.invoice_number for r in second for inv in r.invoices] == ["a.pdf", "b.pdf"]
+    assert second[0].sha256 == first[0].sha256
+    assert (progress.files_done, progress.files_failed, progress.pages_done) == (3, 1, 0)
@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from charge_rules import DEFAULT_CHARGE, DEFAULT_RULES, ChargeRule, ChargeRuleSet, get_charge_rules
+from tax_rates import DEFAULT_TAX_RATES, TaxRateTable
+
+
+def old_branch(consignee_name):
+    """The hard-coded ABBOTT branch create_csv had before charge rules."""
+    if consignee_name.strip().upper().startswith("ABBOTT HEALTHCARE"):
+        return ("GATE PASS CHARGES - REIM", "336", "996712", "", "", "", "", "No")
+    return ("GATE PASS CHARGES CCL", "285", "996712", "Central GST", "25.65", "State GST", "25.65", "100")
+
+
+@pytest.mark.parametrize("name", [
+    "ABBOTT HEALTHCARE PRIVATE LIMITED",
+    "  abbott healthcare pvt ltd",
+    "ABBOTT LABORATORIES",
+    "SOME OTHER IMPORTER",
+    "",
+])
+def test_default_rules_match_the_old_branch(name):
+    charge = get_charge_rules(None).match(name)
+    taxes = TaxRateTable(DEFAULT_TAX_RATES).compute([charge.sac], [charge.amount], [date(2025, 1, 1)], [False])[0]
+    if not charge.sac:
+        taxes = (charge.taxcode1, charge.taxcode1_amt, charge.taxcode2, charge.taxcode2_amt)
+    assert (charge.charge_name, charge.amount, charge.output_sac, *taxes[:4],
+            charge.avail_tax_credit) == old_branch(name)
+
+
+def test_sac_or_hsn_overrides_the_fallback():
+    assert ChargeRule(charge_name="A", amount="1", sac_or_hsn="998599").output_sac == "998599"
+    assert ChargeRule(charge_name="A", amount="1", sac="996713").output_sac == "996713"
+
+
+def test_missing_name_gets_the_default():
+    assert get_charge_rules(None).match(float("nan")) is DEFAULT_CHARGE
+
+
+def test_first_matching_rule_wins():
+    rules = ChargeRuleSet([
+        ChargeRule(name="regex", regex=r"ACME\s+PHARMA", charge_name="A", amount="1"),
+        ChargeRule(name="long prefix", prefix="ACME PHARMA INDIA", charge_name="B", amount="2"),
+        ChargeRule(name="short prefix", prefix="ACME", charge_name="C", amount="3"),
+    ])
+    assert rules.match("Acme Pharma India Ltd").name == "regex"
+    assert rules.match("ACME LOGISTICS").name == "short prefix"
+    assert rules.match("NOT ACME") is rules.default
+
+
+def test_earlier_prefix_wins_over_a_longer_later_one():
+    rules = ChargeRuleSet([
+        ChargeRule(name="short", prefix="ACME", charge_name="A", amount="1"),
+        ChargeRule(name="long", prefix="ACME PHARMA", charge_name="B", amount="2"),
+    ])
+    assert rules.match("ACME PHARMA").name == "short"
+
+
+def test_classify_matches_per_row():
+    rules = ChargeRuleSet(DEFAULT_RULES)
+    matched = rules.classify(["ABBOTT HEALTHCARE", "X", None, "ABBOTT HEALTHCARE"])
+    assert [r.amount for r in matched] == ["336", "285", "285", "336"]
+
+
+@pytest.mark.parametrize("rule", [
+    ChargeRule(name="neither", charge_name="A", amount="1"),
+    ChargeRule(name="both", prefix="A", regex="A", charge_name="A", amount="1"),
+    ChargeRule(name="bad regex", regex="(", charge_name="A", amount="1"),
+    ChargeRule(name="sac and codes", prefix="A", sac="996712", taxcode1="Central GST", charge_name="A", amount="1"),
+])
+def test_invalid_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        ChargeRuleSet([rule])
+
+
+def test_load_rejects_unknown_keys(tmp_path):
+    path = tmp_path / "charge_rules.json"
+    path.write_text('{"rules": [{"prefix": "A", "charge_name": "A", "amount": "1", "amout": "2"}]}')
+    with pytest.raises(ValueError):
+        ChargeRuleSet.load(str(path))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "charge_rules.json")
+    rules = ChargeRuleSet(DEFAULT_RULES, DEFAULT_CHARGE)
+    rules.save(path)
+    assert ChargeRuleSet.load(path).fingerprint() == rules.fingerprint()
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from conversion_service import ConversionService, upload_filename
+
+SHA = "ab12" * 16
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ConversionService(str(tmp_path / "service"), workers=1)
+    yield service
+    service.shutdown()
+
+
+def test_upload_path_of_a_stored_upload(service):
+    upload_id = service.store_upload("ledger.xlsx", b"data")
+    path = service.upload_path(upload_id)
+    assert os.path.basename(path) == "ledger.xlsx"
+    with open(path, "rb") as f:
+        assert f.read() == b"data"
+
+
+@pytest.mark.parametrize("upload_id", [
+    "",
+    "ledger.xlsx",
+    f"{SHA}",
+    f"{SHA}/",
+    f"{SHA.upper()}/ledger.xlsx",
+    f"{SHA[:-1]}/ledger.xlsx",
+    f"{SHA}0/ledger.xlsx",
+    f"../{SHA}/ledger.xlsx",
+    "../../etc/passwd",
+    f"{SHA}/../../secret.txt",
+    f"{SHA}/..",
+    f"{SHA}/.hidden",
+    f"{SHA}/sub/ledger.xlsx",
+    f"{SHA}/sub\\ledger.xlsx",
+])
+def test_upload_path_rejects_invalid_ids(service, upload_id):
+    with pytest.raises(ValueError, match="Invalid upload id"):
+        service.upload_path(upload_id)
+
+
+def test_upload_path_rejects_unknown_uploads(service):
+    with pytest.raises(ValueError, match="Unknown upload"):
+        service.upload_path(f"{SHA}/ledger.xlsx")
+
+
+def test_upload_path_rejects_a_link_out_of_the_upload_dir(service, tmp_path):
+    outside = tmp_path / "secret.txt"
+    outside.write_text("secret")
+    os.makedirs(os.path.join(service.upload_dir, SHA))
+    try:
+        os.symlink(outside, os.path.join(service.upload_dir, SHA, "ledger.xlsx"))
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not available")
+    with pytest.raises(ValueError, match="Invalid upload id"):
+        service.upload_path(f"{SHA}/ledger.xlsx")
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("ledger.xlsx", "ledger.xlsx"),
+    ("dir/ledger.xlsx", "ledger.xlsx"),
+    ("C:\\Users\\me\\ledger.xlsx", "ledger.xlsx"),
+    ("..\\..\\ledger.xlsx", "ledger.xlsx"),
+    ("a/b\\ledger.xlsx", "ledger.xlsx"),
+    ("", ""),
+    ("dir\\", ""),
+    ("..", ""),
+    ("sub\\.hidden", ""),
+])
+def test_upload_filename_strips_both_separators(name, expected):
+    assert upload_filename(name) == expected
+
+
+def test_a_stored_windows_style_upload_resolves(service):
+    upload_id = service.store_upload(upload_filename("C:\\temp\\ledger.xlsx"), b"data")
+    assert os.path.basename(service.upload_path(upload_id)) == "ledger.xlsx"
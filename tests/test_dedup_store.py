@@ -0,0 +1,57 @@
+from dedup_store import EmittedKeyIndex
+
+
+def open_index(tmp_path):
+    return EmittedKeyIndex(str(tmp_path / "history.sqlite"), "emitted", ["receipt", "boe"])
+
+
+def test_filter_new_within_a_batch(tmp_path):
+    index = open_index(tmp_path)
+    flags = index.filter_new([("R1", "B1"), ("R2", "B2"), ("R1", "B1")])
+    assert flags == [True, True, False]
+    assert index.suppressed == [(("R1", "B1"), "Duplicate within batch")]
+
+
+def test_filter_new_against_earlier_runs(tmp_path):
+    index = open_index(tmp_path)
+    index.filter_new([("R1", "B1")])
+    assert index.commit() == 1
+
+    index = open_index(tmp_path)
+    assert index.filter_new([("R1", "B1"), ("R3", "B3")]) == [False, True]
+    assert index.suppressed == [(("R1", "B1"), "Emitted in a previous run")]
+
+
+def test_mark_emitted_records_without_suppressing(tmp_path):
+    index = open_index(tmp_path)
+    index.mark_emitted([("R1", "B1"), ("R1", "B1")])
+    assert index.suppressed == []
+    assert index.commit() == 1
+    assert ("R1", "B1") in open_index(tmp_path)
+
+
+def test_check_and_add_without_skipping_history(tmp_path):
+    index = open_index(tmp_path)
+    index.mark_emitted([("R1", "B1")])
+    index.commit()
+
+    index = open_index(tmp_path)
+    assert index.check_and_add(("R1", "B1"), skip_history=False)
+    assert not index.check_and_add(("R1", "B1"), skip_history=False)
+    assert index.suppressed == [(("R1", "B1"), "Duplicate within batch")]
+    assert index.commit() == 0  # Already recorded
+
+
+def test_uncommitted_keys_are_not_persisted(tmp_path):
+    index = open_index(tmp_path)
+    index.filter_new([("R1", "B1")])
+    assert len(open_index(tmp_path)) == 0
+
+
+def test_write_report(tmp_path):
+    index = open_index(tmp_path)
+    assert index.write_report(str(tmp_path / "none.csv")) is None
+    index.filter_new([("R1", "B1"), ("R1", "B1")])
+    report = index.write_report(str(tmp_path / "duplicates.csv"))
+    with open(report, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["receipt,boe,Reason", "R1,B1,Duplicate within batch"]
@@ -0,0 +1,102 @@
+import csv
+import io
+import os
+
+from invoice_processor import (
+    INVOICE_ROW_TEMPLATE,
+    GroupedCsvWriter,
+    InvoiceData,
+    group_invoices_by_gstin,
+    invoice_to_template_rows,
+)
+
+GSTINS = ["27AAACI1234F1Z5", "07AAACI1234F1Z9", "29AAACI1234F1ZX", ""]
+
+
+def make_invoices(count=150):
+    invoices = []
+    for i in range(count):
+        inv = InvoiceData(
+            airline="IndiGo",
+            invoice_number=f"INV{i:05d}",
+            invoice_date="14-Feb-2025",
+            invoice_type="TAX_INVOICE",
+            customer_gstin=GSTINS[i % len(GSTINS)],
+            vendor_gstin="27AABCI2726B1ZB",
+            taxable_value=1000.0 + i,
+            non_taxable_value=250.0 if i % 3 == 0 else 0.0,
+            cgst_rate=2.5, cgst_amount=25.0, sgst_rate=2.5, sgst_amount=25.0,
+            total_amount=1050.0 + i,
+            pnr=f"PNR{i}",
+        )
+        invoices.append(inv)
+    # A failed extraction is counted in its group but adds no rows
+    invoices.append(InvoiceData(customer_gstin=GSTINS[0], extraction_errors=["no text"]))
+    return invoices
+
+
+def in_memory_output(invoices, entry_date):
+    """Files as produced by grouping every invoice in memory first."""
+    files = {}
+    for key, group in group_invoices_by_gstin(invoices).items():
+        buffer = io.StringIO()
+        writer = INVOICE_ROW_TEMPLATE.writer(buffer)
+        for inv in group:
+            if inv.extraction_errors and not inv.invoice_number:
+                continue
+            writer.writerows(invoice_to_template_rows(inv, entry_date))
+        files[key] = buffer.getvalue().encode("utf-8")
+    return files
+
+
+def write(invoices, output_dir, memory_budget_mb):
+    writer = GroupedCsvWriter(str(output_dir), memory_budget_mb=memory_budget_mb)
+    spilled = False
+    for inv in invoices:
+        writer.add(inv)
+        spilled = spilled or any(g.spilled for g in writer.groups.values())
+    entry_date = writer.entry_date
+    paths = writer.close()
+    return paths, entry_date, spilled
+
+
+def read_all(paths):
+    out = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            out[os.path.basename(path)] = f.read()
+    return out
+
+
+def test_spilled_output_matches_in_memory_output(tmp_path):
+    invoices = make_invoices()
+    big_paths, entry_date, big_spilled = write(invoices, tmp_path / "big", 64)
+    small_paths, _, small_spilled = write(invoices, tmp_path / "small", 0.002)
+    assert not big_spilled
+    assert small_spilled  # ~2 KB budget forces repeated spills
+
+    big, small = read_all(big_paths), read_all(small_paths)
+    assert small == big
+    assert sorted(big.values()) == sorted(in_memory_output(invoices, entry_date).values())
+    # No spill files are left behind
+    assert not [n for n in os.listdir(tmp_path / "small") if n.endswith(".partial")]
+
+
+def test_rows_keep_invoice_order_within_a_group(tmp_path):
+    invoices = make_invoices(40)
+    paths, _, _ = write(invoices, tmp_path, 0.001)
+    numbers_col = INVOICE_ROW_TEMPLATE.headers.index("Vendor Inv No")
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))[1:]
+        numbers = [row[numbers_col] for row in rows]
+        assert numbers == sorted(numbers)
+
+
+def test_discard_removes_spill_files(tmp_path):
+    writer = GroupedCsvWriter(str(tmp_path), memory_budget_mb=0.001)
+    for inv in make_invoices(40):
+        writer.add(inv)
+    assert any(name.endswith(".partial") for name in os.listdir(tmp_path))
+    writer.discard()
+    assert os.listdir(tmp_path) == []
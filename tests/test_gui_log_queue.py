@@ -0,0 +1,112 @@
+import queue
+
+import invoice_processor
+from invoice_processor import InvoiceParserApp, LogRedirector, UiEvent
+
+
+class FakeText:
+    """Just enough of a Tk Text widget for the log drain."""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+
+    def configure(self, **kwargs):
+        pass
+
+    def insert(self, index, *chunks):
+        self.inserts += 1
+        for text in chunks[::2]:
+            self.lines.append(text.rstrip("\n"))
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"  # Tk counts the trailing empty line
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+class FakeWidget:
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(ms)
+
+
+class FakeApp:
+    _start_log_polling = InvoiceParserApp._start_log_polling
+    _log = InvoiceParserApp._log
+
+    def __init__(self):
+        self.log_queue = queue.Queue()
+        self.log_text = FakeText()
+        self.progress = FakeWidget()
+        self.stats_label = FakeWidget()
+        self.root = FakeRoot()
+        self.completed = 0
+
+    def _processing_complete(self):
+        self.completed += 1
+
+
+def test_queued_messages_are_inserted_in_one_batch():
+    app = FakeApp()
+    for i in range(5):
+        app._log(f"line {i}", "info")
+    app._start_log_polling()
+    assert app.log_text.inserts == 1
+    assert [line.split("] ", 1)[1] for line in app.log_text.lines] == [f"line {i}" for i in range(5)]
+    assert app.root.scheduled == [invoice_processor.LOG_POLL_MS]
+
+
+def test_one_tick_drains_at_most_max_events(monkeypatch):
+    monkeypatch.setattr(invoice_processor, "MAX_EVENTS_PER_TICK", 3)
+    app = FakeApp()
+    for i in range(5):
+        app._log(f"line {i}")
+    app._start_log_polling()
+    assert len(app.log_text.lines) == 3
+    app._start_log_polling()
+    assert len(app.log_text.lines) == 5
+
+
+def test_log_is_trimmed_to_max_lines(monkeypatch):
+    monkeypatch.setattr(invoice_processor, "MAX_LOG_LINES", 4)
+    app = FakeApp()
+    for i in range(10):
+        app._log(f"line {i}")
+    app._start_log_polling()
+    assert [line.split("] ", 1)[1] for line in app.log_text.lines] == ["line 7", "line 8", "line 9"]
+
+
+def test_progress_and_done_events_are_applied():
+    app = FakeApp()
+    app.log_queue.put(UiEvent("progress", data={"total_files": 4, "files_done": 1, "status_line": "1/4"}))
+    app.log_queue.put(UiEvent("done"))
+    app._start_log_polling()
+    assert app.progress.options == {"maximum": 4, "value": 1}
+    assert app.stats_label.options == {"text": "1/4"}
+    assert app.completed == 1
+    assert app.log_text.inserts == 0
+
+
+def test_redirected_prints_are_queued():
+    events = queue.Queue()
+    redirector = LogRedirector(None, events)
+    redirector.write("Generated: out.csv\n")
+    redirector.write("\n")
+    event = events.get_nowait()
+    assert (event.kind, event.message) == ("log", "Generated: out.csv")
+    assert events.empty()
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from input_schema import InputSchema, SchemaColumn
+
+SCHEMA = InputSchema("Test Report", [
+    SchemaColumn("BOE No", ("BOE No", "BE No.", "Bill of Entry No")),
+    SchemaColumn("Amount", ("Amount", "Amt"), text=False),
+    SchemaColumn("Note", ("Note", "Remarks"), required=False),
+])
+
+
+def test_resolve_takes_the_first_alias_present():
+    header = ["Bill of Entry No", "BE No.", "Amt", "Other"]
+    assert SCHEMA.resolve(header) == {"BE No.": "BOE No", "Amt": "Amount"}
+
+
+def test_resolve_missing_required_column():
+    with pytest.raises(ValueError, match="BOE No column not found in Test Report file"):
+        SCHEMA.resolve(["Amount", "Note"])
+
+
+def test_missing_optional_column_is_not_an_error():
+    assert SCHEMA.resolve(["BOE No", "Amount"]) == {"BOE No": "BOE No", "Amount": "Amount"}
+
+
+def test_read_csv_renames_and_keeps_identifiers_as_text(tmp_path):
+    path = tmp_path / "report.csv"
+    path.write_text("Unused,BE No.,Amt,Remarks\nx,0012345,10.5,hi\ny,2345678,3,\n", encoding="utf-8")
+    df = SCHEMA.read(str(path))
+    assert list(df.columns) == ["BOE No", "Amount", "Note"]
+    assert list(df["BOE No"]) == ["0012345", "2345678"]
+    assert list(df["Amount"]) == [10.5, 3.0]
+    assert df.attrs["header"] == ["Unused", "BE No.", "Amt", "Remarks"]
+
+
+def test_read_xlsx(tmp_path):
+    path = tmp_path / "report.xlsx"
+    pd.DataFrame({"BOE No": ["0012345"], "Amount": [7], "Extra": ["z"]}).to_excel(path, index=False)
+    df = SCHEMA.read(str(path))
+    assert list(df.columns) == ["BOE No", "Amount"]
+    assert df["BOE No"][0] == "0012345"
+
+
+def test_read_missing_required_column(tmp_path):
+    path = tmp_path / "report.csv"
+    path.write_text("Amount,Note\n1,a\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="BOE No column not found"):
+        SCHEMA.read(str(path))
+
+
+def test_read_unsupported_file_type(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported Test Report file format"):
+        SCHEMA.read(str(tmp_path / "report.xls"))
+
+
+def test_read_xlsx_rows_matches_read(tmp_path):
+    path = tmp_path / "report.xlsx"
+    pd.DataFrame({
+        "BE No.": ["0012345", "2345678", "3456789"],
+        "Amt": [1.5, 2, 3],
+    }).to_excel(path, index=False)
+    tail = SCHEMA.read_xlsx_rows(str(path), min_row=3)
+    full = SCHEMA.read(str(path))
+    assert list(tail["BOE No"]) == list(full["BOE No"])[1:]
+    assert list(tail["Amount"]) == list(full["Amount"])[1:]
+
+
+def test_read_csv_rows_uses_the_given_header():
+    df = SCHEMA.read_csv_rows(b"0099,4\n", ["Bill of Entry No", "Amount"])
+    assert list(df.columns) == ["BOE No", "Amount"]
+    assert df["BOE No"][0] == "0099"
+
+
+def test_job_register_schema_aliases():
+    from job_register import JOB_REGISTER_SCHEMA
+    mapping = JOB_REGISTER_SCHEMA.resolve(["Sr", "Bill of Entry No", "Reference No", "Job Number"])
+    assert mapping == {"Bill of Entry No": "BOE No", "Job Number": "Job No"}
+    with pytest.raises(ValueError, match="Job No column not found in Job Register file"):
+        JOB_REGISTER_SCHEMA.resolve(["BOE No"])
@@ -0,0 +1,85 @@
+import pytest
+
+from invoice_processor import GulfAirParser, parse_segments, split_invoice_segments
+
+
+def indigo_header(number, extra=""):
+    return (f"InterGlobe Aviation Limited (IndiGo)\nTax Invoice\nNumber: {number}\n"
+            f"Date: 21-Oct-2025\nGSTIN: 29AABCI2726B1ZF\n{extra}")
+
+
+def gulf_header(number):
+    return f"GULF AIR\nInvoice No: {number}\nInvoice Date: 21-10-2025\n"
+
+
+def page_counts(segments):
+    return [segment.count("--page--") for segment in segments]
+
+
+def test_single_page_is_one_segment():
+    assert split_invoice_segments([indigo_header("KA1252612CR78975")], "TAX_INVOICE") == [
+        indigo_header("KA1252612CR78975") + "\n"]
+
+
+def test_no_pages():
+    assert split_invoice_segments(["", ""], "TAX_INVOICE") == []
+
+
+def test_each_header_page_starts_an_invoice():
+    pages = [indigo_header("KA1252612CR78975", "--page--"), indigo_header("KA1252612CR78976", "--page--"),
+             indigo_header("KA1252612CR78977", "--page--")]
+    segments = split_invoice_segments(pages, "TAX_INVOICE")
+    assert len(segments) == 3
+    assert [s.split("Number: ")[1][:16] for s in segments] == ["KA1252612CR78975", "KA1252612CR78976",
+                                                              "KA1252612CR78977"]
+
+
+def test_continuation_pages_stay_with_their_invoice():
+    pages = [indigo_header("KA1252612CR78975", "--page--"), "Fare details continued --page--",
+             indigo_header("KA1252612CR78976", "--page--"), "Terms and conditions --page--"]
+    assert page_counts(split_invoice_segments(pages, "TAX_INVOICE")) == [2, 2]
+
+
+def test_repeated_header_on_the_next_page_is_joined():
+    pages = [indigo_header("KA1252612CR78975", "--page--"), indigo_header("KA1252612CR78975", "--page--")]
+    assert page_counts(split_invoice_segments(pages, "TAX_INVOICE")) == [2]
+
+
+def test_non_adjacent_repeat_is_collapsed_with_its_continuations():
+    pages = [indigo_header("KA1252612CR78975", "--page--"), indigo_header("KA1252612CR78976", "--page--"),
+             indigo_header("KA1252612CR78975", "--page--"), "repeat continued --page--",
+             indigo_header("KA1252612CR78977", "--page--")]
+    segments = split_invoice_segments(pages, "TAX_INVOICE")
+    assert page_counts(segments) == [1, 1, 1]
+    assert "repeat continued" not in "".join(segments)
+
+
+def test_leading_pages_join_the_first_invoice():
+    pages = ["Cover letter for IndiGo --page--", indigo_header("KA1252612CR78975", "--page--"),
+             indigo_header("KA1252612CR78976", "--page--")]
+    assert page_counts(split_invoice_segments(pages, "TAX_INVOICE")) == [2, 1]
+
+
+@pytest.mark.parametrize("continuation", [
+    "GULF AIR\nInvoice Notes: see overleaf",
+    "GULF AIR\nInvoice No: TKMHP/2510/04496 (see page 1)",  # Number without the header date
+    "GULF AIR\nInvoice No: PENDING\nInvoice Date: 21-10-2025",  # No digit in the "number"
+])
+def test_continuation_mentioning_the_label_does_not_start_an_invoice(continuation):
+    pages = [gulf_header("TKMHP/2510/04496"), continuation, gulf_header("TKMHP/2510/04497"),
+             continuation]
+    segments = split_invoice_segments(pages, "TAX_INVOICE")
+    assert len(segments) == 2
+    assert all(continuation in segment for segment in segments)
+
+
+def test_header_page_invoice_number():
+    parser = GulfAirParser()
+    assert parser.invoice_number(gulf_header("TKMHP/2510/04496")) == "TKMHP/2510/04496"
+    assert parser.invoice_number("GULF AIR\nInvoice Notes: TES 1\nInvoice Date: 21-10-2025") == ""
+
+
+def test_segments_parse_to_their_own_invoice_numbers():
+    pages = [indigo_header("KA1252612CR78975"), indigo_header("KA1252612CR78976")]
+    invoices = parse_segments(split_invoice_segments(pages, "TAX_INVOICE"), "TAX_INVOICE", parallel=False)
+    assert [inv.invoice_number for inv in invoices] == ["KA1252612CR78975", "KA1252612CR78976"]
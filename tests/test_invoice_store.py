@@ -0,0 +1,74 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from invoice_store import INVOICE_AMOUNT_FIELDS, INVOICE_TEXT_FIELDS, InvoiceStore, run_query
+
+
+def invoice(**values):
+    """Stand-in for InvoiceData (importing invoice_processor needs the GUI and PDF libraries)."""
+    data = {f: "" for f in INVOICE_TEXT_FIELDS}
+    data.update({f: 0.0 for f in INVOICE_AMOUNT_FIELDS})
+    data.update(airline="INDIGO", invoice_number="KA1", invoice_date="01-Jul-2025",
+                vendor_gstin="29AABCI2726B1ZF", customer_gstin="27AAACK1234A1Z4", pnr="ABC123")
+    data.update(values)
+    return SimpleNamespace(**data)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "invoice_store.sqlite")
+
+
+def test_same_invoice_is_upserted(db_path):
+    with InvoiceStore(db_path) as store:
+        store.add(invoice(total_amount=100.0))
+        store.flush()
+        store.add(invoice(total_amount=120.0, pnr="XYZ789"))
+    assert run_query(db_path, "SELECT COUNT(*), total_amount, pnr FROM invoices")[1] == [(1, 120.0, "XYZ789")]
+
+
+def test_key_is_vendor_number_and_date(db_path):
+    with InvoiceStore(db_path) as store:
+        store.add(invoice())
+        store.add(invoice(invoice_date="02-Jul-2025"))
+        store.add(invoice(vendor_gstin="07AABCI2726B1ZH"))
+        store.add(invoice(invoice_number="KA2"))
+    assert run_query(db_path, "SELECT COUNT(*) FROM invoices")[1] == [(4,)]
+
+
+def test_invoices_are_written_in_batches(db_path):
+    store = InvoiceStore(db_path, batch_size=2)
+    for n in range(5):
+        store.add(invoice(invoice_number=f"KA{n}"))
+    assert store.written == 4 and len(store.pending) == 1
+    store.close()
+    assert store.written == 5
+
+
+def test_invoice_without_number_is_not_stored(db_path):
+    with InvoiceStore(db_path) as store:
+        assert not store.add(invoice(invoice_number=""))
+    assert run_query(db_path, "SELECT COUNT(*) FROM invoices")[1] == [(0,)]
+
+
+def test_iso_date_is_queryable(db_path):
+    with InvoiceStore(db_path) as store:
+        store.add(invoice(invoice_date="15-Aug-2025", igst_amount=18.0))
+        store.add(invoice(invoice_number="KA2", invoice_date="oops", igst_amount=5.0))
+    columns, rows = run_query(
+        db_path, "SELECT SUM(igst_amount) AS igst FROM invoices WHERE invoice_date_iso BETWEEN ? AND ?",
+        ["2025-07-01", "2025-09-30"])
+    assert (columns, rows) == (["igst"], [(18.0,)])
+
+
+def test_queries_are_read_only(db_path):
+    InvoiceStore(db_path).close()
+    with pytest.raises(sqlite3.OperationalError):
+        run_query(db_path, "DELETE FROM invoices")
+
+
+def test_query_without_a_store(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run_query(str(tmp_path / "missing.sqlite"), "SELECT 1")
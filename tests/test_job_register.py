@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from job_register import JobRegisterIndex
+
+
+def write_csv(path, rows, header="BE No.,Job No."):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(header + "\n")
+        for boe, job in rows:
+            f.write(f"{boe},{job}\n")
+
+
+def write_xlsx(path, rows):
+    from openpyxl import Workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Sr", "BE No.", "Job No."])
+    for i, (boe, job) in enumerate(rows, 1):
+        sheet.append([i, boe, job])
+    workbook.save(path)
+
+
+def rows(start, stop):
+    return [(f"{1000000 + i}", f"J{i}") for i in range(start, stop)]
+
+
+@pytest.fixture(params=["csv", "xlsx"])
+def register(request, tmp_path):
+    path = str(tmp_path / f"register.{request.param}")
+    write = write_csv if request.param == "csv" else write_xlsx
+
+    def rewrite(data):
+        write(path, data)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # Coarse mtime filesystems
+    rewrite.path = path
+    return rewrite
+
+
+def test_refresh_appends_the_tail(register):
+    register(rows(0, 50))
+    index = JobRegisterIndex.load(register.path)
+    register(rows(0, 80))
+
+    refreshed = index.refresh()
+    assert refreshed is not None
+    full = JobRegisterIndex.load(register.path)
+    assert refreshed.jobs == full.jobs
+    assert (refreshed.rows, refreshed.last_row) == (full.rows, full.last_row)
+    assert refreshed.lookup(" 1000079 ") == "J79"
+    assert len(index) == 50  # The original index is left as it was
+
+
+def test_refresh_rejects_a_rewritten_row(register):
+    register(rows(0, 50))
+    index = JobRegisterIndex.load(register.path)
+    changed = rows(0, 60)
+    changed[49] = ("9999999", "J49")
+    register(changed)
+    assert index.refresh() is None
+
+
+def test_refresh_rejects_a_shrunk_register(register):
+    register(rows(0, 50))
+    index = JobRegisterIndex.load(register.path)
+    register(rows(0, 10))
+    assert index.refresh() is None
+
+
+def test_refresh_rejects_a_changed_header(tmp_path):
+    path = str(tmp_path / "register.csv")
+    write_csv(path, rows(0, 5))
+    index = JobRegisterIndex.load(path)
+    write_csv(path, rows(0, 8), header="BOE No,Job No")
+    assert index.refresh() is None
+
+
+def test_first_occurrence_of_a_boe_wins(tmp_path):
+    path = str(tmp_path / "register.csv")
+    write_csv(path, [("ABC1", "J1"), ("abc1", "J2")])
+    assert JobRegisterIndex.load(path).lookup("Abc1") == "J1"
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from job_scheduler import JobScheduler
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        schedulers.append(JobScheduler(**kwargs))
+        return schedulers[-1]
+    yield make
+    for s in schedulers:
+        s.shutdown()
+
+
+def recorder(order, name, seconds=0.0, started=None):
+    def task():
+        if started is not None:
+            started.set()
+        order.append(name)
+        time.sleep(seconds)
+        return name
+    return task
+
+
+def test_running_bulk_job_does_not_age_past_a_new_urgent_job(scheduler):
+    sched = scheduler(workers=1, aging_seconds=0.05)
+    order, started = [], threading.Event()
+    bulk = sched.submit("bulk", "invoices", [recorder(order, "bulk0", 0.3, started)]
+                        + [recorder(order, f"bulk{i}") for i in range(1, 3)], priority="bulk", submitter="u")
+    assert started.wait(5)
+    urgent = sched.submit("urgent", "ledger", [recorder(order, "urgent")], priority="urgent", submitter="u")
+    assert bulk.wait(5) and urgent.wait(5)
+    assert order.index("urgent") == 1
+
+
+def test_waiting_job_is_promoted(scheduler):
+    sched = scheduler(workers=1, aging_seconds=0.05)
+    order, started = [], threading.Event()
+    sched.submit("blocker", "x", [recorder(order, "blocker", 0.3, started)], priority="urgent")
+    assert started.wait(5)
+    old = sched.submit("old", "x", [recorder(order, "old")], priority="bulk", submitter="a")
+    time.sleep(0.2)  # old waits long enough to reach the urgent class
+    new = sched.submit("new", "x", [recorder(order, "new")], priority="urgent", submitter="b")
+    assert old.wait(5) and new.wait(5)
+    assert order == ["blocker", "old", "new"]
+
+
+def test_priority_then_submission_order(scheduler):
+    sched = scheduler(workers=1, aging_seconds=0)
+    order, started = [], threading.Event()
+    sched.submit("blocker", "x", [recorder(order, "blocker", 0.1, started)])
+    assert started.wait(5)
+    jobs = [sched.submit(name, "x", [recorder(order, name)], priority=priority)
+            for name, priority in [("b1", "bulk"), ("n1", "normal"), ("u1", "urgent"), ("n2", "normal")]]
+    assert all(job.wait(5) for job in jobs)
+    assert order == ["blocker", "u1", "n1", "n2", "b1"]
+
+
+def test_failed_task_drops_the_rest(scheduler):
+    sched = scheduler(workers=1)
+    order = []
+
+    def fail():
+        raise RuntimeError("boom")
+    job = sched.submit("j", "x", [fail, recorder(order, "after")])
+    assert job.wait(5)
+    assert job.status == "failed" and order == []
+
+
+def test_unknown_priority_is_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler(workers=1).submit("j", "x", [lambda: None], priority="asap")
@@ -0,0 +1,76 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from Ledger_to_CSV import (
+    ledger_sources,
+    read_ledger,
+    read_ledger_sources,
+    source_label,
+    source_output_paths,
+)
+
+LEDGER = pd.DataFrame({
+    "Receipt No.": ["R1", "R2"],
+    "BOE No.": ["0012345", "2345678"],
+    "Txn Date": [datetime(2025, 4, 1), datetime(2025, 4, 2)],
+})
+
+
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+
+def test_sources_and_labels(tmp_path):
+    single = write_workbook(tmp_path / "April.xlsx", {"Sheet1": LEDGER})
+    multi = write_workbook(tmp_path / "Q1 Ledger.xlsx", {"Jan": LEDGER, "Feb": LEDGER})
+    sources = ledger_sources([single, multi])
+    assert sources == [(single, 0), (multi, "Jan"), (multi, "Feb")]
+    assert [source_label(s) for s in sources] == ["April", "Q1 Ledger Jan", "Q1 Ledger Feb"]
+
+
+def test_output_paths_per_source(tmp_path):
+    sources = [("in/April.xlsx", 0), ("in/Q1.xlsx", "Jan"), ("in/Q1.xlsx", "Feb")]
+    paths = source_output_paths("out", "01-04-25 10-00", sources)
+    assert [os.path.basename(p) for p in paths] == [
+        "purchase_01-04-25 10-00 April.csv",
+        "purchase_01-04-25 10-00 Q1 Jan.csv",
+        "purchase_01-04-25 10-00 Q1 Feb.csv",
+    ]
+    assert all(os.path.dirname(p) == "out" for p in paths)
+
+
+def test_same_ledger_name_in_two_folders_gets_distinct_outputs():
+    sources = [("a/Ledger.xlsx", 0), ("b/Ledger.xlsx", 0), ("c/LEDGER.xlsx", 0), ("a/X.xlsx", "S")]
+    names = [os.path.basename(p) for p in source_output_paths("out", "T", sources)]
+    assert names == [
+        "purchase_T Ledger.csv",
+        "purchase_T Ledger (2).csv",
+        "purchase_T LEDGER (3).csv",
+        "purchase_T X S.csv",
+    ]
+
+
+def test_read_ledger_adds_source_columns(tmp_path):
+    multi = write_workbook(tmp_path / "Q1.xlsx", {"Jan": LEDGER, "Feb": LEDGER})
+    df = read_ledger(multi, "Feb")
+    assert list(df["Source File"]) == ["Q1.xlsx", "Q1.xlsx"]
+    assert list(df["Source Sheet"]) == ["Feb", "Feb"]
+    assert list(df["Source Row"]) == [2, 3]
+    assert list(df["BOE No."]) == ["0012345", "2345678"]
+
+    single = write_workbook(tmp_path / "April.xlsx", {"Sheet1": LEDGER})
+    assert list(read_ledger(single)["Source Sheet"]) == ["", ""]
+
+
+def test_sheets_without_ledger_columns_are_skipped(tmp_path):
+    book = write_workbook(tmp_path / "Q1.xlsx", {"Jan": LEDGER, "Notes": pd.DataFrame({"Text": ["x"]})})
+    messages = []
+    frames = read_ledger_sources(ledger_sources([book]), messages.append, max_workers=1)
+    assert [source for source, _ in frames] == [(book, "Jan")]
+    assert messages[0] == "Read Q1 Jan: 2 rows"
+    assert messages[1].startswith("Skipped Q1 Notes: ")
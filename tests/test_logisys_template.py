@@ -0,0 +1,65 @@
+import pytest
+
+from logisys_template import CSV_HEADERS, RowTemplate
+
+
+def dict_row(values, variable_columns, constants):
+    """Row built the way the converters did before RowTemplate: a dict per row."""
+    row = {h: "" for h in CSV_HEADERS}
+    row.update(constants)
+    row.update(zip(variable_columns, values))
+    return tuple(row[h] for h in CSV_HEADERS)
+
+
+def test_full_template_has_41_columns():
+    assert len(CSV_HEADERS) == 41
+    assert len(set(CSV_HEADERS)) == 41
+
+
+def test_row_places_values_in_header_order():
+    # Variable columns deliberately out of header order
+    variable = ["Amount", "Entry Date", "Taxcode1 Amt", "Vendor Inv No"]
+    constants = {"Currency": "INR", "ExchRate": 1, "DR or CR": "DR"}
+    template = RowTemplate(variable, constants)
+    values = (118.0, "01-Apr-2025", 18.0, "INV-1")
+    row = template.row(values)
+    assert len(row) == len(CSV_HEADERS)
+    assert row == dict_row(values, variable, constants)
+    mapped = template.to_dict(row)
+    assert mapped["Amount"] == 118.0
+    assert mapped["Entry Date"] == "01-Apr-2025"
+    assert mapped["Currency"] == "INR"
+    assert mapped["Narration"] == ""
+
+
+def test_rows_and_rows_from_columns_match_row():
+    variable = ["Vendor Inv No", "Amount"]
+    template = RowTemplate(variable, {"Currency": "INR"})
+    values = [("A", 1), ("B", 2), ("C", 3)]
+    expected = [template.row(v) for v in values]
+    assert template.rows(values) == expected
+    assert template.rows_from_columns([("A", "B", "C"), (1, 2, 3)]) == expected
+
+
+def test_custom_headers():
+    template = RowTemplate(["b"], {"c": "x"}, headers=["a", "b", "c"])
+    assert template.row(["y"]) == ("", "y", "x")
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(ValueError, match="not in template"):
+        RowTemplate(["No Such Column"])
+    with pytest.raises(ValueError, match="not in template"):
+        RowTemplate(["Amount"], {"Bogus": 1})
+
+
+def test_column_both_variable_and_constant_is_rejected():
+    with pytest.raises(ValueError, match="both variable and constant"):
+        RowTemplate(["Amount", "Currency"], {"Currency": "INR"})
+
+
+def test_write_csv(tmp_path):
+    template = RowTemplate(["b"], headers=["a", "b"])
+    path = tmp_path / "out.csv"
+    template.write_csv(str(path), template.rows([("1",), ("2",)]))
+    assert path.read_bytes() == b"a,b\r\n,1\r\n,2\r\n"
@@ -0,0 +1,68 @@
+import re
+from datetime import datetime
+
+import pytest
+
+from normalize import parse_amount, parse_amounts, parse_date_to_standard, parse_dates
+
+
+def old_parse_date_to_standard(date_str):
+    """The strptime loop parse_date_to_standard replaced."""
+    if not date_str:
+        return ""
+    date_str = date_str.strip()
+    formats = ["%d/%m/%Y", "%d-%m-%Y", "%d-%b-%Y", "%d-%B-%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y"]
+    for fmt in formats:
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%d-%b-%Y")
+        except ValueError:
+            continue
+    return date_str
+
+
+def old_parse_amount(amount_str):
+    if not amount_str:
+        return 0.0
+    cleaned = re.sub(r'[₹$,%\s]', '', str(amount_str))
+    try:
+        return float(cleaned)
+    except ValueError:
+        return 0.0
+
+
+DATES = [
+    "", "15/05/2025", "15-05-2025", "5/5/2025", "05-5-2025", " 15/05/2025 ",
+    "15-May-2025", "15-may-2025", "15-MAY-2025", "15-September-2025", "1-February-2024",
+    "2025-05-15", "2025-5-5", "15 May 2025", "15  May 2025", "15 september 2025",
+    "31/02/2025", "29/02/2024", "29/02/2025", "31-Apr-2025", "30 February 2025",
+    "32/01/2025", "00/01/2025", "15/13/2025", "15/05-2025", "15-Mayo-2025", "15-Sept-2025",
+    "15/05/25", "2025/05/15", "May 15, 2025", "not a date", "NA",
+]
+
+
+@pytest.mark.parametrize("value", DATES)
+def test_parse_date_matches_the_strptime_loop(value):
+    assert parse_date_to_standard(value) == old_parse_date_to_standard(value)
+
+
+def test_parse_date_examples():
+    assert parse_date_to_standard("15/05/2025") == "15-May-2025"
+    assert parse_date_to_standard("15 September 2025") == "15-Sep-2025"
+    assert parse_date_to_standard("31/02/2025") == "31/02/2025"
+    assert parse_date_to_standard(None) == ""
+
+
+AMOUNTS = [
+    "", "0", "1234.50", "1,234.50", "₹1,234.50", "$ 12", "18%", " 12,34,567.89 ",
+    "1 234", "1　234", "-45.10", "1e3", "abc", "12.3.4", "₹", 1234, 0, 12.5, None,
+]
+
+
+@pytest.mark.parametrize("value", AMOUNTS)
+def test_parse_amount_matches_the_regex_version(value):
+    assert parse_amount(value) == old_parse_amount(value)
+
+
+def test_vectorized_variants():
+    assert parse_dates(["15/05/2025", "x"]) == ["15-May-2025", "x"]
+    assert parse_amounts(["1,000", "₹5"]) == [1000.0, 5.0]
@@ -0,0 +1,60 @@
+import csv
+import json
+
+import pytest
+
+from logisys_template import RowTemplate
+from output_parts import manifest_path, part_paths, plan_parts, write_parts
+
+
+@pytest.mark.parametrize("unit_sizes, max_rows, expected", [
+    ([1, 1, 1, 1], 2, [(2, 2), (2, 2)]),
+    ([2, 2, 1], 3, [(2, 1), (3, 2)]),
+    ([1, 5, 1], 3, [(1, 1), (5, 1), (1, 1)]),  # An oversized invoice gets its own part
+    ([3], 10, [(3, 1)]),
+    ([], 10, [(0, 0)]),
+])
+def test_plan_parts(unit_sizes, max_rows, expected):
+    assert plan_parts(unit_sizes, max_rows) == expected
+
+
+@pytest.mark.parametrize("max_rows", [1, 2, 3, 4, 7])
+def test_plan_parts_never_splits_a_unit(max_rows):
+    unit_sizes = [2, 1, 2, 2, 1, 1, 2, 5, 1]
+    parts = plan_parts(unit_sizes, max_rows)
+    assert sum(units for _, units in parts) == len(unit_sizes)
+    start = 0
+    for rows, units in parts:
+        assert rows == sum(unit_sizes[start:start + units])
+        assert rows <= max_rows or units == 1
+        start += units
+
+
+def test_plan_parts_rejects_non_positive_max_rows():
+    with pytest.raises(ValueError):
+        plan_parts([1], 0)
+
+
+def test_part_paths(tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert part_paths(path, 1) == [path]
+    assert part_paths(path, 2) == [str(tmp_path / "out_part01.csv"), str(tmp_path / "out_part02.csv")]
+    assert manifest_path(path) == str(tmp_path / "out_manifest.json")
+
+
+def test_write_parts_keeps_invoices_together(tmp_path):
+    template = RowTemplate(["Vendor Inv No", "Amount"], {})
+    rows = [("A", "1"), ("A", "2"), ("B", "3"), ("C", "4"), ("C", "5")]
+    path = str(tmp_path / "out.csv")
+    parts = write_parts(template, path, template.rows(rows), [2, 1, 2], max_rows=3)
+
+    assert [part.rows for part in parts] == [3, 2]
+    written = []
+    for part in parts:
+        with open(part.path, newline="", encoding="utf-8") as f:
+            part_rows = list(csv.reader(f))
+        assert part_rows[0] == template.headers
+        written.append([row[template.headers.index("Vendor Inv No")] for row in part_rows[1:]])
+    assert written == [["A", "A", "B"], ["C", "C"]]
+    with open(manifest_path(path), encoding="utf-8") as f:
+        assert [p["rows"] for p in json.load(f)["parts"]] == [3, 2]
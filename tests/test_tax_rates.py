@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from tax_rates import NO_TAX, TaxRate, TaxRateTable, state_code
+
+
+def rate(sac, start, end, percent):
+    half = Decimal(percent) / 2
+    return TaxRate(sac, start, end, (("Central GST", half), ("State GST", half)),
+                   (("Integrated GST", Decimal(percent)),))
+
+
+@pytest.fixture
+def table():
+    return TaxRateTable([
+        rate("996712", date(2017, 7, 1), date(2024, 12, 31), "18"),
+        rate("996712", date(2025, 1, 1), None, "12"),
+        rate("998599", date(2020, 1, 1), date(2020, 12, 31), "5"),
+    ])
+
+
+@pytest.mark.parametrize("on, percent", [
+    (date(2017, 7, 1), "18"),
+    (date(2024, 12, 31), "18"),
+    (date(2025, 1, 1), "12"),
+    (date(2030, 6, 1), "12"),
+])
+def test_rate_in_force_on_a_date(table, on, percent):
+    assert table.rate_for("996712", on).inter[0][1] == Decimal(percent)
+
+
+@pytest.mark.parametrize("sac, on", [
+    ("996712", date(2017, 6, 30)),  # Before GST
+    ("998599", date(2021, 1, 1)),   # After the only period ended
+    ("000000", date(2020, 6, 1)),   # Unknown SAC
+])
+def test_no_rate_outside_any_period(table, sac, on):
+    assert table.rate_for(sac, on) is None
+
+
+def test_overlapping_periods_are_rejected():
+    with pytest.raises(ValueError):
+        TaxRateTable([rate("1", date(2020, 1, 1), None, "18"), rate("1", date(2021, 1, 1), None, "12")])
+
+
+def test_compute_intra_and_inter_state(table):
+    on = date(2024, 5, 1)
+    intra, inter = table.compute(["996712"] * 2, ["285"] * 2, [on] * 2, [False, True])
+    assert intra == ("Central GST", "25.65", "State GST", "25.65", "", "", "", "")
+    assert inter == ("Integrated GST", "51.30", "", "", "", "", "", "")
+
+
+def test_compute_rounds_half_up_to_paise(table):
+    # 0.25 * 9% = 0.0225 -> 0.02; 0.5 * 9% = 0.045 -> 0.05 (half-up, not banker's)
+    rows = table.compute(["996712"] * 2, ["0.25", "0.5"], [date(2024, 5, 1)] * 2, [False] * 2)
+    assert [row[1] for row in rows] == ["0.02", "0.05"]
+
+
+def test_compute_without_sac_or_rate(table):
+    assert table.compute(["", "996712"], ["336", "285"], [None, date(2010, 1, 1)], [False, False]) == [NO_TAX, None]
+
+
+def test_compute_rejects_a_non_numeric_amount(table):
+    with pytest.raises(ValueError):
+        table.compute(["996712"], ["abc"], [date(2024, 5, 1)], [False])
+
+
+@pytest.mark.parametrize("value, code", [
+    ("27AAACK1234A1Z4", "27"),
+    ("7", "07"),
+    (29.0, "29"),
+    ("27-Maharashtra", "27"),
+    ("karnataka", "29"),
+    ("Atlantis", None),
+    (None, None),
+])
+def test_state_code(value, code):
+    assert state_code(value) == code
+
+
+def test_interstate_flags_against_home_state(table):
+    assert table.interstate_flags(["27AAACK1234A1Z4", "Karnataka", None, "27"]) == [False, True, False, False]
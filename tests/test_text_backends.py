@@ -0,0 +1,93 @@
+import pytest
+
+import invoice_processor
+from invoice_processor import (
+    REFERENCE_TEXT_BACKEND,
+    TEXT_EXTRACTORS,
+    ExtractionStats,
+    InvoiceData,
+    extract_text_from_pdf,
+    fix_split_numbers,
+    parse_invoices,
+    select_text_backend,
+)
+
+
+def test_backends_are_registered():
+    assert set(TEXT_EXTRACTORS) == {"pdfplumber", "pdfminer", "pdfium"}
+    assert REFERENCE_TEXT_BACKEND == "pdfplumber"
+
+
+def test_no_overrides_skips_sniffing(monkeypatch):
+    def sniff(path):
+        raise AssertionError("sniffed without overrides")
+
+    monkeypatch.setattr(invoice_processor, "sniff_airline", sniff)
+    assert select_text_backend("x.pdf") == (REFERENCE_TEXT_BACKEND, "")
+
+
+def test_override_for_the_sniffed_airline(monkeypatch):
+    monkeypatch.setattr(invoice_processor, "AIRLINE_TEXT_BACKENDS", {"INDIGO": "pdfminer"})
+    monkeypatch.setattr(invoice_processor, "sniff_airline", lambda path: "INDIGO")
+    assert select_text_backend("x.pdf") == ("pdfminer", "INDIGO")
+    monkeypatch.setattr(invoice_processor, "sniff_airline", lambda path: "GULF AIR")
+    assert select_text_backend("x.pdf") == (REFERENCE_TEXT_BACKEND, "GULF AIR")
+
+
+def test_page_texts_are_joined_and_split_numbers_fixed(monkeypatch):
+    class Extractor:
+        def iter_page_texts(self, pdf_path, page_num):
+            return iter(["Total 10,864.0\n0", None, "end"])
+
+    monkeypatch.setitem(TEXT_EXTRACTORS, "fake", Extractor())
+    stats = ExtractionStats()
+    assert extract_text_from_pdf("x.pdf", backend="fake", stats=stats) == "Total 10,864.00\nend\n"
+    assert (stats.backend, stats.pages) == ("fake", 3)
+    assert fix_split_numbers("11,838.\n00") == "11,838.00"
+
+
+class FakeExtraction:
+    """Stands in for text extraction and parsing; records the backends used."""
+
+    def __init__(self, monkeypatch, results, missing=()):
+        self.results = results  # backend -> parsed InvoiceData list
+        self.missing = missing  # backends whose library is not installed
+        self.backends = []
+        monkeypatch.setattr(invoice_processor, "extract_page_texts", self.extract)
+        monkeypatch.setattr(invoice_processor, "split_invoice_segments", lambda pages, kind: pages)
+        monkeypatch.setattr(invoice_processor, "parse_segments", lambda segments, kind, parallel: segments)
+
+    def extract(self, pdf_path, page_num=None, backend=REFERENCE_TEXT_BACKEND, stats=None):
+        self.backends.append(backend)
+        if backend in self.missing:
+            raise ImportError(backend)
+        return list(self.results[backend])
+
+
+def good(airline="INDIGO"):
+    return InvoiceData(airline=airline, invoice_number="KA1")
+
+
+def test_fast_backend_output_is_kept_when_it_parses(monkeypatch):
+    fake = FakeExtraction(monkeypatch, {"pdfminer": [good()]})
+    assert parse_invoices("x.pdf", backend="pdfminer") == [good()]
+    assert fake.backends == ["pdfminer"]
+
+
+@pytest.mark.parametrize("fast", [
+    [],                                                  # nothing parsed
+    [InvoiceData(airline="INDIGO", extraction_errors=["Invoice number not found"])],
+    [good("AIR INDIA")],                                 # another parser matched
+])
+def test_broken_fast_parse_falls_back_to_the_reference(monkeypatch, fast):
+    fake = FakeExtraction(monkeypatch, {"pdfium": fast, REFERENCE_TEXT_BACKEND: [good()]})
+    monkeypatch.setattr(invoice_processor, "sniff_airline", lambda path: "INDIGO")
+    monkeypatch.setattr(invoice_processor, "AIRLINE_TEXT_BACKENDS", {"INDIGO": "pdfium"})
+    assert parse_invoices("x.pdf") == [good()]
+    assert fake.backends == ["pdfium", REFERENCE_TEXT_BACKEND]
+
+
+def test_missing_backend_library_uses_the_reference(monkeypatch):
+    fake = FakeExtraction(monkeypatch, {REFERENCE_TEXT_BACKEND: [good()]}, missing=("pdfium",))
+    assert parse_invoices("x.pdf", backend="pdfium") == [good()]
+    assert fake.backends == ["pdfium", REFERENCE_TEXT_BACKEND]
@@ -0,0 +1,49 @@
+import pytest
+
+import invoice_processor
+from invoice_processor import PdfplumberExtractor
+
+
+class FakePage:
+    def __init__(self, text):
+        self.text = text
+        self.released = False
+
+    def extract_text(self, x_tolerance=3):
+        return self.text
+
+
+class ClosablePage(FakePage):
+    def close(self):
+        self.released = True
+
+
+class FlushablePage(FakePage):
+    def flush_cache(self):
+        self.released = True
+
+
+class FakePdf:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.mark.parametrize("page_class", [ClosablePage, FlushablePage, FakePage])
+def test_each_page_is_released_after_extraction(monkeypatch, page_class):
+    pages = [page_class("one"), page_class(None)]
+    monkeypatch.setattr(invoice_processor.pdfplumber, "open", lambda path: FakePdf(pages))
+    assert list(PdfplumberExtractor().iter_page_texts("x.pdf")) == ["one", ""]
+    assert all(page.released == (page_class is not FakePage) for page in pages)
+
+
+def test_single_page(monkeypatch):
+    pages = [ClosablePage("one"), ClosablePage("two")]
+    monkeypatch.setattr(invoice_processor.pdfplumber, "open", lambda path: FakePdf(pages))
+    assert list(PdfplumberExtractor().iter_page_texts("x.pdf", page_num=1)) == ["two"]
+    assert list(PdfplumberExtractor().iter_page_texts("x.pdf", page_num=5)) == []
@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import watch_service
+from watch_service import WatchService, _convert_ledger_job
+
+
+def _service(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    service = WatchService(str(inbox), str(tmp_path / "outbox"), debounce_seconds=0, workers=1)
+    return service, inbox
+
+
+def test_file_that_cannot_be_moved_is_not_requeued(tmp_path, monkeypatch):
+    service, inbox = _service(tmp_path)
+    try:
+        pdf = inbox / "locked.pdf"
+        pdf.write_bytes(b"%PDF-1.4")
+        assert service.scan() == [str(pdf)]
+
+        def locked(src, dst):
+            raise PermissionError("file is in use")
+
+        monkeypatch.setattr(watch_service.shutil, "move", locked)
+        service.pending.pop(str(pdf))
+        service._finish(str(pdf), True, "locked.pdf")
+        assert pdf.exists()
+        assert service.scan() == []
+        assert service.status()["unmovable"] == 1
+
+        # A replaced file is picked up again
+        monkeypatch.setattr(watch_service.shutil, "move", shutil.move)
+        pdf.write_bytes(b"%PDF-1.4 replaced")
+        assert service.scan() == [str(pdf)]
+        assert service.status()["unmovable"] == 0
+    finally:
+        service.pool.shutdown()
+
+
+def test_ledger_without_job_register_fails_once(tmp_path):
+    ok, messages = _convert_ledger_job(str(tmp_path / "ledger.xlsx"), str(tmp_path / "out.csv"), [])
+    assert not ok
+    assert messages == ["Job Register file not set."]
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from logisys_template import CSV_HEADERS, RowTemplate
+from xlsx_output import XlsxTemplateWriter, sheet_title, write_xlsx
+
+TEMPLATE = RowTemplate(["Vendor Inv No", "Vendor Inv Date", "SAC or HSN", "Amount", "Taxcode1 Amt", "Ref No"])
+COL = {h: i for i, h in enumerate(CSV_HEADERS)}
+
+
+def test_cell_types(tmp_path):
+    rows = TEMPLATE.rows([
+        ("00123", "14-Feb-2025", "0996712", "1180.50", 90, "007"),
+        ("00124", "14-Feb-2025", "996712", "", "n/a", ""),
+        ("00125", "31/02/2025", "", 12, "", "x"),
+    ])
+    path = write_xlsx(str(tmp_path / "out.xlsx"), TEMPLATE, rows)
+    sheet = load_workbook(path).active
+    values = [[cell.value for cell in row] for row in sheet.iter_rows()]
+    assert values[0] == CSV_HEADERS
+
+    first, second, third = values[1:]
+    # Identifiers stay text, leading zeros included
+    assert first[COL["Vendor Inv No"]] == "00123"
+    assert first[COL["SAC or HSN"]] == "0996712"
+    assert first[COL["Ref No"]] == "007"
+    # Amounts are numbers
+    assert first[COL["Amount"]] == 1180.5
+    assert first[COL["Taxcode1 Amt"]] == 90
+    assert third[COL["Amount"]] == 12
+    # Dates are date cells, also when the same date repeats
+    assert first[COL["Vendor Inv Date"]] == datetime(2025, 2, 14)
+    assert second[COL["Vendor Inv Date"]] == datetime(2025, 2, 14)
+    date_cell = sheet.cell(row=2, column=COL["Vendor Inv Date"] + 1)
+    assert date_cell.is_date and date_cell.number_format == "DD-MMM-YYYY"
+    # Empty values are blank; unparseable values are kept as text
+    assert second[COL["Amount"]] is None
+    assert second[COL["Ref No"]] is None
+    assert second[COL["Taxcode1 Amt"]] == "n/a"
+    assert third[COL["Vendor Inv Date"]] == "31/02/2025"
+    assert third[COL["SAC or HSN"]] is None
+
+
+def test_sheet_title_cleans_and_truncates():
+    assert sheet_title("27AAACI1234F1Z5") == "27AAACI1234F1Z5"
+    assert sheet_title("a/b\\c[d]:e*f?") == "a_b_c_d__e_f_"
+    assert sheet_title("x" * 40) == "x" * 31
+    assert sheet_title("") == "Sheet"
+
+
+def test_repeated_sheet_titles_are_made_unique(tmp_path):
+    writer = XlsxTemplateWriter(str(tmp_path / "out.xlsx"), TEMPLATE)
+    long_name = "L" * 40
+    for title in ["Group", "group", "Group", long_name, long_name, "a/b", "a_b"]:
+        writer.write_sheet(title, [])
+    path = writer.save()
+    titles = load_workbook(path).sheetnames
+    assert titles == ["Group", "group_2", "Group_3", "L" * 31, "L" * 29 + "_2", "a_b", "a_b_2"]
+    assert all(len(t) <= 31 for t in titles)
+
+
+def test_empty_workbook_still_has_a_sheet(tmp_path):
+    path = XlsxTemplateWriter(str(tmp_path / "out.xlsx"), TEMPLATE).save()
+    book = load_workbook(path)
+    assert book.sheetnames == ["Sheet"]
+    assert [c.value for c in next(book.active.iter_rows())] == CSV_HEADERS
+    assert not (tmp_path / "out.xlsx.tmp").exists()
@@ -0,0 +1,356 @@
+"""
+Watch-Folder Service
+Long-running mode that converts invoices and ledgers continuously as they
+arrive in an inbox folder:
+
+    *.pdf   -> parse_invoices -> Flight_Exp_*.csv (one set per batch)
+    *.xlsx  -> create_csv      -> purchase_*.csv (one per ledger)
+
+Outputs go to dated folders under the outbox; source files are moved to
+inbox/processed/<date>/ (or inbox/failed/<date>/). A JSON status file reports
+backlog depth and processing lag.
+
+Usage:
+    python watch_service.py --inbox IN --outbox OUT --job-register REGISTER.csv [--job-register MORE...]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+INVOICE_SUFFIXES = (".pdf",)
+LEDGER_SUFFIXES = (".xlsx",)
+
+# Parsed invoices are written once no PDF is in flight, or sooner when the
+# buffered batch reaches this many invoices or this age (steady inflow)
+DEFAULT_BATCH_INVOICES = 500
+DEFAULT_BATCH_SECONDS = 60.0
+
+
+def _parse_pdf_job(pdf_path: str) -> list:
+    """Worker: parse one invoice PDF."""
+    from invoice_processor import parse_invoices
+    return parse_invoices(pdf_path, parallel=False)
+
+
+def _convert_ledger_job(ledger_path: str, output_path: str, registers: List[str]) -> Tuple[bool, List[str]]:
+    """Worker: convert one ledger with the (per-process cached) merged Job Register index."""
+    from Ledger_to_CSV import create_csv, read_ledger
+    from job_register import get_merged_job_register_index, resolve_register_paths
+
+    messages: List[str] = []
+    # Folders are expanded per ledger, so a newly added register is picked up
+    register_paths = resolve_register_paths(registers)
+    if not register_paths:
+        # Checked once per ledger rather than logged for every row
+        return False, ["Job Register file not set."]
+    # Already inside a pool worker: load the registers sequentially
+    job_index = get_merged_job_register_index(register_paths, max_workers=1)
+    ledger_data = read_ledger(ledger_path)
+    ok = create_csv(ledger_data, output_path, messages.append, job_index=job_index)
+    return ok, messages
+
+
+class WatchService:
+    """Polls (or is woken by filesystem events for) an inbox and converts arriving files."""
+
+    def __init__(
+        self,
+        inbox: str,
+        outbox: str,
+        job_registers: Optional[List[str]] = None,
+        poll_interval: float = 2.0,
+        debounce_seconds: float = 5.0,
+        workers: int = 2,
+        status_file: Optional[str] = None,
+        batch_invoices: int = DEFAULT_BATCH_INVOICES,
+        batch_seconds: float = DEFAULT_BATCH_SECONDS
+    ):
+        self.inbox = os.path.abspath(inbox)
+        self.outbox = os.path.abspath(outbox)
+        self.job_registers = list(job_registers or [])  # files and/or folders
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.status_file = status_file or os.path.join(self.outbox, "watch_status.json")
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+        # path -> [size, mtime_ns, first_seen, stable_since]
+        self.pending: Dict[str, list] = {}
+        self.in_flight: Dict[str, tuple] = {}     # path -> (Future, ledger output path)
+        self.invoice_results: Dict[str, list] = {}  # PDFs parsed in the current sweep
+        # Finished files that could not be moved out of the inbox:
+        # path -> (size, mtime_ns), skipped until the file changes
+        self.unmovable: Dict[str, Tuple[int, int]] = {}
+        self.batch_invoices = batch_invoices
+        self.batch_seconds = batch_seconds
+        self._batch_started = 0.0  # monotonic time the first PDF of the current batch finished
+        self.processed = 0
+        self.failed = 0
+        self.last_error = ""
+        self._wake = threading.Event()
+        os.makedirs(self.outbox, exist_ok=True)
+
+    def log(self, message: str) -> None:
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", flush=True)
+
+    # ---------------- Scanning ----------------
+
+    def scan(self) -> List[str]:
+        """Update the pending table and return files whose size/mtime has settled."""
+        now = time.monotonic()
+        seen = set()
+        with os.scandir(self.inbox) as entries:
+            for entry in entries:
+                name = entry.name.lower()
+                if not entry.is_file() or name.startswith((".", "~$")):
+                    continue
+                if not name.endswith(INVOICE_SUFFIXES + LEDGER_SUFFIXES):
+                    continue
+                seen.add(entry.path)
+                if entry.path in self.in_flight or entry.path in self.invoice_results:
+                    continue
+                st = entry.stat()
+                if entry.path in self.unmovable:
+                    if self.unmovable[entry.path] == (st.st_size, st.st_mtime_ns):
+                        continue
+                    del self.unmovable[entry.path]  # Replaced or edited: process again
+                state = self.pending.get(entry.path)
+                if state is None:
+                    self.pending[entry.path] = [st.st_size, st.st_mtime_ns, now, now]
+                elif (state[0], state[1]) != (st.st_size, st.st_mtime_ns):
+                    state[0], state[1], state[3] = st.st_size, st.st_mtime_ns, now
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        for path in list(self.unmovable):
+            if path not in seen:
+                del self.unmovable[path]
+
+        ready = []
+        for path, (_, _, _, stable_since) in self.pending.items():
+            if path in self.in_flight:
+                continue
+            if now - stable_since >= self.debounce_seconds and self._is_readable(path):
+                ready.append(path)
+        return ready
+
+    @staticmethod
+    def _is_readable(path: str) -> bool:
+        """False while another process still holds the file open for writing (Windows)."""
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+    # ---------------- Dispatch ----------------
+
+    def dispatch(self, ready: List[str]) -> None:
+        date_dir = os.path.join(self.outbox, datetime.now().strftime("%Y-%m-%d"))
+        for path in ready:
+            if path.lower().endswith(INVOICE_SUFFIXES):
+                output = None
+                future = self.pool.submit(_parse_pdf_job, path)
+            else:
+                os.makedirs(date_dir, exist_ok=True)
+                stem = os.path.splitext(os.path.basename(path))[0]
+                output = os.path.join(date_dir, f"purchase_{stem}_{datetime.now().strftime('%H-%M-%S')}.csv")
+                future = self.pool.submit(_convert_ledger_job, path, output, self.job_registers)
+            self.in_flight[path] = (future, output)
+            self.log(f"Queued: {os.path.basename(path)}")
+
+    def collect(self) -> None:
+        """Handle finished jobs; write buffered invoice CSVs when no PDF is in flight or the batch is full or old."""
+        for path, (future, output) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[path]
+            first_seen = self.pending.pop(path, [0, 0, time.monotonic()])[2]
+            try:
+                result = future.result()
+            except Exception as e:
+                self._finish(path, False, f"{os.path.basename(path)}: {e}")
+                continue
+
+            if path.lower().endswith(INVOICE_SUFFIXES):
+                if not self.invoice_results:
+                    self._batch_started = time.monotonic()
+                self.invoice_results[path] = result
+            else:
+                ok, messages = result
+                self._finish(path, ok, messages[-1] if messages else "")
+                if ok:
+                    self.log(f"Ledger converted: {os.path.basename(output)} "
+                             f"(lag {time.monotonic() - first_seen:.1f}s)")
+
+        if self.invoice_results:
+            pdfs_in_flight = any(p.lower().endswith(INVOICE_SUFFIXES) for p in self.in_flight)
+            buffered = sum(len(invs) for invs in self.invoice_results.values())
+            if (not pdfs_in_flight or buffered >= self.batch_invoices
+                    or time.monotonic() - self._batch_started >= self.batch_seconds):
+                self._write_invoice_batch()
+
+    def _write_invoice_batch(self) -> None:
+        from invoice_processor import INVOICE_HISTORY_DB, generate_csv, open_invoice_index
+
+        results, self.invoice_results = self.invoice_results, {}
+        invoices = [inv for invs in results.values() for inv in invs if inv.invoice_number]
+        if invoices:
+            now = datetime.now()
+            out_dir = os.path.join(self.outbox, now.strftime("%Y-%m-%d"), f"invoices_{now.strftime('%H-%M-%S')}")
+            try:
+                files = generate_csv(
+                    invoices, out_dir,
+                    duplicate_index=open_invoice_index(os.path.join(self.outbox, INVOICE_HISTORY_DB)),
+                )
+                self.log(f"Invoices: {len(invoices)} from {len(results)} PDF(s) -> {len(files)} CSV(s) in {out_dir}")
+            except Exception as e:
+                for path in results:
+                    self._finish(path, False, f"CSV generation error: {e}")
+                return
+        for path, invs in results.items():
+            parsed = [inv for inv in invs if inv.invoice_number]
+            errors = ", ".join(invs[0].extraction_errors) if invs and not parsed else ""
+            self._finish(path, bool(parsed), f"{os.path.basename(path)}: {errors}")
+
+    def _finish(self, path: str, ok: bool, message: str = "") -> None:
+        """Move a source file out of the inbox and count it."""
+        subdir = "processed" if ok else "failed"
+        target_dir = os.path.join(self.inbox, subdir, datetime.now().strftime("%Y-%m-%d"))
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(target)
+            target = f"{stem}_{datetime.now().strftime('%H%M%S%f')}{ext}"
+        try:
+            shutil.move(path, target)
+        except OSError as e:
+            message = f"{message} (could not move: {e})"
+            try:
+                st = os.stat(path)
+            except OSError:
+                pass  # Gone from the inbox after all
+            else:
+                # Still in the inbox: don't pick it up again on the next scan
+                self.unmovable[path] = (st.st_size, st.st_mtime_ns)
+                self.log(f"Could not move {os.path.basename(path)} out of the inbox; "
+                         f"skipping it until it changes: {e}")
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+            self.last_error = message
+            self.log(f"Failed: {message}")
+
+    # ---------------- Status ----------------
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        waiting = [state[2] for state in self.pending.values()]
+        return {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "watching": self.inbox,
+            "mode": "events+polling" if HAS_WATCHDOG else "polling",
+            "backlog": len(self.pending) + len(self.invoice_results),
+            "in_flight": len(self.in_flight),
+            "lag_seconds": round(now - min(waiting), 1) if waiting else 0.0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "unmovable": len(self.unmovable),
+            "last_error": self.last_error,
+        }
+
+    def write_status(self) -> None:
+        tmp_path = self.status_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(tmp_path, self.status_file)
+
+    # ---------------- Main loop ----------------
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Run until stop_event is set (or Ctrl+C)."""
+        stop_event = stop_event or threading.Event()
+        observer = self._start_observer()
+        self.log(f"Watching {self.inbox} ({'events + polling' if observer else 'polling'} every {self.poll_interval}s)")
+        try:
+            while not stop_event.is_set():
+                self.dispatch(self.scan())
+                self.collect()
+                self.write_status()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.pool.shutdown(wait=True)
+            self.collect()
+            self.write_status()
+            self.log("Stopped")
+
+    def _start_observer(self):
+        """Start a filesystem observer that wakes the loop early (watchdog, if installed)."""
+        if not HAS_WATCHDOG:
+            return None
+        wake = self._wake
+
+        class _WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        observer = Observer()
+        observer.schedule(_WakeHandler(), self.inbox, recursive=False)
+        observer.start()
+        return observer
+
+
+def main(argv: List[str] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Convert invoices and ledgers as they arrive in an inbox folder.")
+    arg_parser.add_argument("--inbox", required=True, help="Folder to watch")
+    arg_parser.add_argument("--outbox", required=True, help="Folder for dated output folders")
+    arg_parser.add_argument("--job-register", action="append", default=[],
+                            help="Job Register (.csv/.xlsx) or folder of registers for ledger conversions (repeatable)")
+    arg_parser.add_argument("--poll", type=float, default=2.0, help="Polling interval in seconds")
+    arg_parser.add_argument("--debounce", type=float, default=5.0, help="Seconds a file must stay unchanged before it is processed")
+    arg_parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    arg_parser.add_argument("--status-file", help="Status JSON path (default: <outbox>/watch_status.json)")
+    arg_parser.add_argument("--batch-invoices", type=int, default=DEFAULT_BATCH_INVOICES,
+                            help="Write an invoice CSV batch once this many invoices are buffered")
+    arg_parser.add_argument("--batch-seconds", type=float, default=DEFAULT_BATCH_SECONDS,
+                            help="Write an invoice CSV batch once its first PDF has waited this long")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.isdir(args.inbox):
+        print(f"Inbox folder not found: {args.inbox}")
+        return 1
+    service = WatchService(
+        args.inbox, args.outbox, args.job_register,
+        poll_interval=args.poll, debounce_seconds=args.debounce,
+        workers=args.workers, status_file=args.status_file,
+        batch_invoices=args.batch_invoices, batch_seconds=args.batch_seconds,
+    )
+    service.run()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
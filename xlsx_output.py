@@ -0,0 +1,127 @@
+"""
+Xlsx Output
+Review copy of a Logisys CSV as an Excel workbook, written with openpyxl's
+write-only (streaming) worksheets so memory stays flat however many rows
+there are. Amount columns become numeric cells and date columns real date
+cells (shown as DD-MMM-YYYY); every other column stays text, so leading
+zeros in invoice, SAC and reference numbers survive. Empty values are left
+as blank cells.
+"""
+
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from logisys_template import RowTemplate
+
+XLSX_DATE_FORMAT = "DD-MMM-YYYY"
+
+# Template columns written as dates (DD-MMM-YYYY text in the CSV)
+DATE_COLUMNS = {"Entry Date", "Posting Date", "Vendor Inv Date", "Due Date", "Start Date", "End Date"}
+
+# Template columns written as numbers
+NUMBER_COLUMNS = {
+    "ExchRate", "Charge or GL Amount", "Taxcode1 Amt", "Taxcode2 Amt", "Taxcode3 Amt",
+    "Taxcode4 Amt", "Amount", "WH Tax Percentage", "WH Tax Taxable", "WH Tax Amount",
+}
+
+# Characters Excel does not allow in sheet titles
+_SHEET_TITLE_INVALID = str.maketrans({c: "_" for c in '[]:*?/\\'})
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text: str):
+    try:
+        return datetime.strptime(text, "%d-%b-%Y").date()
+    except ValueError:
+        return None
+
+
+def sheet_title(name: str) -> str:
+    """A valid Excel sheet title for name (31 characters at most)."""
+    return str(name).translate(_SHEET_TITLE_INVALID)[:31] or "Sheet"
+
+
+class XlsxTemplateWriter:
+    """Streams template rows into a write-only workbook, one sheet per write_sheet call."""
+
+    def __init__(self, path: str, template: RowTemplate):
+        self.path = path
+        self.template = template
+        self.workbook = Workbook(write_only=True)
+        self._titles = set()
+
+    def _converters(self, sheet) -> List[Callable[[Any], Any]]:
+        """Per column: value -> cell value, built once per sheet."""
+        def text(value):
+            return value if value != "" else None
+
+        def number(value):
+            if value == "" or value is None:
+                return None
+            if isinstance(value, (int, float)):
+                return value
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return value  # Not a number: keep the text
+
+        # One styled cell per distinct date: append() positions and writes
+        # each cell immediately, so a cell object can be reused across rows
+        date_cells = {}
+
+        def date_cell(value):
+            if not value:
+                return None
+            cell = date_cells.get(value)
+            if cell is None:
+                parsed = _parse_date(value) if isinstance(value, str) else None
+                if parsed is None:
+                    return value  # Unparsed date text is kept as it was
+                cell = date_cells[value] = WriteOnlyCell(sheet, value=parsed)
+                cell.number_format = XLSX_DATE_FORMAT
+            return cell
+
+        return [
+            date_cell if h in DATE_COLUMNS else number if h in NUMBER_COLUMNS else text
+            for h in self.template.headers
+        ]
+
+    def write_sheet(self, title: str, rows: Iterable[Sequence[Any]]) -> int:
+        """Add a sheet with the header and rows (consumed as a stream). Returns the row count."""
+        title = sheet_title(title)
+        base, n = title, 1
+        while title.lower() in self._titles:
+            n += 1
+            title = f"{base[:31 - len(str(n)) - 1]}_{n}"
+        self._titles.add(title.lower())
+
+        sheet = self.workbook.create_sheet(title)
+        sheet.freeze_panes = "A2"
+        sheet.append(self.template.headers)
+        converters = self._converters(sheet)
+        count = 0
+        for row in rows:
+            sheet.append([convert(value) for convert, value in zip(converters, row)])
+            count += 1
+        return count
+
+    def save(self) -> str:
+        """Write the workbook (via a temporary file, so a failed save leaves no partial xlsx)."""
+        if not self._titles:
+            self.write_sheet("Sheet", [])
+        tmp_path = self.path + ".tmp"
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+
+def write_xlsx(path: str, template: RowTemplate, rows: Iterable[Sequence[Any]], title: str = "Sheet1") -> str:
+    """Write template rows to a single-sheet xlsx file."""
+    writer = XlsxTemplateWriter(path, template)
+    writer.write_sheet(title, rows)
+    return writer.save()